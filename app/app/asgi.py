@@ -0,0 +1,23 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://channels.readthedocs.io/en/2.1.7/deploying.html
+"""
+
+import os
+
+import django
+from channels.routing import get_default_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+application = get_default_application()
+
+# Take the cold start of the first requests now
+from core import health  # noqa: E402
+
+health.warm_up_on_start()
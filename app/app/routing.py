@@ -0,0 +1,39 @@
+from channels.http import AsgiHandler
+from channels.routing import ProtocolTypeRouter, URLRouter
+from django.urls import path
+
+from tweet import consumers
+from user.consumers import ManageUserConsumer
+
+
+class ReadRouter:
+    """Send reads of the async endpoints to their consumers"""
+
+    def __init__(self, reads, default):
+        self.reads = reads
+        self.default = default
+
+    def __call__(self, scope):
+        if scope['method'] in ('GET', 'HEAD'):
+            try:
+                return self.reads(scope)
+            except ValueError:
+                pass
+
+        return self.default(scope)
+
+
+read_urlpatterns = [
+    path('api/tweet/tags/', consumers.TagListConsumer),
+    path('api/tweet/tags/stream/', consumers.ReadConsumer),
+    path('api/tweet/descriptions/', consumers.DescriptionListConsumer),
+    path('api/tweet/descriptions/stream/', consumers.ReadConsumer),
+    path('api/tweet/tweets/', consumers.TweetListConsumer),
+    path('api/tweet/tweets/stream/', consumers.ReadConsumer),
+    path('api/tweet/tweets/<int:pk>/', consumers.TweetDetailConsumer),
+    path('api/user/me/', ManageUserConsumer),
+]
+
+application = ProtocolTypeRouter({
+    'http': ReadRouter(URLRouter(read_urlpatterns), AsgiHandler),
+})
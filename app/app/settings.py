@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,10 +34,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -61,6 +64,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'app.wsgi.application'
+ASGI_APPLICATION = 'app.routing.application'
 
 
 # Database
@@ -73,9 +77,94 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Keep connections open between requests, see core.health
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Read replicas, see core.replicas.  Each host in DB_REPLICA_HOSTS is
+# connected to like the primary; tests read replicas through the primary.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASE_REPLICAS.append(f'replica{index + 1}')
+    DATABASES[f'replica{index + 1}'] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Seconds a client reads from the primary after writing, at least the lag
+# replicas are allowed
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+# Shared between processes like cached responses
+REPLICA_PIN_CACHE_ALIAS = 'responses'
+# Replicas further behind than REPLICA_MAX_LAG seconds are not read from
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+
+# Caches
+# The web and worker processes invalidate each other's cached responses and
+# tokens, so those caches must be shared between processes, see
+# core.checks.  By default they are file-based under CACHE_ROOT, a volume
+# every process mounts; RESPONSE_CACHE_BACKEND and AUTH_CACHE_BACKEND may
+# name another shared backend such as memcached.
+
+CACHE_ROOT = os.environ.get('CACHE_ROOT', '/vol/web/cache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.environ.get(
+            'RESPONSE_CACHE_LOCATION', os.path.join(CACHE_ROOT, 'responses')),
+        'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('RESPONSE_CACHE_ENTRIES', 10000)),
+        },
+    },
+    'auth': {
+        'BACKEND': os.environ.get(
+            'AUTH_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.environ.get(
+            'AUTH_CACHE_LOCATION', os.path.join(CACHE_ROOT, 'auth')),
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/2.1/topics/auth/passwords/
+# Passwords are rehashed with the first hasher on the next login
+
+PASSWORD_HASHERS = [
+    os.environ.get(
+        'PASSWORD_HASHER',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+    ),
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.BCryptPasswordHasher',
+]
+
+# Logins verify passwords in a bounded pool, see user.hashing
+AUTHENTICATION_BACKENDS = ['user.hashing.HashingBackend']
+LOGIN_HASH_WORKERS = int(
+    os.environ.get('LOGIN_HASH_WORKERS', os.cpu_count() or 1))
+LOGIN_HASH_QUEUE = int(
+    os.environ.get('LOGIN_HASH_QUEUE', 4 * LOGIN_HASH_WORKERS))
+LOGIN_HASH_TIMEOUT = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -120,3 +209,82 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+# JSON is encoded with orjson when it is installed, MessagePack is offered
+# to clients accepting application/msgpack when msgpack is installed
+MSGPACK = find_spec('msgpack') is not None
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'tweet.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.JSONRenderer',
+        *(['core.renderers.MessagePackRenderer'] if MSGPACK else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.JSONParser',
+        *(['core.parsers.MessagePackParser'] if MSGPACK else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Home timelines
+TIMELINE_FAN_OUT_LIMIT = int(os.environ.get('TIMELINE_FAN_OUT_LIMIT', 10000))
+TIMELINE_FAN_OUT_WORKERS = int(os.environ.get('TIMELINE_FAN_OUT_WORKERS', 2))
+TIMELINE_BACKFILL = 200
+
+# Token authentication cache
+AUTH_TOKEN_CACHE_ALIAS = 'auth'
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_CACHE_LOCAL_TIMEOUT = 5
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+# Batch tweet creation
+TWEET_BATCH_LIMIT = int(os.environ.get('TWEET_BATCH_LIMIT', 5000))
+TWEET_BATCH_SIZE = 500
+
+# Responsive tweet image variants
+TWEET_IMAGE_WIDTHS = (320, 640, 1280)
+TWEET_IMAGE_WORKERS = int(os.environ.get('TWEET_IMAGE_WORKERS', 2))
+
+# Background jobs, see core.jobs
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 1))
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 4))
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 3600
+JOB_TIMEOUT = 600
+JOB_FINISH_ATTEMPTS = 5
+JOB_QUEUE_LIMITS = {
+    'images': TWEET_IMAGE_WORKERS,
+    'timelines': TIMELINE_FAN_OUT_WORKERS,
+}
+
+# Media serving, see core.media
+# 'x-accel-redirect' (nginx) or 'x-sendfile' hands files to the proxy.  Set
+# one in production, under daphne Django streams files through Python
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_PRIVATE_PREFIXES = ('uploads/tweet/',)
+
+# Rows fetched and encoded at a time by the streaming list endpoints
+API_STREAM_CHUNK_SIZE = 1000
+
+# Account archives, see core.archives and tweet.export
+ARCHIVE_CACHE_ALIAS = 'default'
+ARCHIVE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Open connections and prime caches as server processes start
+WARM_UP_ON_START = bool(int(os.environ.get('WARM_UP_ON_START', 1)))
+
+# Request timing, see core.timing
+SERVER_TIMING = bool(int(os.environ.get('SERVER_TIMING', 1)))
+# Fraction of requests logged to core.timing, slow requests always are
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0.01))
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+# Slowest queries of a slow request logged with their query plans
+SLOW_REQUEST_EXPLAIN = 3
@@ -1,10 +1,23 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, include, re_path
 from django.conf import settings
 
+from core import health, media
+
 urlpatterns = [
+    path('healthz', health.healthz, name='healthz'),
+    path('readyz', health.readyz, name='readyz'),
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/tweet/', include('tweet.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_URL)
+]
+
+# Media on another host (a CDN) is not served by the app
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(re_path(
+        r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        media.serve,
+        name='media'
+    ))
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Take the cold start of the first requests now
+from core import health  # noqa: E402
+
+health.warm_up_on_start()
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.checks import Tags, register
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import checks, images, search
+
+        post_migrate.connect(search.ensure_triggers, sender=self)
+        images.connect_signals()
+        register(checks.check_shared_caches, Tags.caches)
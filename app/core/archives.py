@@ -0,0 +1,209 @@
+"""
+Deterministic ZIP archives streamed from any offset.
+
+Entries are stored uncompressed with a fixed timestamp, and the size and
+CRC of each one are known before it is written, so every local header
+is final and no data descriptors follow the data.  The whole layout is
+therefore known up front: the archive's size can be sent as its
+Content-Length, and the bytes from any offset can be produced without
+producing the ones before it, which is what resuming a download with a
+Range request needs.  zipfile encodes the local headers and writes the
+central directory, the data is copied straight from its source.
+
+Stored files are read once to compute their CRC.  The CRCs of content
+addressed names never change and are cached for good.  Generated data is
+either produced twice, once to measure it and once while it is sent, or,
+for archives written once from start to end, produced once into a spooled
+temporary file by spooled_entry().
+"""
+import tempfile
+import zipfile
+import zlib
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+
+from core.storage import is_content_addressed
+
+
+DATE_TIME = (1980, 1, 1, 0, 0, 0)
+CHUNK_SIZE = 64 * 1024
+# Spooled data larger than this goes to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class ArchiveChanged(Exception):
+    """The data of an archive changed after its layout was planned"""
+
+
+class Entry:
+    """A stored archive member of known size and CRC"""
+
+    def __init__(self, name, size, crc, read):
+        self.info = zipfile.ZipInfo(name, DATE_TIME)
+        self.info.external_attr = 0o644 << 16
+        self.info.file_size = self.info.compress_size = size
+        self.info.CRC = crc
+        self.header = self.info.FileHeader()
+        # read(skip) yields the data, without its first skip bytes
+        self.read = read
+
+    @property
+    def size(self):
+        return self.info.file_size
+
+    @property
+    def crc(self):
+        return self.info.CRC
+
+
+class _Sink:
+    """Write-only file collecting what zipfile writes from offset"""
+
+    def __init__(self, offset):
+        self.offset = offset
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+
+class Archive:
+    """The layout of a ZIP archive of entries, in order"""
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        offset = 0
+        for entry in self.entries:
+            entry.info.header_offset = offset
+            offset += len(entry.header) + entry.size
+
+        # The central directory only holds metadata, a record per entry
+        sink = _Sink(offset)
+        with zipfile.ZipFile(sink, 'w') as archive:
+            archive.filelist = [entry.info for entry in self.entries]
+        self.directory = b''.join(sink.parts)
+        self.size = offset + len(self.directory)
+
+    def _segments(self):
+        for entry in self.entries:
+            yield len(entry.header), partial(_skip_bytes, entry.header)
+            yield entry.size, entry.read
+        yield len(self.directory), partial(_skip_bytes, self.directory)
+
+    def iter_bytes(self, start=0, end=None):
+        """Yield the bytes of the archive from start up to end included"""
+        remaining = (self.size if end is None else end + 1) - start
+        offset = 0
+        for length, read in self._segments():
+            if offset + length > start and length:
+                for chunk in read(max(start - offset, 0)):
+                    if len(chunk) >= remaining:
+                        yield chunk[:remaining]
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+            offset += length
+
+
+def _skip_bytes(data, skip):
+    yield data[skip:]
+
+
+def checked(chunks, size, crc, skip=0):
+    """Yield chunks without their first skip bytes, checking what they sum"""
+    read = crc_read = 0
+    for chunk in chunks:
+        read += len(chunk)
+        crc_read = zlib.crc32(chunk, crc_read)
+        if read > size:
+            raise ArchiveChanged
+        if read > skip:
+            yield chunk[max(skip - read + len(chunk), 0):]
+    if (read, crc_read) != (size, crc):
+        raise ArchiveChanged
+
+
+def measure(chunks):
+    """Return the size and CRC of chunks of bytes"""
+    size = crc = 0
+    for chunk in chunks:
+        size += len(chunk)
+        crc = zlib.crc32(chunk, crc)
+
+    return size, crc
+
+
+def _read_spool(spool, size, skip):
+    spool.seek(skip)
+    remaining = size - skip
+    while remaining > 0:
+        chunk = spool.read(min(CHUNK_SIZE, remaining))
+        remaining -= len(chunk)
+        yield chunk
+
+
+def spooled_entry(name, chunks):
+    """Return an entry of chunks of bytes, produced once into a spool"""
+    spool = tempfile.SpooledTemporaryFile(SPOOL_MAX_SIZE)
+    size = crc = 0
+    for chunk in chunks:
+        spool.write(chunk)
+        size += len(chunk)
+        crc = zlib.crc32(chunk, crc)
+
+    return Entry(name, size, crc, partial(_read_spool, spool, size))
+
+
+def _read_file(name, size, skip):
+    with default_storage.open(name, 'rb') as file:
+        file.seek(skip)
+        remaining = size - skip
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ArchiveChanged
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _crc_key(name):
+    return f'archive:crc:{name}'
+
+
+def file_entries(names):
+    """
+    Return entries for the stored files names, under the same names.
+
+    Files missing from the storage are left out.
+    """
+    cache = caches[settings.ARCHIVE_CACHE_ALIAS]
+    cached = cache.get_many(
+        [_crc_key(name) for name in names if is_content_addressed(name)])
+
+    entries = []
+    computed = {}
+    for name in names:
+        try:
+            size = default_storage.size(name)
+            crc = cached.get(_crc_key(name))
+            if crc is None:
+                crc = measure(_read_file(name, size, 0))[1]
+                if is_content_addressed(name):
+                    computed[_crc_key(name)] = crc
+        except (OSError, ArchiveChanged):
+            continue
+        entries.append(Entry(name, size, crc, partial(_read_file, name, size)))
+    cache.set_many(computed, timeout=None)
+
+    return entries
@@ -0,0 +1,40 @@
+"""
+System checks of the deployment settings.
+
+Cached responses, the version tokens their validators are built from,
+cached token lookups and replica pins are replaced or deleted by whichever
+process changes the data: web processes, run_workers and management
+commands alike.  A cache local to each process never sees the others'
+changes, and would keep serving, and answering 304 Not Modified for, stale
+data, or accepting revoked tokens, so these caches must be shared by every
+process.
+"""
+from django.conf import settings
+from django.core.checks import Error
+
+
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def shared_cache_aliases():
+    """Return the aliases of the caches every process must share"""
+    return sorted({
+        settings.RESPONSE_CACHE_ALIAS,
+        settings.AUTH_TOKEN_CACHE_ALIAS,
+        settings.REPLICA_PIN_CACHE_ALIAS,
+    })
+
+
+def check_shared_caches(app_configs, **kwargs):
+    """Report caches that processes would not share"""
+    return [
+        Error(
+            f'The {alias!r} cache is local to each process.',
+            hint='Use a backend shared by the web and worker processes, '
+                 'such as the file-based or memcached backends.',
+            obj=alias,
+            id='core.E001',
+        )
+        for alias in shared_cache_aliases()
+        if settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_BACKENDS
+    ]
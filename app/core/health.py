@@ -0,0 +1,162 @@
+"""
+Health checks and warm-up.
+
+A database counts as available once a connection to it is opened and
+answers a query; merely looking up connections['default'] opens nothing.
+/healthz only says that the process serves requests, /readyz also that
+it is warmed up and the databases answer, which takes one SELECT 1 on
+the persistent connection (CONN_MAX_AGE) once warm.  /readyz reports the
+queue depth of the login hashing pool as well.
+
+Warming up takes the cold start of the first requests ahead of them: it
+opens the connections, loads the URL resolver, the model metadata, the
+serializers' fields and the translation catalogs, and queries every
+table once so the database's catalog caches are filled.  Connections
+belong to threads, so under a threaded server only the thread that
+warmed up starts with one.
+"""
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, router
+from django.http import JsonResponse
+from django.urls import get_resolver
+from django.utils import translation
+from django.views.decorators.http import require_safe
+
+from user import hashing
+
+
+INITIAL_DELAY = 0.1
+MAX_DELAY = 5
+
+logger = logging.getLogger(__name__)
+
+_warm = False
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """Connect to a database and run a query, raising DatabaseError if not"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        # Reconnect on the next check rather than reuse a broken connection
+        try:
+            connection.close()
+        except DatabaseError:
+            pass
+        raise
+
+
+def wait_for_database(timeout, alias=DEFAULT_DB_ALIAS, on_retry=None):
+    """
+    Wait up to timeout seconds for a database to be available.
+
+    Checks are retried with exponential backoff, calling on_retry(error,
+    delay) before each wait.  The last error is raised once the time is
+    up.
+    """
+    deadline = time.monotonic() + timeout
+    delay = INITIAL_DELAY
+    while True:
+        try:
+            check_database(alias)
+            return
+        except DatabaseError as exc:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            wait = min(delay, remaining)
+            if on_retry is not None:
+                on_retry(exc, wait)
+            time.sleep(wait)
+            delay = min(delay * 2, MAX_DELAY)
+
+
+def _required():
+    # Reads fall back to the primary while replicas are down
+    return [alias for alias in connections
+            if alias not in settings.DATABASE_REPLICAS]
+
+
+def _views(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _views(pattern.url_patterns)
+        else:
+            yield pattern.callback
+
+
+def warm_up():
+    """Prime this process for its first requests"""
+    global _warm
+
+    for alias in _required():
+        check_database(alias)
+    for alias in settings.DATABASE_REPLICAS:
+        try:
+            check_database(alias)
+        except DatabaseError:
+            logger.warning('Replica %s unavailable', alias)
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for view in _views(resolver.url_patterns):
+        serializer_class = getattr(
+            getattr(view, 'cls', None), 'serializer_class', None)
+        if serializer_class is not None:
+            serializer_class().fields
+
+    for model in apps.get_models(include_auto_created=True):
+        model._meta.get_fields()
+        list(model._base_manager.db_manager(router.db_for_read(model))
+             .order_by().values_list('pk')[:1])
+
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Not found.')
+
+    _warm = True
+
+
+def warm_up_on_start():
+    """Warm up a starting server process unless WARM_UP_ON_START is off"""
+    if not settings.WARM_UP_ON_START:
+        return
+    try:
+        warm_up()
+    except DatabaseError:
+        # /readyz warms up once the database is back
+        logger.warning('Database unavailable, not warmed up', exc_info=True)
+
+
+def _status(status, code=200, **details):
+    response = JsonResponse({'status': status, **details}, status=code)
+    response['Cache-Control'] = 'no-store'
+
+    return response
+
+
+@require_safe
+def healthz(request):
+    """Answer as long as the process serves requests"""
+    return _status('ok')
+
+
+@require_safe
+def readyz(request):
+    """Answer once the process is warmed up and the databases answer"""
+    try:
+        if _warm:
+            for alias in _required():
+                check_database(alias)
+        else:
+            warm_up()
+    except DatabaseError:
+        return _status('unavailable', 503)
+
+    return _status('ok', login_hashing=hashing.pool.stats())
@@ -0,0 +1,121 @@
+"""
+Reference counting of stored tweet images.
+
+Tweets with identical images share one content addressed file.  Each file
+has an ImageBlob counting the tweets that use it, and the file is deleted
+once the last of them lets go of it.
+"""
+from django.db import transaction
+from django.db.models import Count, DEFERRED, F
+from django.db.models.signals import post_save, post_delete
+
+from core.models import ImageBlob, Tweet
+from core.variants import variant_names
+
+
+def get_storage():
+    return Tweet._meta.get_field('image').storage
+
+
+def acquire(name):
+    """Count another reference to a stored image"""
+    blob, created = ImageBlob.objects.get_or_create(
+        name=name, defaults={'references': 1})
+    if not created:
+        ImageBlob.objects.filter(pk=blob.pk) \
+            .update(references=F('references') + 1)
+
+
+def acquire_many(references):
+    """Count references to stored images, a number of them by name"""
+    existing = set(
+        ImageBlob.objects.filter(name__in=list(references))
+        .values_list('name', flat=True)
+    )
+    for name in existing:
+        ImageBlob.objects.filter(name=name) \
+            .update(references=F('references') + references[name])
+    ImageBlob.objects.bulk_create(
+        ImageBlob(name=name, references=count)
+        for name, count in references.items() if name not in existing
+    )
+
+
+def release(name):
+    """Drop a reference to a stored image, deleting it when unused"""
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update() \
+            .filter(name=name).first()
+        if blob is None:
+            return
+        if blob.references > 1:
+            ImageBlob.objects.filter(pk=blob.pk) \
+                .update(references=F('references') - 1)
+            return
+        variants = variant_names(blob)
+        blob.delete()
+
+    transaction.on_commit(lambda: _delete_unused(name, variants))
+
+
+def discard(names):
+    """Delete stored images that no tweet refers to, after a failed write"""
+    for name in names:
+        _delete_unused(name)
+
+
+def _delete_unused(name, variants=()):
+    # The image may have been uploaded again since it was released
+    if not ImageBlob.objects.filter(name=name).exists():
+        storage = get_storage()
+        for stored in (name, *variants):
+            storage.delete(stored)
+
+
+def recount():
+    """Recount the references to every stored image from the tweets"""
+    counts = dict(
+        Tweet.objects.exclude(image='').exclude(image__isnull=True)
+        .values_list('image').annotate(references=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ImageBlob.objects.exclude(name__in=counts).delete()
+        existing = set(ImageBlob.objects.values_list('name', flat=True))
+        for name, references in counts.items():
+            if name in existing:
+                ImageBlob.objects.filter(name=name) \
+                    .update(references=references)
+        ImageBlob.objects.bulk_create(
+            ImageBlob(name=name, references=references)
+            for name, references in counts.items() if name not in existing
+        )
+
+    return counts
+
+
+def _track_image(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+
+    name = instance.image.name or None
+    stored = getattr(instance, 'stored_image', None) or None
+    if name == stored:
+        return
+    if name:
+        acquire(name)
+    # A deferred image was never loaded, so its previous value is unknown
+    if stored and stored is not DEFERRED:
+        release(stored)
+    instance.stored_image = name
+
+
+def _release_image(sender, instance, **kwargs):
+    if instance.image:
+        release(instance.image.name)
+
+
+def connect_signals():
+    """Count references to tweet images as tweets are saved and deleted"""
+    post_save.connect(_track_image, sender=Tweet)
+    post_delete.connect(_release_image, sender=Tweet)
@@ -0,0 +1,244 @@
+"""
+A durable job queue kept in the database.
+
+Tasks are functions decorated with @task.  Calling task.delay(*args)
+stores a Job row in the current transaction, so the job only becomes
+visible to workers if the transaction commits.  The run_workers command
+claims due jobs with SELECT ... FOR UPDATE SKIP LOCKED where the database
+supports it, and falls back to a conditional update elsewhere (SQLite).
+
+Failed jobs are retried with exponential backoff until they run out of
+attempts.  Recording that a job finished is retried on transient database
+errors, a job whose outcome is lost would run again once it times out.
+JOB_QUEUE_LIMITS caps the number of jobs of a queue running at
+once across all workers; on PostgreSQL the cap is exact, elsewhere two
+workers claiming at the same moment may briefly exceed it.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import zlib
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Job
+
+
+FINISH_RETRY_DELAY = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+class Task:
+    """A function that can be run later by a worker"""
+
+    def __init__(self, func, queue, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args, run_at=None):
+        """Queue the task to be run with args by a worker"""
+        return enqueue(
+            self.name,
+            args,
+            queue=self.queue,
+            max_attempts=self.max_attempts,
+            run_at=run_at
+        )
+
+
+def task(queue='default', max_attempts=None):
+    """Make a module level function a task"""
+    def decorator(func):
+        return Task(func, queue, max_attempts or settings.JOB_MAX_ATTEMPTS)
+
+    return decorator
+
+
+def enqueue(name, args=(), queue='default', max_attempts=1, run_at=None):
+    """Store a job running the task called name with args"""
+    return Job.objects.create(
+        task=name,
+        args=json.dumps(list(args)),
+        queue=queue,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now()
+    )
+
+
+def backoff(attempts):
+    """Return how long to wait before retrying a job failed attempts times"""
+    delay = settings.JOB_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+
+    return timedelta(seconds=min(delay, settings.JOB_RETRY_MAX_DELAY))
+
+
+def worker_name():
+    """Return a name identifying the current worker thread"""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def requeue_stale(now=None):
+    """Give jobs whose worker stopped responding back to the queue"""
+    now = now or timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Worker timed out')
+    return stale.update(status=Job.QUEUED, run_at=now, locked_by='')
+
+
+def claim(worker, queues=None, limit=1):
+    """Lock up to limit due jobs for worker, return them"""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+    if queues:
+        due = due.filter(queue__in=queues)
+    queue_limits = settings.JOB_QUEUE_LIMITS
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    claimed = []
+
+    for queue in list(due.values_list('queue', flat=True).distinct()):
+        if len(claimed) >= limit:
+            break
+        # Without row locks a transaction reading before it writes only
+        # risks lock upgrade deadlocks (SQLite), the conditional update
+        # alone keeps a job from being claimed twice
+        with transaction.atomic() if skip_locked else nullcontext():
+            capacity = limit - len(claimed)
+            if queue in queue_limits:
+                _lock_queue(queue)
+                running = Job.objects.filter(
+                    queue=queue, status=Job.RUNNING).count()
+                capacity = min(capacity, queue_limits[queue] - running)
+            if capacity <= 0:
+                continue
+
+            candidates = due.filter(queue=queue).order_by('run_at', 'id')
+            if skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            ids = list(candidates.values_list('id', flat=True)[:capacity])
+            # Rows another worker claimed in the meantime no longer match
+            Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+                status=Job.RUNNING,
+                attempts=F('attempts') + 1,
+                locked_by=worker,
+                locked_at=now
+            )
+            claimed.extend(Job.objects.filter(
+                id__in=ids, locked_by=worker, locked_at=now
+            ).order_by('run_at', 'id'))
+
+    return claimed
+
+
+def _lock_queue(queue):
+    # Serialize claims from a limited queue until the transaction ends
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s)',
+                [zlib.crc32(queue.encode())]
+            )
+
+
+def finish(write):
+    """Record the outcome of a job, retrying transient database errors"""
+    for attempt in range(settings.JOB_FINISH_ATTEMPTS):
+        try:
+            return write()
+        except OperationalError:
+            if attempt + 1 == settings.JOB_FINISH_ATTEMPTS:
+                raise
+            logger.warning('Retrying to finish a job', exc_info=True)
+            # A connection the database dropped is opened again
+            if not connection.in_atomic_block:
+                connection.close()
+            time.sleep(FINISH_RETRY_DELAY * 2 ** attempt)
+
+
+def run(job):
+    """Run a claimed job, retrying or failing it when it raises"""
+    jobs = Job.objects.filter(pk=job.pk)
+    try:
+        import_string(job.task)(*json.loads(job.args))
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            finish(lambda: jobs.update(status=Job.FAILED, last_error=error))
+        else:
+            finish(lambda: jobs.update(
+                status=Job.QUEUED,
+                run_at=timezone.now() + backoff(job.attempts),
+                locked_by='',
+                last_error=error
+            ))
+        return False
+
+    finish(jobs.delete)
+
+    return True
+
+
+def _run_task(job):
+    try:
+        return run(job)
+    except Exception:
+        # Even after retries, the job stays locked and runs again once it
+        # times out
+        logger.exception('Job %s could not be finished', job.pk)
+        return False
+    finally:
+        connection.close()
+
+
+class Worker:
+    """Claim jobs and run them on a pool of threads"""
+
+    def __init__(self, queues=None, threads=1, poll_interval=1.0):
+        self.queues = queues
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = worker_name()
+
+    def run(self, stop, burst=False):
+        """Work until stop is set, or until no job is due when burst"""
+        running = set()
+        with ThreadPoolExecutor(self.threads, 'job') as pool:
+            while not stop.is_set():
+                free = self.threads - len(running)
+                jobs = []
+                if free:
+                    requeue_stale()
+                    jobs = claim(self.name, self.queues, free)
+                running.update(pool.submit(_run_task, job) for job in jobs)
+
+                if burst and not jobs and not running:
+                    break
+                if running:
+                    done, running = wait(
+                        running, self.poll_interval,
+                        return_when=FIRST_COMPLETED
+                    )
+                elif not jobs:
+                    stop.wait(self.poll_interval)
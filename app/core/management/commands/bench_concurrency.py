@@ -0,0 +1,201 @@
+import asyncio
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Tweet
+
+
+SERVERS = (
+    ('wsgi', '{python} manage.py runserver --noreload 127.0.0.1:{port}'),
+    ('asgi', 'daphne -b 127.0.0.1 -p {port} app.asgi:application'),
+)
+
+
+async def fetch(port, path, headers):
+    """Send a GET request and return the response status and headers"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    lines = [f'GET {path} HTTP/1.1', 'Host: 127.0.0.1',
+             'Connection: close']
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head = response.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+    response_headers = dict(
+        line.split(': ', 1) for line in head[1:] if ': ' in line)
+
+    return int(head[0].split()[1]), response_headers
+
+
+async def slow_client(port, deadline, interval):
+    """Hold a connection open by sending a request one byte at a time"""
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        return
+    request = b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\nX-Slow: ' + b'x' * 4096
+    for byte in request:
+        if time.monotonic() >= deadline:
+            break
+        writer.write(bytes([byte]))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            return
+        await asyncio.sleep(interval)
+    writer.close()
+
+
+async def client(port, path, headers, deadline, latencies, statuses):
+    """Request path repeatedly until the deadline"""
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            status, _ = await fetch(port, path, headers)
+        except (OSError, IndexError, ValueError):
+            status = 'error'
+        statuses[status] = statuses.get(status, 0) + 1
+        if status != 'error':
+            latencies.append(time.monotonic() - start)
+
+
+async def run_load(port, path, headers, options):
+    """Run fast clients alongside slow ones, return latencies and statuses"""
+    deadline = time.monotonic() + options['duration']
+    latencies = []
+    statuses = {}
+    slow = [
+        slow_client(port, deadline, options['slow_interval'])
+        for _ in range(options['slow_clients'])
+    ]
+    fast = [
+        client(port, path, headers, deadline, latencies, statuses)
+        for _ in range(options['clients'])
+    ]
+    await asyncio.gather(*slow, *fast)
+
+    return latencies, statuses
+
+
+def wait_for_port(port, timeout=30):
+    """Wait until a server accepts connections on port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server on port {port} did not start')
+
+
+class Command(BaseCommand):
+    """Django command to compare WSGI and ASGI under concurrent clients"""
+    help = 'Measure throughput of the WSGI and ASGI servers while slow ' \
+           'clients hold connections open'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/api/tweet/tweets/',
+            help='Endpoint the fast clients request'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=20,
+            help='Clients requesting the endpoint back to back'
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=200,
+            help='Clients trickling a request one byte at a time'
+        )
+        parser.add_argument(
+            '--slow-interval', type=float, default=1.0,
+            help='Seconds between the bytes of a slow client'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Seconds to run the load for each server'
+        )
+        parser.add_argument(
+            '--revalidate', action='store_true',
+            help='Send If-None-Match with the ETag of the first response'
+        )
+        parser.add_argument(
+            '--tweets', type=int, default=50,
+            help='Tweets created for the benchmark user'
+        )
+        parser.add_argument(
+            '--port', type=int, default=8100,
+            help='First port to start the servers on'
+        )
+        for name, command in SERVERS:
+            parser.add_argument(
+                f'--{name}-command', default=command,
+                help=f'Command starting the {name.upper()} server, '
+                     'with {port} and {python} placeholders'
+            )
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create_user(
+            'bench-concurrency@chirpr.invalid', None)
+        try:
+            Tweet.objects.bulk_create(
+                Tweet(user=user, title=f'tweet {i}')
+                for i in range(options['tweets'])
+            )
+            token = Token.objects.create(user=user)
+            headers = {'Authorization': f'Token {token.key}'}
+            for offset, (name, _) in enumerate(SERVERS):
+                port = options['port'] + offset
+                self.bench(name, port, dict(headers), options)
+        finally:
+            user.delete()
+
+    def bench(self, name, port, headers, options):
+        command = options[f'{name}_command'].format(
+            port=port, python=shlex.quote(sys.executable))
+        # Find scripts installed alongside this interpreter, like daphne
+        env = dict(os.environ)
+        env['PATH'] = os.pathsep.join(
+            [os.path.dirname(sys.executable), env.get('PATH', '')])
+        server = subprocess.Popen(
+            shlex.split(command),
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(port)
+            loop = asyncio.new_event_loop()
+            try:
+                status, response_headers = loop.run_until_complete(
+                    fetch(port, options['path'], headers))
+                if options['revalidate'] and 'ETag' in response_headers:
+                    headers['If-None-Match'] = response_headers['ETag']
+                latencies, statuses = loop.run_until_complete(
+                    run_load(port, options['path'], headers, options))
+            finally:
+                loop.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        self.stdout.write(
+            f'{name}: {len(latencies) / options["duration"]:.1f} req/s, '
+            f'p95 {p95 * 1000:.0f} ms, statuses {statuses}, '
+            f'{options["slow_clients"]} slow connections'
+        )
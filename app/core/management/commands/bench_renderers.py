@@ -0,0 +1,88 @@
+import random
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+
+from rest_framework import renderers
+
+from core.renderers import JSONRenderer, MessagePackRenderer, msgpack, \
+    orjson
+
+
+WORDS = ('chirp', 'morning', 'coffee', 'illustrated', 'story', 'sketch',
+         'ink', 'café', 'über', '🐦', 'panel', 'draft', 'colour')
+
+
+def tweet_page(count, seed=0):
+    """Return a page of tweets shaped like the tweet list endpoint's"""
+    rng = random.Random(seed)
+    results = [
+        OrderedDict([
+            ('id', 100000 + i),
+            ('title', ' '.join(rng.choice(WORDS)
+                               for _ in range(rng.randint(3, 20)))),
+            ('descriptions', sorted(rng.sample(range(1, 500),
+                                               rng.randint(0, 5)))),
+            ('tags', sorted(rng.sample(range(1, 500), rng.randint(0, 8)))),
+        ])
+        for i in range(count)
+    ]
+
+    return OrderedDict([
+        ('next', 'http://testserver/api/tweet/tweets/?cursor=eyJrIjpbMV19'),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+def best_of(repeat, func):
+    """Return the fastest of repeat runs of func, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API renderers"""
+    help = 'Compare encode time and payload size of the response ' \
+           'renderers on tweet list pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tweets', type=int, nargs='+', default=[50, 500],
+            help='Tweets per page, one run for each'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Encodes of each page, the fastest counts'
+        )
+
+    def handle(self, *args, **options):
+        candidates = [('stdlib json', renderers.JSONRenderer())]
+        if orjson is not None:
+            candidates.append(('orjson', JSONRenderer()))
+        else:
+            self.stderr.write('orjson is not installed, skipping it')
+        if msgpack is not None:
+            candidates.append(('msgpack', MessagePackRenderer()))
+        else:
+            self.stderr.write('msgpack is not installed, skipping it')
+
+        for count in options['tweets']:
+            page = tweet_page(count)
+            self.stdout.write(f'{count} tweets:')
+            baseline = None
+            for name, renderer in candidates:
+                seconds = best_of(
+                    options['repeat'], lambda: renderer.render(page))
+                size = len(renderer.render(page))
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f'  {name:12} {seconds * 1000:8.3f} ms '
+                    f'{size:9} bytes {baseline / seconds:5.1f}x'
+                )
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import images
+from core.models import Tweet, tweet_image_file_path
+from core.storage import is_content_addressed
+from tweet import cache
+
+
+class Command(BaseCommand):
+    """Django command to move tweet images to content addressed storage"""
+    help = 'Rewrite existing tweet images into the content addressed ' \
+           'layout and recount their references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report the images that would be rewritten'
+        )
+
+    def handle(self, *args, **options):
+        storage = images.get_storage()
+        tweets = Tweet.objects.exclude(image='').exclude(image__isnull=True) \
+            .only('id', 'user_id', 'image').order_by('id')
+
+        rewritten = {}
+        changed = {}
+        missing = 0
+        for tweet in tweets.iterator():
+            old = tweet.image.name
+            if is_content_addressed(old):
+                continue
+            if old not in rewritten:
+                if not storage.exists(old):
+                    self.stderr.write(f'Tweet {tweet.id}: {old} is missing')
+                    missing += 1
+                    continue
+                if options['dry_run']:
+                    rewritten[old] = None
+                    continue
+                with storage.open(old) as image:
+                    rewritten[old] = storage.save(
+                        tweet_image_file_path(tweet, old), image)
+
+            if not options['dry_run']:
+                # Update the row only, references are recounted below
+                if Tweet.objects.filter(pk=tweet.pk, image=old).update(
+                        image=rewritten[old], updated_at=timezone.now()):
+                    changed.setdefault(tweet.user_id, []).append(tweet.id)
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(rewritten)} images to rewrite, '
+                              f'{missing} missing')
+            return
+
+        # update() sends no signals, drop the responses linking old files
+        # before the files go
+        for user_id, tweet_ids in changed.items():
+            cache.bump(user_id, 'tweets', *(
+                cache.tweet_scope(tweet_id) for tweet_id in tweet_ids))
+
+        counts = images.recount()
+        for old in rewritten:
+            if not Tweet.objects.filter(image=old).exists():
+                storage.delete(old)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rewrote {len(rewritten)} images into '
+            f'{len(set(rewritten.values()))} files, {len(counts)} stored '
+            f'images in use, {missing} missing'
+        ))
@@ -0,0 +1,98 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import Worker
+
+
+def work(options, stop):
+    """Run a worker until stop is set"""
+    worker = Worker(
+        queues=options['queues'],
+        threads=options['threads'],
+        poll_interval=options['poll_interval']
+    )
+    try:
+        worker.run(stop, burst=options['burst'])
+    finally:
+        connections.close_all()
+
+
+def work_in_process(options, stop):
+    """Run a worker in a child process, stopping on SIGTERM or SIGINT"""
+    stop_on_signals(stop)
+    work(options, stop)
+
+
+def stop_on_signals(stop):
+    """Set stop on SIGTERM and SIGINT, return the previous handlers"""
+    return {
+        signum: signal.signal(signum, lambda *args: stop.set())
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+
+
+class Command(BaseCommand):
+    """Django command to run queued background jobs"""
+    help = 'Run background jobs on a pool of worker processes and threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Only run jobs from this queue, may be repeated'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+            help='Worker processes to start'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOB_WORKER_THREADS,
+            help='Jobs each process runs at once'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Seconds to wait before looking for new jobs'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no more jobs are due'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1 or options['threads'] < 1:
+            raise CommandError('Run at least one process and one thread')
+
+        queues = ', '.join(options['queues'] or ['all queues'])
+        self.stdout.write(
+            f'Running jobs from {queues} on {options["processes"]} '
+            f'processes with {options["threads"]} threads each'
+        )
+        if options['processes'] == 1:
+            stop = threading.Event()
+            handlers = stop_on_signals(stop)
+            try:
+                work(options, stop)
+            finally:
+                for signum, handler in handlers.items():
+                    signal.signal(signum, handler)
+        else:
+            stop = multiprocessing.Event()
+            # Children must not share the parent's database connections
+            connections.close_all()
+            processes = [
+                multiprocessing.Process(
+                    target=work_in_process, args=(options, stop))
+                for _ in range(options['processes'])
+            ]
+            for process in processes:
+                process.start()
+            stop_on_signals(stop)
+            for process in processes:
+                process.join()
+
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
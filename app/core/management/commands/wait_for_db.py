@@ -1,22 +1,37 @@
-import time
+from django.db.utils import DatabaseError
+from django.core.management.base import BaseCommand, CommandError
 
-from django.db import connections
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from core import health
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument(
+            '--warm-up', action='store_true',
+            help='Query every table once the database is available'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write(
-                    'Database unavailable, waiting 1 second...')
-                time.sleep(1)
+
+        def retry(error, delay):
+            self.stdout.write(
+                f'Database unavailable, waiting {delay:.1f} seconds...')
+
+        try:
+            health.wait_for_database(options['timeout'], on_retry=retry)
+        except DatabaseError as exc:
+            raise CommandError(
+                f'Database unavailable after {options["timeout"]:g} '
+                f'seconds: {exc}')
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
+        if options['warm_up']:
+            health.warm_up()
+            self.stdout.write(self.style.SUCCESS('Database warmed up'))
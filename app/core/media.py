@@ -0,0 +1,232 @@
+"""
+Serving uploaded media.
+
+Every media request goes through serve(), which checks that the requester
+may see private files and answers conditional requests.  The bytes are
+then sent by the front proxy when MEDIA_ACCEL is set: 'x-accel-redirect'
+(nginx) redirects to the internal location MEDIA_ACCEL_PREFIX,
+'x-sendfile' (Apache, lighttpd) names the file's path.  Otherwise Django
+streams the file itself, answering single byte ranges with 206 Partial
+Content.  Under daphne, which serves the app through ASGI, there is no
+wsgi.file_wrapper and no sendfile(): the ASGI handler reads the file in
+FileResponse.block_size chunks and sends each as a message, holding one
+of its threads until the client has received the whole file.  Only WSGI
+servers such as gunicorn and uWSGI hand FileResponse to sendfile().  Set
+MEDIA_ACCEL in production.
+
+Content addressed names never change content, so they are cached for a
+year as immutable.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.models import Tweet
+from core.storage import CONTENT_ADDRESSED_NAME
+from user.authentication import CachedTokenAuthentication
+
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class UnsatisfiableRange(Exception):
+    """The requested range starts beyond the end of the file"""
+
+
+class FileRange:
+    """File object limited to length bytes from start"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the first and last byte of a single byte range.
+
+    Returns None when the whole file should be sent: without a range, with
+    several ranges or with one that does not parse.
+    """
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # A suffix range, the last N bytes
+        if int(last) == 0:
+            raise UnsatisfiableRange
+        return max(size - int(last), 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise UnsatisfiableRange
+
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def authenticate(request):
+    """Return the user making the request by session or token, or None"""
+    if request.user.is_authenticated:
+        return request.user
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+
+    return result[0] if result else None
+
+
+def may_read(user, name):
+    """Return whether one of user's tweets uses the image or its variants"""
+    tweets = Tweet.objects.filter(user=user)
+    match = CONTENT_ADDRESSED_NAME.search(name)
+    if match:
+        # The original and its variants share the name up to the hash
+        tweets = tweets.filter(image__startswith=name[:match.end(3)] + '.')
+    else:
+        tweets = tweets.filter(image=name)
+
+    return tweets.exists()
+
+
+def get_etag(name, file_stat):
+    """Return a strong ETag for a stored file"""
+    if CONTENT_ADDRESSED_NAME.search(name):
+        return '"%s"' % posixpath.basename(name)
+
+    return '"%x-%x"' % (file_stat.st_mtime_ns, file_stat.st_size)
+
+
+def send(request, name, path, file_stat):
+    """Return a response transferring the file at path"""
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accel = settings.MEDIA_ACCEL
+    if accel == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = \
+            quote(settings.MEDIA_ACCEL_PREFIX + name)
+        return response
+    if accel == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    size = file_stat.st_size
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and _if_range_matches(request, name,
+                                                          file_stat):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except UnsatisfiableRange:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(
+        FileRange(open(path, 'rb'), start, length),
+        status=206,
+        content_type=content_type
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = length
+
+    return response
+
+
+def _if_range_matches(request, name, file_stat):
+    # A range of a file that changed since the client saw it is useless
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == get_etag(name, file_stat)
+
+    return if_range == http_date(file_stat.st_mtime)
+
+
+@require_safe
+def serve(request, path):
+    """Serve an uploaded file, private ones only to their owners"""
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith(settings.MEDIA_PRIVATE_PREFIXES):
+        user = authenticate(request)
+        if user is None:
+            response = HttpResponse(status=401)
+            response['WWW-Authenticate'] = 'Token'
+            return response
+        if not may_read(user, name):
+            raise Http404
+
+    try:
+        path = default_storage.path(name)
+        file_stat = os.stat(path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+
+    etag = get_etag(name, file_stat)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(file_stat.st_mtime)
+    )
+    if response is None:
+        response = send(request, name, path, file_stat)
+
+    private = name.startswith(settings.MEDIA_PRIVATE_PREFIXES)
+    if CONTENT_ADDRESSED_NAME.search(name):
+        cache_control = f'max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = 'no-cache'
+    response['Cache-Control'] = \
+        f'{"private" if private else "public"}, {cache_control}'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(file_stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
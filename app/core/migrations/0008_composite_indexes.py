@@ -0,0 +1,35 @@
+# Generated by Django 2.1.15 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_tweet_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='description',
+            index=models.Index(fields=['user', 'name', 'id'], name='core_description_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name', 'id'], name='core_tag_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['user', 'id'], name='core_tweet_user_id_idx'),
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_tweet_tags_tag_tweet_idx '
+             'ON core_tweet_tags (tag_id, tweet_id)'],
+            ['DROP INDEX core_tweet_tags_tag_tweet_idx'],
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_tweet_descriptions_desc_tweet_idx '
+             'ON core_tweet_descriptions (description_id, tweet_id)'],
+            ['DROP INDEX core_tweet_descriptions_desc_tweet_idx'],
+        ),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+import core.search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(core.search.install, core.search.uninstall),
+    ]
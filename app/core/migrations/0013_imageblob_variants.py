@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='variants',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
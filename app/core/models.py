@@ -1,17 +1,20 @@
-import uuid
 import os
 from django.db import models
+from django.db.models import DEFERRED
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
 
+from core.storage import ContentAddressedStorage
+
 
 def tweet_image_file_path(instance, filename):
     """Generate filepath for new tweet image"""
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    ext = filename.split('.')[-1].lower()
 
-    return os.path.join('uploads/tweet/', filename)
+    # The storage renames the image after the hash of its content
+    return os.path.join('uploads/tweet/', f'image.{ext}')
 
 
 class UserManager(BaseUserManager):
@@ -42,6 +45,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    fan_out_on_read = models.BooleanField(default=False)
 
     objects = UserManager()
 
@@ -55,6 +59,15 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -67,6 +80,15 @@ class Description(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_description_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -81,7 +103,115 @@ class Tweet(models.Model):
     title = models.CharField(max_length=255)
     descriptions = models.ManyToManyField('Description')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=tweet_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=tweet_image_file_path,
+        storage=ContentAddressedStorage()
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_tweet_user_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        tweet = super().from_db(db, field_names, values)
+        # Remember the stored image, to release it once it is replaced
+        tweet.stored_image = tweet.__dict__.get('image', DEFERRED)
+
+        return tweet
 
     def __str__(self):
         return self.title
+
+
+class ImageBlob(models.Model):
+    """A stored image file and the number of tweets using it"""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+    # JSON describing the generated width variants, see core.variants
+    variants = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return self.name
+
+
+class Follow(models.Model):
+    """A user following another user's tweets"""
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='following'
+    )
+    followee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='followers'
+    )
+    # Newest followee tweet copied into the follower's timeline when the
+    # followee's tweets are pulled on read instead of pushed on write
+    pulled_through = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('follower', 'followee'),)
+        indexes = [
+            models.Index(
+                fields=['followee', 'follower'],
+                name='core_follow_followee_idx'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """A tweet materialized into a user's home timeline"""
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    tweet = models.ForeignKey(
+        'Tweet',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        unique_together = (('owner', 'tweet'),)
+
+
+class Job(models.Model):
+    """A unit of deferred work, run by the run_workers command"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    queue = models.CharField(max_length=64, default='default')
+    task = models.CharField(max_length=255)
+    # JSON list of the task's arguments
+    args = models.TextField(default='[]')
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'queue', 'run_at'],
+                name='core_job_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} ({self.status})'
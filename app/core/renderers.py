@@ -0,0 +1,99 @@
+"""
+Fast response renderers.
+
+JSONRenderer encodes with orjson when it is installed and falls back to
+DRF's stdlib encoder otherwise, or when an indented response is asked
+for.  MessagePackRenderer is offered to clients sending
+`Accept: application/msgpack` when msgpack is installed.
+"""
+from django.utils.cache import patch_vary_headers
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.timing import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def default(obj):
+    """Encode the types DRF's JSON encoder knows, like lazy strings"""
+    return JSONEncoder().default(obj)
+
+
+def vary_on_accept(renderer_context):
+    """Mark the response as depending on the negotiated format"""
+    response = (renderer_context or {}).get('response')
+    if response is not None:
+        patch_vary_headers(response, ('Accept',))
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSON renderer encoding with orjson when available"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        vary_on_accept(renderer_context)
+        if orjson is None or data is None or self.get_indent(
+                accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=default)
+        except orjson.JSONEncodeError:
+            # Such as integers beyond 64 bits
+            return super().render(
+                data, accepted_media_type, renderer_context)
+
+        # Escape the separators that end JavaScript lines, like DRF does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+                .replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Renderer encoding responses as MessagePack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        vary_on_accept(renderer_context)
+        if data is None:
+            return b''
+
+        with timed('render'):
+            return msgpack.packb(data, use_bin_type=True, default=default)
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Renderer writing a list as one JSON document per line"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+
+        with timed('render'):
+            return b''.join(
+                super(NDJSONRenderer, self).render(item) + b'\n'
+                for item in data
+            )
@@ -0,0 +1,191 @@
+"""
+Read replica routing.
+
+Reads made while handling a GET, HEAD or OPTIONS request go to one of
+DATABASE_REPLICAS, picked once per request among the healthy ones.
+Everything else reads from and writes to the primary: unsafe requests,
+reads in a transaction, and code outside requests such as management
+commands and job workers.
+
+A client that just wrote reads its own writes: for REPLICA_PIN_SECONDS
+after an unsafe request it is pinned to the primary, by a cookie and by
+a cache entry keyed on its credentials, for token clients that keep no
+cookies.  Views whose data changed within the last REPLICA_MAX_LAG
+seconds, which replicas may not have yet, read from the primary too
+through use_primary().
+
+A replica is healthy while its replication lag is at most
+REPLICA_MAX_LAG seconds.  Lag is measured at most every
+REPLICA_LAG_CHECK_INTERVAL seconds per process, on PostgreSQL from the
+time of the last replayed transaction.  Other databases report no lag,
+and a replica that cannot be reached is unhealthy.
+"""
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'primary_until'
+
+POSTGRESQL_LAG = (
+    'SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 '
+    'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class _State(threading.local):
+    # Reads go to the primary unless a safe request says otherwise
+    use_replica = False
+    replica = None
+
+
+_state = _State()
+_health = {}
+
+
+def replica_lag(alias):
+    """Return how many seconds a replica is behind the primary"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_LAG)
+        lag = cursor.fetchone()[0]
+
+    return float(lag or 0)
+
+
+def is_healthy(alias):
+    """Return whether a replica is reachable and not lagging too far"""
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and \
+            now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return healthy
+
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    except DatabaseError:
+        healthy = False
+    _health[alias] = (now, healthy)
+
+    return healthy
+
+
+def choose_replica():
+    """Return the replica to read from in this request, None for primary"""
+    if not _state.use_replica:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    if _state.replica is None:
+        healthy = [alias for alias in settings.DATABASE_REPLICAS
+                   if is_healthy(alias)]
+        # Stick to one replica, they may lag by different amounts
+        _state.replica = random.choice(healthy) if healthy else \
+            DEFAULT_DB_ALIAS
+
+    return None if _state.replica == DEFAULT_DB_ALIAS else _state.replica
+
+
+def use_primary(since=None):
+    """
+    Read from the primary for the rest of the request.
+
+    With since, a Unix timestamp, only while replicas may not have replayed
+    changes made at that time yet.
+    """
+    if since is not None and \
+            time.time() - since >= settings.REPLICA_MAX_LAG:
+        return
+    if _state.use_replica:
+        _state.replica = DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """Send reads to a replica when safe, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def _pin_key(request):
+    credentials = request.META.get('HTTP_AUTHORIZATION') or \
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    digest = hashlib.sha1(credentials.encode('utf-8')).hexdigest()
+
+    return f'replica:pin:{digest}'
+
+
+def is_pinned(request):
+    """Return whether a client wrote too recently to read from a replica"""
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    key = _pin_key(request)
+
+    return key is not None and bool(
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].get(key))
+
+
+def pin(request, response):
+    """Pin a client that just wrote to the primary for a while"""
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(
+        PIN_COOKIE, '%d' % (time.time() + seconds), max_age=seconds,
+        httponly=True, samesite='Lax'
+    )
+    key = _pin_key(request)
+    if key is not None:
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].set(key, True, seconds)
+
+
+class ReplicaMiddleware:
+    """Let safe requests of clients that did not just write use replicas"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        safe = request.method in SAFE_METHODS
+        _state.use_replica = safe and not is_pinned(request)
+        _state.replica = None
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.use_replica = False
+            _state.replica = None
+
+        if not safe:
+            pin(request, response)
+
+        return response
@@ -0,0 +1,139 @@
+import re
+
+from django.db import connections
+from django.db.models import DecimalField, FloatField
+from django.db.models.expressions import RawSQL
+
+
+# PostgreSQL ranks are rounded to a numeric of RANK_PLACES digits.  A
+# ts_rank real is sent to clients with 6 significant digits only, so the
+# rank in a page cursor would not be the one compared in the database and
+# rows tying on rank would be skipped or repeated between pages.
+RANK_PLACES = 6
+
+# PostgreSQL keeps a tsvector column next to the title, filled by a trigger
+# and indexed with GIN.  The column is not on the model, so the ORM never
+# reads or writes it.
+POSTGRESQL_INSTALL = [
+    'ALTER TABLE core_tweet ADD COLUMN search_vector tsvector',
+    "UPDATE core_tweet SET search_vector = to_tsvector('english', title)",
+    'CREATE INDEX core_tweet_search_idx ON core_tweet '
+    'USING gin (search_vector)',
+    'CREATE TRIGGER core_tweet_search_update '
+    'BEFORE INSERT OR UPDATE OF title ON core_tweet FOR EACH ROW '
+    'EXECUTE PROCEDURE tsvector_update_trigger('
+    "search_vector, 'pg_catalog.english', title)",
+]
+POSTGRESQL_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS core_tweet_search_update ON core_tweet',
+    'ALTER TABLE core_tweet DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite uses an external content FTS5 table kept in sync by triggers.
+SQLITE_TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS core_tweet_fts_insert '
+    'AFTER INSERT ON core_tweet BEGIN '
+    'INSERT INTO core_tweet_fts (rowid, title) VALUES (new.id, new.title); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS core_tweet_fts_delete '
+    'AFTER DELETE ON core_tweet BEGIN '
+    'INSERT INTO core_tweet_fts (core_tweet_fts, rowid, title) '
+    "VALUES ('delete', old.id, old.title); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS core_tweet_fts_update '
+    'AFTER UPDATE OF title ON core_tweet BEGIN '
+    'INSERT INTO core_tweet_fts (core_tweet_fts, rowid, title) '
+    "VALUES ('delete', old.id, old.title); "
+    'INSERT INTO core_tweet_fts (rowid, title) VALUES (new.id, new.title); '
+    'END',
+]
+SQLITE_INSTALL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS core_tweet_fts USING fts5('
+    "title, content='core_tweet', content_rowid='id', "
+    "tokenize='porter unicode61')",
+] + SQLITE_TRIGGERS + [
+    "INSERT INTO core_tweet_fts (core_tweet_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS core_tweet_fts_insert',
+    'DROP TRIGGER IF EXISTS core_tweet_fts_delete',
+    'DROP TRIGGER IF EXISTS core_tweet_fts_update',
+    'DROP TABLE IF EXISTS core_tweet_fts',
+]
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install(apps, schema_editor):
+    """Create the full-text index over tweet titles"""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        _execute(connection, POSTGRESQL_INSTALL)
+    elif connection.vendor == 'sqlite':
+        _execute(connection, SQLITE_INSTALL)
+
+
+def uninstall(apps, schema_editor):
+    """Drop the full-text index over tweet titles"""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        _execute(connection, POSTGRESQL_UNINSTALL)
+    elif connection.vendor == 'sqlite':
+        _execute(connection, SQLITE_UNINSTALL)
+
+
+def ensure_triggers(using, **kwargs):
+    """
+    Recreate the SQLite sync triggers after migrating.
+
+    SQLite migrations that alter core_tweet rebuild the table, which drops
+    every trigger attached to it.  Rows keep their ids, so the FTS index
+    itself stays valid.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if 'core_tweet_fts' in connection.introspection.table_names():
+        _execute(connection, SQLITE_TRIGGERS)
+
+
+def search_tweets(queryset, query):
+    """
+    Filter queryset to tweets whose title matches query and annotate each
+    with a `rank`, where higher ranks are better matches.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = "plainto_tsquery('english', %s)"
+        match = f'core_tweet.search_vector @@ {tsquery}'
+        params = [query]
+        rank = RawSQL(
+            f'round(ts_rank(core_tweet.search_vector, {tsquery})::numeric, '
+            f'{RANK_PLACES})', (query,),
+            output_field=DecimalField(
+                max_digits=RANK_PLACES + 10, decimal_places=RANK_PLACES)
+        )
+    elif vendor == 'sqlite':
+        phrase = ' '.join(f'"{word}"' for word in words(query))
+        match = ('core_tweet.id IN (SELECT rowid FROM core_tweet_fts '
+                 'WHERE core_tweet_fts MATCH %s)')
+        params = [phrase]
+        rank = RawSQL(
+            'SELECT -bm25(core_tweet_fts) FROM core_tweet_fts '
+            'WHERE core_tweet_fts MATCH %s AND rowid = core_tweet.id',
+            (phrase,), output_field=FloatField()
+        )
+    else:
+        raise NotImplementedError(
+            f'Full-text search is not supported on {vendor}')
+
+    return queryset.extra(where=[match], params=params).annotate(rank=rank)
+
+
+def words(query):
+    """Return the searchable words of a query"""
+    return re.findall(r'\w+', query)
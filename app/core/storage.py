@@ -0,0 +1,80 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+# Width variants of images are stored as <sha256>-<width>w.ext
+CONTENT_ADDRESSED_NAME = re.compile(
+    r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(?:-\d+w)?'
+    r'(?:\.\w+)?$'
+)
+
+
+def is_content_addressed(name):
+    """Return whether a stored file name is in the content addressed layout"""
+    return bool(CONTENT_ADDRESSED_NAME.search(name or ''))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the SHA-256 of their content.
+
+    A file saved as dir/name.ext is stored as dir/ab/cd/<sha256>.ext, so
+    the same content is only ever stored once.
+    """
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        """Keep the name, the file is renamed after its content when saved"""
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        # Hash while writing to a temporary file next to the final one
+        temp_path = self.path(os.path.join(directory, f'.{uuid.uuid4()}'))
+        digest = hashlib.sha256()
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            sha = digest.hexdigest()
+            name = os.path.join(directory, sha[:2], sha[2:4], sha + ext)
+            if self.exists(name):
+                os.remove(temp_path)
+            else:
+                self._move_into_place(temp_path, name)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return name.replace('\\', '/')
+
+    def _move_into_place(self, temp_path, name):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0)
+            try:
+                os.makedirs(
+                    directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        file_move_safe(temp_path, full_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
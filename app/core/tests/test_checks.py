@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from core import checks
+
+
+LOCAL = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Test the caches processes invalidate for each other are shared"""
+
+    def test_shared_caches_pass(self):
+        """Test the default file-based caches pass the check"""
+        self.assertEqual(checks.check_shared_caches(None), [])
+
+    def test_process_local_cache_fails(self):
+        """Test a local memory response cache is an error"""
+        caches = dict(settings.CACHES, responses=LOCAL)
+
+        with override_settings(CACHES=caches):
+            errors = checks.check_shared_caches(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertEqual(errors[0].obj, 'responses')
+
+    def test_process_local_auth_cache_fails(self):
+        """Test revoked tokens could outlive their deletion elsewhere"""
+        caches = dict(settings.CACHES, auth=LOCAL)
+
+        with override_settings(CACHES=caches):
+            errors = checks.check_shared_caches(None)
+
+        self.assertEqual([error.obj for error in errors], ['auth'])
@@ -1,6 +1,6 @@
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -9,16 +9,43 @@ class CommandTests(TestCase):
     # Mocking out the db connection
     def test_wait_for_db_ready(self):
         """Test waiting for DB when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch('core.health.check_database') as check:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(check.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+        with patch('core.health.check_database') as check:
             # Add side effect to mock the set of calls
-            gi.side_effect = [OperationalError] * 5 + [True]
+            check.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(check.call_count, 6)
+            # Each wait doubles
+            self.assertEqual(
+                [call[0][0] for call in ts.call_args_list],
+                [0.1, 0.2, 0.4, 0.8, 1.6]
+            )
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_deadline(self, ts):
+        """Test waiting for db gives up at the deadline"""
+        with patch('core.health.check_database') as check:
+            check.side_effect = OperationalError('refused')
+            with self.assertRaisesMessage(CommandError, 'refused'):
+                call_command('wait_for_db', '--timeout', '0')
+        ts.assert_not_called()
+
+    def test_wait_for_db_connects(self):
+        """Test the database is connected to and queried"""
+        with patch('django.db.backends.utils.CursorWrapper.execute') as ex:
+            call_command('wait_for_db')
+
+        ex.assert_called_once_with('SELECT 1')
+
+    def test_wait_for_db_warm_up(self):
+        """Test the database can be warmed up once available"""
+        with patch('core.health.warm_up') as warm_up:
+            call_command('wait_for_db', '--warm-up')
+
+        warm_up.assert_called_once_with()
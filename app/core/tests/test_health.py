@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import health
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthTests(TestCase):
+    """Test the health checks and warming up"""
+
+    def setUp(self):
+        patcher = patch('core.health._warm', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_healthz(self):
+        """Test the liveness check answers without the database"""
+        with patch('core.health.check_database') as check:
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+        self.assertEqual(res['Cache-Control'], 'no-store')
+        check.assert_not_called()
+
+    def test_readyz_warms_up(self):
+        """Test the readiness check warms the process up first"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(health._warm)
+
+    def test_readyz_once_warm(self):
+        """Test a warm process is ready after a single query"""
+        health.warm_up()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readyz_database_unavailable(self):
+        """Test the process is not ready while the database is down"""
+        with patch('core.health.check_database',
+                   side_effect=OperationalError):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'unavailable'})
+        self.assertFalse(health._warm)
+
+    def test_warm_up_queries_every_table(self):
+        """Test warming up queries each table once"""
+        with CaptureQueriesContext(connection) as queries:
+            health.warm_up()
+
+        sql = ' '.join(query['sql'] for query in queries)
+        for table in ('core_tweet', 'core_tweet_tags', 'authtoken_token'):
+            self.assertIn(f'"{table}"', sql)
+
+    @override_settings(WARM_UP_ON_START=True)
+    def test_warm_up_on_start_without_database(self):
+        """Test a server starts even if the database is down"""
+        with patch('core.health.check_database',
+                   side_effect=OperationalError), \
+                self.assertLogs('core.health', 'WARNING'):
+            health.warm_up_on_start()
+
+        self.assertFalse(health._warm)
+
+    @override_settings(WARM_UP_ON_START=False)
+    def test_warm_up_on_start_disabled(self):
+        """Test warming up on start can be turned off"""
+        with patch('core.health.warm_up') as warm_up:
+            health.warm_up_on_start()
+
+        warm_up.assert_not_called()
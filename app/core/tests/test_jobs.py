@@ -0,0 +1,176 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []
+
+
+@jobs.task()
+def record(value):
+    """Remember value"""
+    calls.append(value)
+
+
+@jobs.task(max_attempts=2)
+def explode():
+    """Always fail"""
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    """Test queueing, claiming and running jobs"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_stores_job(self):
+        """Test delaying a task stores a job with its arguments"""
+        job = record.delay('chirp')
+
+        self.assertEqual(job.task, 'core.tests.test_jobs.record')
+        self.assertEqual(job.queue, 'default')
+        self.assertEqual(job.args, '["chirp"]')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(calls, [])
+
+    def test_claim_locks_job(self):
+        """Test a claimed job is not handed out twice"""
+        record.delay('chirp')
+
+        claimed = jobs.claim('worker-1')
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].status, Job.RUNNING)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(claimed[0].locked_by, 'worker-1')
+        self.assertEqual(jobs.claim('worker-2'), [])
+
+    def test_claim_skips_future_jobs(self):
+        """Test jobs are only claimed once they are due"""
+        record.delay('later', run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(jobs.claim('worker'), [])
+
+    def test_claim_filters_queues(self):
+        """Test workers only claim jobs from their queues"""
+        jobs.enqueue('core.tests.test_jobs.record', ['a'], queue='images')
+        record.delay('b')
+
+        claimed = jobs.claim('worker', queues=['images'], limit=5)
+
+        self.assertEqual([job.queue for job in claimed], ['images'])
+
+    @override_settings(JOB_QUEUE_LIMITS={'images': 2})
+    def test_claim_queue_limit(self):
+        """Test no more jobs of a limited queue run than its limit"""
+        for _ in range(4):
+            jobs.enqueue('core.tests.test_jobs.record', ['a'], queue='images')
+
+        self.assertEqual(len(jobs.claim('worker-1', limit=3)), 2)
+        self.assertEqual(jobs.claim('worker-2', limit=3), [])
+
+    def test_run_deletes_finished_job(self):
+        """Test a job that succeeds runs its task and is removed"""
+        record.delay('chirp')
+
+        self.assertTrue(jobs.run(jobs.claim('worker')[0]))
+
+        self.assertEqual(calls, ['chirp'])
+        self.assertFalse(Job.objects.exists())
+
+    @patch('core.jobs.time.sleep')
+    def test_finishing_retried(self, sleep):
+        """Test a transient error recording a job's outcome is retried"""
+        write = Mock(side_effect=[OperationalError('table is locked'), 1])
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(jobs.finish(write), 1)
+
+        self.assertEqual(write.call_count, 2)
+        sleep.assert_called_once()
+
+    @override_settings(JOB_FINISH_ATTEMPTS=3)
+    @patch('core.jobs.time.sleep')
+    def test_finishing_gives_up(self, sleep):
+        """Test a job's outcome is only retried so many times"""
+        write = Mock(side_effect=OperationalError('table is locked'))
+
+        with self.assertLogs('core.jobs', 'WARNING'), \
+                self.assertRaises(OperationalError):
+            jobs.finish(write)
+
+        self.assertEqual(write.call_count, 3)
+
+    def test_run_retries_with_backoff(self):
+        """Test a failed job is queued again after a delay"""
+        explode.delay()
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(jobs.run(jobs.claim('worker')[0]))
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+    def test_run_fails_after_last_attempt(self):
+        """Test a job is failed once it runs out of attempts"""
+        explode.delay()
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            for _ in range(2):
+                jobs.run(jobs.claim('worker')[0])
+                Job.objects.update(run_at=timezone.now())
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(jobs.claim('worker'), [])
+
+    @override_settings(JOB_RETRY_DELAY=10, JOB_RETRY_MAX_DELAY=60)
+    def test_backoff(self):
+        """Test retries back off exponentially up to a maximum"""
+        self.assertEqual(
+            [jobs.backoff(n).total_seconds() for n in range(1, 6)],
+            [10, 20, 40, 60, 60]
+        )
+
+    @override_settings(JOB_TIMEOUT=60)
+    def test_requeue_stale(self):
+        """Test jobs of a worker that stopped responding are queued again"""
+        record.delay('chirp')
+        jobs.claim('worker')
+        Job.objects.update(
+            locked_at=timezone.now() - timedelta(minutes=2))
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(len(jobs.claim('other')), 1)
+
+
+class RunWorkersCommandTests(TransactionTestCase):
+    """Test the run_workers command"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_runs_due_jobs(self):
+        """Test a burst run works through every due job and exits"""
+        for value in range(5):
+            record.delay(value)
+
+        # One thread, so no two threads write to SQLite at the same time
+        call_command(
+            'run_workers', '--burst', '--threads', '1',
+            '--poll-interval', '0.01', stdout=StringIO()
+        )
+
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,184 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from core.media import UnsatisfiableRange, parse_range
+from core.models import Tweet
+
+
+CONTENT = b'0123456789'
+
+
+def media_url(name):
+    """Return the URL serving a stored file"""
+    return f'/media/{name}'
+
+
+def content(response):
+    """Return the body of a possibly streaming response"""
+    if response.streaming:
+        return b''.join(response.streaming_content)
+
+    return response.content
+
+
+class ParseRangeTests(TestCase):
+    """Test parsing Range headers"""
+
+    def test_ranges(self):
+        """Test single byte ranges are parsed and clamped to the file"""
+        self.assertEqual(parse_range('bytes=2-4', 10), (2, 4))
+        self.assertEqual(parse_range('bytes=5-', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=-30', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=8-30', 10), (8, 9))
+
+    def test_ignored_ranges(self):
+        """Test ranges that do not parse are ignored"""
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('bytes=4-2', 10))
+        self.assertIsNone(parse_range('lines=1-2', 10))
+
+    def test_unsatisfiable_ranges(self):
+        """Test ranges starting past the end cannot be satisfied"""
+        with self.assertRaises(UnsatisfiableRange):
+            parse_range('bytes=10-', 10)
+        with self.assertRaises(UnsatisfiableRange):
+            parse_range('bytes=-0', 10)
+
+
+class MediaServingTests(TestCase):
+    """Test serving uploaded media"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.tweet = Tweet.objects.create(user=self.user, title='Tweet')
+        self.tweet.image.save('picture.jpg', ContentFile(CONTENT))
+        self.url = media_url(self.tweet.image.name)
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def test_serve_image(self):
+        """Test the owner gets the image with immutable cache headers"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(content(res), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertEqual(
+            res['Cache-Control'], 'private, max-age=31536000, immutable')
+        self.assertIn(os.path.basename(self.tweet.image.name), res['ETag'])
+
+    def test_range(self):
+        """Test a byte range is answered with partial content"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2-4')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(content(res), b'234')
+        self.assertEqual(res['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(res['Content-Length'], '3')
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file is refused"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */10')
+
+    def test_if_range_mismatch_sends_everything(self):
+        """Test a range of a changed file sends the whole file"""
+        res = self.client.get(
+            self.url, HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"other"')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(content(res), CONTENT)
+
+    def test_not_modified(self):
+        """Test a matching ETag is answered with 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_anonymous_refused(self):
+        """Test private images require authentication"""
+        self.client.logout()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 401)
+
+    def test_token_authentication(self):
+        """Test images can be requested with an API token"""
+        self.client.logout()
+        token = Token.objects.create(user=self.user)
+
+        res = self.client.get(
+            self.url, HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_other_users_image_not_found(self):
+        """Test users cannot read images of other users' tweets"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'test123')
+        self.client.force_login(other)
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_variant_readable_by_owner(self):
+        """Test the variants of an image are served to its owner"""
+        base, ext = os.path.splitext(self.tweet.image.name)
+        variant = f'{base}-320w.webp'
+        with open(os.path.join(self.media, variant), 'wb') as image:
+            image.write(b'webp')
+
+        res = self.client.get(media_url(variant))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+
+    def test_path_traversal(self):
+        """Test files outside the media root are not served"""
+        res = self.client.get(media_url('../../etc/passwd'))
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """Test the transfer is left to nginx when configured"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{self.tweet.image.name}'
+        )
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_x_sendfile(self):
+        """Test the transfer is left to the proxy by path when configured"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res['X-Sendfile'], self.tweet.image.path)
+        self.assertEqual(res.content, b'')
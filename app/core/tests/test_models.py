@@ -1,4 +1,3 @@
-from unittest.mock import patch
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -72,13 +71,10 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tweet), tweet.title)
 
-    @patch('uuid.uuid4')
-    def test_tweet_filename_uuid(self, mock_uuid):
+    def test_tweet_filename(self):
         """Test that image is saved in the correct location"""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.tweet_image_file_path(None, 'myimage.jpg')
+        file_path = models.tweet_image_file_path(None, 'myimage.JPG')
 
-        exp_path = f'uploads/tweet/{uuid}.jpg'
+        exp_path = 'uploads/tweet/image.jpg'
 
         self.assertEqual(file_path, exp_path)
@@ -0,0 +1,139 @@
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from core import parsers
+from core.models import Tweet
+from core.renderers import JSONRenderer, MessagePackRenderer, msgpack, \
+    orjson
+
+
+TWEET_URL = reverse('tweet:tweet-list')
+
+DATA = OrderedDict([
+    ('id', 1),
+    ('title', 'Chirp "quoted" \\ é 中文 \U0001f426 \u2028\u2029'),
+    ('tags', [1, 2, 3]),
+    ('empty', None),
+    ('ratio', 0.5),
+    ('price', Decimal('1.10')),
+    ('error', _('This field is required.')),
+])
+
+
+class JSONRendererTests(TestCase):
+    """Test the orjson backed JSON renderer"""
+
+    def test_same_output_as_stdlib(self):
+        """Test the output matches DRF's renderer byte for byte"""
+        self.assertEqual(
+            JSONRenderer().render(DATA),
+            renderers.JSONRenderer().render(DATA)
+        )
+
+    def test_indent_uses_stdlib(self):
+        """Test indented output is left to DRF's renderer"""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            JSONRenderer().render(DATA, media_type),
+            renderers.JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_large_integers(self):
+        """Test integers beyond 64 bits fall back to the stdlib"""
+        self.assertEqual(JSONRenderer().render([2 ** 70]), b'[%d]' % 2 ** 70)
+
+    def test_without_orjson(self):
+        """Test the renderer and parser work without orjson installed"""
+        with mock.patch('core.renderers.orjson', None), \
+                mock.patch('core.parsers.orjson', None):
+            rendered = JSONRenderer().render(DATA)
+            parsed = parsers.JSONParser().parse(BytesIO(rendered))
+
+        self.assertEqual(rendered, renderers.JSONRenderer().render(DATA))
+        self.assertEqual(parsed['title'], DATA['title'])
+
+    def test_parse(self):
+        """Test JSON request bodies are parsed"""
+        parsed = parsers.JSONParser().parse(BytesIO(b'{"title":"\\u00e9"}'))
+
+        self.assertEqual(parsed, {'title': 'é'})
+
+    def test_parse_error(self):
+        """Test malformed JSON is a parse error"""
+        with self.assertRaises(ParseError):
+            parsers.JSONParser().parse(BytesIO(b'{"title":'))
+
+    @skipUnless(orjson, 'orjson is not installed')
+    def test_orjson_used(self):
+        """Test orjson encodes when it is installed"""
+        with mock.patch('core.renderers.orjson.dumps',
+                        return_value=b'{}') as dumps:
+            JSONRenderer().render(DATA)
+
+        dumps.assert_called_once()
+
+
+@skipUnless(msgpack, 'msgpack is not installed')
+class MessagePackTests(TestCase):
+    """Test MessagePack responses and requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.client.force_authenticate(self.user)
+        Tweet.objects.create(user=self.user, title='Chirp')
+
+    def test_round_trip(self):
+        """Test rendered data unpacks to the same values"""
+        rendered = MessagePackRenderer().render(DATA)
+
+        parsed = parsers.MessagePackParser().parse(BytesIO(rendered))
+
+        self.assertEqual(parsed['title'], DATA['title'])
+        self.assertEqual(parsed['price'], 1.1)
+        self.assertEqual(parsed['error'], 'This field is required.')
+
+    def test_negotiated_by_accept(self):
+        """Test lists are sent as MessagePack to clients accepting it"""
+        json_res = self.client.get(TWEET_URL)
+        res = self.client.get(TWEET_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content, raw=False),
+            json.loads(json_res.content)
+        )
+        self.assertIn('Accept', res['Vary'])
+        self.assertNotEqual(res['ETag'], json_res['ETag'])
+
+    def test_request_body(self):
+        """Test tweets can be created from a MessagePack body"""
+        res = self.client.post(
+            TWEET_URL,
+            msgpack.packb({'title': 'Packed', 'tags': [], 'descriptions': []}),
+            content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(Tweet.objects.filter(title='Packed').exists())
+
+    def test_malformed_body(self):
+        """Test a malformed MessagePack body is a bad request"""
+        res = self.client.post(
+            TWEET_URL, b'\xc1', content_type='application/msgpack')
+
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,261 @@
+import time
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, \
+    TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core import replicas
+from core.models import Tag, Tweet
+
+from tweet import cache, timeline
+
+
+# Aliases standing in for replicas, reading the test database
+MIRRORS = [alias for alias, database in settings.DATABASES.items()
+           if database.get('TEST', {}).get('MIRROR') == 'default']
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test routing reads to replicas"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        replicas._health.clear()
+        patcher = patch('core.replicas.replica_lag', return_value=0)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_db(self, request, response=None):
+        """Return where a read goes while handling request"""
+        used = []
+
+        def get_response(request):
+            used.append(router.db_for_read(Tag))
+            return response or HttpResponse()
+
+        replicas.ReplicaMiddleware(get_response)(request)
+
+        return used[0]
+
+    def test_safe_requests_read_replicas(self):
+        """Test GET requests read from a replica"""
+        self.assertIn(
+            self.read_db(self.factory.get('/')), ('replica1', 'replica2'))
+
+    def test_outside_requests_read_primary(self):
+        """Test code outside requests reads from the primary"""
+        self.assertEqual(router.db_for_read(Tag), 'default')
+        self.assertEqual(router.db_for_write(Tag), 'default')
+
+    def test_unsafe_requests_read_primary(self):
+        """Test reads while handling a write go to the primary"""
+        self.assertEqual(self.read_db(self.factory.post('/')), 'default')
+
+    def test_transaction_reads_primary(self):
+        """Test reads in a transaction go to the primary"""
+        with patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(self.read_db(self.factory.get('/')), 'default')
+
+    def test_one_replica_per_request(self):
+        """Test every read of a request goes to the same replica"""
+        def get_response(request):
+            used = {router.db_for_read(Tag) for _ in range(20)}
+            self.assertEqual(len(used), 1)
+            return HttpResponse()
+
+        replicas.ReplicaMiddleware(get_response)(self.factory.get('/'))
+
+    def test_pinned_after_write(self):
+        """Test a client reads from the primary for a while after writing"""
+        response = replicas.ReplicaMiddleware(
+            lambda request: HttpResponse())(self.factory.post('/'))
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = cookie.value
+
+        self.assertEqual(self.read_db(request), 'default')
+
+    def test_token_clients_pinned(self):
+        """Test clients without cookies are pinned by their credentials"""
+        self.read_db(self.factory.post(
+            '/', HTTP_AUTHORIZATION='Token abc'))
+
+        self.assertEqual(
+            self.read_db(self.factory.get(
+                '/', HTTP_AUTHORIZATION='Token abc')),
+            'default'
+        )
+        self.assertNotEqual(
+            self.read_db(self.factory.get(
+                '/', HTTP_AUTHORIZATION='Token other')),
+            'default'
+        )
+
+    def test_expired_pin(self):
+        """Test a pin cookie only holds until the time it names"""
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = '1000'
+
+        self.assertNotEqual(self.read_db(request), 'default')
+
+    def test_lagging_replica_skipped(self):
+        """Test replicas lagging too far behind are not read from"""
+        self.replica_lag.side_effect = lambda alias: \
+            settings.REPLICA_MAX_LAG + 1 if alias == 'replica1' else 0
+
+        for _ in range(10):
+            self.assertEqual(self.read_db(self.factory.get('/')), 'replica2')
+
+    def test_unreachable_replicas_skipped(self):
+        """Test reads fall back to the primary when no replica is up"""
+        self.replica_lag.side_effect = DatabaseError
+
+        self.assertEqual(self.read_db(self.factory.get('/')), 'default')
+
+    def test_lag_checked_periodically(self):
+        """Test lag is measured at most once per interval"""
+        for _ in range(5):
+            self.read_db(self.factory.get('/'))
+
+        self.assertEqual(self.replica_lag.call_count, 2)
+
+    def test_use_primary(self):
+        """Test a request can switch its reads to the primary"""
+        def get_response(request):
+            replica = router.db_for_read(Tag)
+            replicas.use_primary()
+            self.assertIn(replica, ('replica1', 'replica2'))
+            self.assertEqual(router.db_for_read(Tag), 'default')
+            return HttpResponse()
+
+        replicas.ReplicaMiddleware(get_response)(self.factory.get('/'))
+
+        self.assertIn(
+            self.read_db(self.factory.get('/')), ('replica1', 'replica2'))
+
+    def test_use_primary_since(self):
+        """Test reads switch to the primary only for recent changes"""
+        def read_since(since):
+            def get_response(request):
+                replicas.use_primary(since=since)
+                used.append(router.db_for_read(Tag))
+                return HttpResponse()
+
+            used = []
+            replicas.ReplicaMiddleware(get_response)(self.factory.get('/'))
+            return used[0]
+
+        now = time.time()
+
+        self.assertEqual(read_since(now - 1), 'default')
+        self.assertIn(read_since(now - settings.REPLICA_MAX_LAG - 1),
+                      ('replica1', 'replica2'))
+
+    def test_no_migrations_on_replicas(self):
+        """Test migrations only run on the primary"""
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Test everything uses the primary when there are no replicas"""
+        response = replicas.ReplicaMiddleware(
+            lambda request: HttpResponse())(self.factory.post('/'))
+
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.read_db(self.factory.get('/')), 'default')
+
+
+@skipUnless(MIRRORS, 'no database stands in for a replica')
+@override_settings(DATABASE_REPLICAS=MIRRORS)
+class ReplicaReadTests(TransactionTestCase):
+    """Test the API reading from a replica database"""
+    multi_db = True
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, **params):
+        """Return a response and the databases it was read from"""
+        choose_replica = replicas.choose_replica
+        used = []
+
+        def choose():
+            used.append(choose_replica())
+            return used[-1]
+
+        with patch('core.replicas.choose_replica', side_effect=choose):
+            res = self.client.get(url, params)
+
+        return res, set(used)
+
+    def get_tags(self, **params):
+        """Return the tag names listed and where they were read from"""
+        res, used = self.get(reverse('tweet:tag-list'), **params)
+
+        return [tag['name'] for tag in res.data['results']], used
+
+    def test_read_your_writes(self):
+        """Test a client that wrote reads from the primary, others not"""
+        self.client.post(reverse('tweet:tag-list'), {'name': 'vegan'})
+
+        self.assertEqual(self.get_tags(), (['vegan'], {None}))
+        self.client.cookies.clear()
+        # Another URL, not to be answered from the response cache
+        with override_settings(REPLICA_MAX_LAG=0):
+            names, used = self.get_tags(page_size=10)
+        self.assertEqual(names, ['vegan'])
+        self.assertEqual(len(used), 1)
+        self.assertIn(used.pop(), MIRRORS)
+
+    def test_recent_changes_read_primary(self):
+        """Test nothing is cached from replicas that may lag the tokens"""
+        Tag.objects.create(user=self.user, name='vegan')
+
+        names, used = self.get_tags()
+
+        self.assertEqual(names, ['vegan'])
+        self.assertEqual(used, {None})
+
+    def test_settled_changes_read_replica(self):
+        """Test replicas serve versioned views once tokens are old enough"""
+        Tag.objects.create(user=self.user, name='vegan')
+        cache.bump(self.user.pk, 'tags',
+                   changed_at=timezone.now() - timedelta(minutes=1))
+
+        names, used = self.get_tags()
+
+        self.assertEqual(names, ['vegan'])
+        self.assertEqual(len(used), 1)
+        self.assertIn(used.pop(), MIRRORS)
+
+    @override_settings(TIMELINE_FAN_OUT_LIMIT=0)
+    def test_pulled_timeline_read_from_primary(self):
+        """Test the read that pulled new tweets lists them from the primary"""
+        author = get_user_model().objects.create_user(
+            'author@test.com', 'test123')
+        timeline.follow(self.user, author)
+        author.refresh_from_db()
+        tweet = Tweet.objects.create(user=author, title='popular')
+
+        res, used = self.get(reverse('tweet:timeline-list'))
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [tweet.id])
+        self.assertEqual(used, {None})
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.models import ImageBlob, Tweet
+from core.storage import ContentAddressedStorage, is_content_addressed
+from tweet.cache import get_versions, tweet_scope
+
+
+SHA = 'a9b1e3f5d0b5f0e6a6f9d9c3b1d1e0f5c2b4a6d8e0f2a4c6e8b0d2f4a6c8e0f2'
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test storing files by the hash of their content"""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+
+    def test_sharded_name(self):
+        """Test files are stored under a sharded SHA-256 name"""
+        name = self.storage.save('uploads/x.JPG', ContentFile(b'chirp'))
+
+        sha = hashlib.sha256(b'chirp').hexdigest()
+        self.assertEqual(name, f'uploads/{sha[:2]}/{sha[2:4]}/{sha}.jpg')
+        self.assertTrue(is_content_addressed(name))
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'chirp')
+
+    def test_same_content_stored_once(self):
+        """Test saving identical content twice stores one file"""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'chirp'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'chirp'))
+
+        self.assertEqual(first, second)
+        files = [
+            name for _, _, names in os.walk(self.location) for name in names
+        ]
+        self.assertEqual(len(files), 1)
+
+    def test_different_content_stored_apart(self):
+        """Test different content gets different names"""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'chirp'))
+        second = self.storage.save('uploads/a.jpg', ContentFile(b'tweet'))
+
+        self.assertNotEqual(first, second)
+
+    def test_legacy_names_not_content_addressed(self):
+        """Test uuid names are recognised as the old layout"""
+        self.assertFalse(is_content_addressed(
+            'uploads/tweet/0c5f2a4e-3b8d-4c8e-9e36-1c2f3a4b5c6d.jpg'))
+        self.assertTrue(
+            is_content_addressed(f'uploads/tweet/a9/b1/{SHA}.jpg'))
+
+
+class ImageReferenceTests(TransactionTestCase):
+    """Test stored images are shared and deleted when unused"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def tweet_with_image(self, content=b'chirp'):
+        tweet = Tweet.objects.create(user=self.user, title='Tweet')
+        tweet.image.save('picture.jpg', ContentFile(content))
+
+        return tweet
+
+    def test_shared_image_counted(self):
+        """Test tweets with the same image share one counted blob"""
+        first = self.tweet_with_image()
+        second = self.tweet_with_image()
+
+        self.assertEqual(first.image.name, second.image.name)
+        blob = ImageBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.references, 2)
+
+    def test_image_deleted_with_last_reference(self):
+        """Test a shared image is only deleted when no tweet uses it"""
+        first = self.tweet_with_image()
+        second = self.tweet_with_image()
+        path = first.image.path
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_replaced_image_released(self):
+        """Test replacing a tweet's image releases the old one"""
+        tweet = self.tweet_with_image()
+        old_path = tweet.image.path
+
+        tweet = Tweet.objects.get(pk=tweet.pk)
+        tweet.image.save('other.jpg', ContentFile(b'tweet'))
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(
+            list(ImageBlob.objects.values_list('name', flat=True)),
+            [tweet.image.name]
+        )
+
+    def test_title_update_keeps_reference(self):
+        """Test saving a tweet without changing its image keeps the count"""
+        tweet = Tweet.objects.get(pk=self.tweet_with_image().pk)
+        tweet.title = 'Edited'
+        tweet.save()
+
+        self.assertEqual(ImageBlob.objects.get().references, 1)
+
+    def test_rehash_tweet_images(self):
+        """Test the command moves legacy images into the new layout"""
+        legacy = 'uploads/tweet/0c5f2a4e-3b8d-4c8e-9e36-1c2f3a4b5c6d.jpg'
+        os.makedirs(os.path.join(self.media, 'uploads/tweet'))
+        for tweet_id in range(2):
+            path = os.path.join(self.media, f'uploads/tweet/{tweet_id}.jpg')
+            with open(path, 'wb') as image:
+                image.write(b'chirp')
+        with open(os.path.join(self.media, legacy), 'wb') as image:
+            image.write(b'chirp')
+        tweets = [
+            Tweet.objects.create(user=self.user, title=str(i))
+            for i in range(3)
+        ]
+        Tweet.objects.filter(pk=tweets[0].pk).update(image=legacy)
+        Tweet.objects.filter(pk=tweets[1].pk) \
+            .update(image='uploads/tweet/0.jpg')
+        Tweet.objects.filter(pk=tweets[2].pk) \
+            .update(image='uploads/tweet/1.jpg')
+        scopes = ['tweets'] + [tweet_scope(tweet.id) for tweet in tweets]
+        versions = get_versions(self.user.pk, scopes)
+        out = StringIO()
+
+        call_command('rehash_tweet_images', stdout=out)
+
+        new_versions = get_versions(self.user.pk, scopes)
+        for old, new in zip(versions, new_versions):
+            self.assertNotEqual(old, new)
+        for tweet in tweets:
+            self.assertGreater(
+                Tweet.objects.get(pk=tweet.pk).updated_at, tweet.updated_at)
+
+        names = set(Tweet.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_content_addressed(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 3)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.media, legacy)))
+        self.assertIn('Rewrote 3 images into 1 files', out.getvalue())
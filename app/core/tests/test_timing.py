@@ -0,0 +1,166 @@
+import json
+import re
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import timing
+from core.models import Tag, Tweet
+
+
+TWEETS_URL = reverse('tweet:tweet-list')
+
+METRIC = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?')
+
+
+def metrics(response):
+    """Return the Server-Timing metrics of a response by name"""
+    return {name: (float(duration), desc) for name, duration, desc
+            in METRIC.findall(response['Server-Timing'])}
+
+
+class TimingsTests(SimpleTestCase):
+    """Test timing parts of a request"""
+
+    def test_nested_blocks_count_once(self):
+        """Test a block inside one of the same metric is not added again"""
+        timings = timing.Timings()
+        with timings.measure('serialize'):
+            with timings.measure('serialize'):
+                pass
+            inner = timings.durations['serialize']
+
+        self.assertEqual(inner, 0)
+        self.assertGreater(timings.durations['serialize'], 0)
+
+    def test_untimed_outside_requests(self):
+        """Test timing outside a request does nothing"""
+        with timing.timed('render'):
+            pass
+
+        self.assertIsNone(timing._state.timings)
+
+    def test_header(self):
+        """Test the Server-Timing header lists every metric in ms"""
+        timings = timing.Timings()
+        timings.queries = [(0.002, 'default', 'SELECT 1', None, False)] * 2
+        timings.durations['render'] = 0.0015
+        timings.total = 0.01
+
+        self.assertEqual(
+            timings.header(),
+            'db;dur=4.000;desc="2 queries", auth;dur=0.000, '
+            'serialize;dur=0.000, render;dur=1.500, total;dur=10.000'
+        )
+
+    def test_header_resolution(self):
+        """Test phases shorter than 0.1 ms are not reported as zero"""
+        timings = timing.Timings()
+        timings.durations['render'] = 0.000012
+
+        self.assertIn('render;dur=0.012', timings.header())
+
+
+class ServerTimingTests(TestCase):
+    """Test the timings of API requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        tweet = Tweet.objects.create(user=self.user, title='Lunch')
+        tweet.tags.add(self.tag)
+
+    def test_api_request_timed(self):
+        """Test an API response reports its queries and phases"""
+        with patch('core.timing.report', wraps=timing.report) as report:
+            res = self.client.get(reverse('tweet:tag-list'))
+
+        self.assertEqual(
+            set(metrics(res)),
+            {'db', 'auth', 'serialize', 'render', 'total'}
+        )
+        self.assertRegex(metrics(res)['db'][1], r'^[1-9]\d* queries$')
+        timings = report.call_args[0][2]
+        self.assertGreater(timings.durations['serialize'], 0)
+        self.assertGreater(timings.durations['render'], 0)
+        self.assertGreaterEqual(timings.total, timings.db)
+
+    def test_queries_counted(self):
+        """Test the query count matches the queries run"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TWEETS_URL)
+
+        self.assertEqual(metrics(res)['db'][1], f'{len(queries)} queries')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        """Test timing can be turned off"""
+        res = self.client.get(TWEETS_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_sampled_requests_logged(self):
+        """Test sampled requests are logged as JSON"""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(TWEETS_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], TWEETS_URL)
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertNotIn('slow_queries', record)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_not_logged(self):
+        """Test requests outside the sample are not logged"""
+        with self.assertRaises(AssertionError), \
+                self.assertLogs('core.timing', 'INFO'):
+            self.client.get(TWEETS_URL)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0, SLOW_REQUEST_MS=0)
+    def test_slow_requests_explained(self):
+        """Test slow requests are logged with their slowest query plans"""
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(TWEETS_URL, {'tags': self.tag.id})
+
+        record = json.loads(logs.records[0].getMessage())
+        queries = record['slow_queries']
+        self.assertEqual(len(queries), min(record['queries'], 3))
+        self.assertGreaterEqual(queries[0]['ms'], queries[-1]['ms'])
+        selects = [query for query in queries
+                   if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for query in selects:
+            self.assertTrue(query['plan'])
+
+
+class ServerTimingMiddlewareTests(SimpleTestCase):
+    """Test the middleware outside the API"""
+    allow_database_queries = True
+
+    def test_every_database_timed(self):
+        """Test queries are recorded whatever view runs them"""
+        def get_response(request):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            with timing.timed('auth'):
+                pass
+            return HttpResponse()
+
+        res = timing.ServerTimingMiddleware(get_response)(
+            RequestFactory().get('/'))
+
+        self.assertEqual(metrics(res)['db'][1], '1 queries')
+        self.assertIsNone(timing._state.timings)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TransactionTestCase, override_settings
+
+from PIL import Image
+
+from core import variants
+from core.models import ImageBlob, Tweet
+from tweet.serializers import TweetDetailSerializer
+
+
+def jpeg(width, height):
+    """Return the content of a JPEG image of the given size"""
+    content = BytesIO()
+    Image.new('RGB', (width, height), 'blue').save(content, 'JPEG')
+
+    return content.getvalue()
+
+
+@override_settings(TWEET_IMAGE_WIDTHS=(320, 640, 1280), TWEET_IMAGE_WORKERS=1)
+class ImageVariantTests(TransactionTestCase):
+    """Test generating responsive variants of tweet images"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.tweet = Tweet.objects.create(user=user, title='Tweet')
+        self.tweet.image.save('picture.jpg', ContentFile(jpeg(800, 400)))
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def test_variants_narrower_than_original(self):
+        """Test variants are written for widths below the original's"""
+        variants.generate(self.tweet.image.name)
+
+        candidates = variants.srcset(self.tweet.image.name)
+        jpegs = candidates['image/jpeg']
+        self.assertEqual(
+            [width for _, width in jpegs], [320, 640, 800])
+        self.assertEqual(jpegs[-1][0], self.tweet.image.name)
+        for name, width in jpegs[:-1]:
+            with Image.open(self.tweet.image.storage.path(name)) as image:
+                self.assertEqual(image.size, (width, width // 2))
+
+    def test_webp_variants(self):
+        """Test WebP variants are written when Pillow supports WebP"""
+        variants.generate(self.tweet.image.name)
+
+        candidates = variants.srcset(self.tweet.image.name)
+        if ('WEBP', '.webp') in variants.extra_formats():
+            self.assertEqual(
+                [width for _, width in candidates['image/webp']], [320, 640])
+        else:
+            self.assertNotIn('image/webp', candidates)
+
+    def test_original_before_generation(self):
+        """Test the original is the only candidate until variants exist"""
+        name = self.tweet.image.name
+
+        self.assertEqual(variants.srcset(name), {'image/jpeg': [(name, None)]})
+
+    def test_serializer_srcset(self):
+        """Test tweet details list the variants by type"""
+        variants.generate(self.tweet.image.name)
+
+        data = TweetDetailSerializer(self.tweet).data
+
+        self.assertEqual(data['image'], self.tweet.image.url)
+        srcset = data['srcset']['image/jpeg'].split(', ')
+        self.assertEqual(len(srcset), 3)
+        self.assertTrue(srcset[0].endswith('-320w.jpg 320w'))
+        self.assertEqual(srcset[-1], f'{self.tweet.image.url} 800w')
+
+    def test_serializer_without_image(self):
+        """Test tweets without an image have no srcset"""
+        self.tweet.image.delete()
+
+        self.assertIsNone(TweetDetailSerializer(self.tweet).data['srcset'])
+
+    def test_variants_deleted_with_image(self):
+        """Test variant files are deleted with the last reference"""
+        name = self.tweet.image.name
+        variants.generate(name)
+        paths = [
+            self.tweet.image.storage.path(variant)
+            for variant in variants.variant_names(
+                ImageBlob.objects.get(name=name))
+        ]
+        self.assertTrue(paths)
+
+        self.tweet.delete()
+
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+
+    def test_broken_image_discarded(self):
+        """Test an image that does not decode is removed from its tweet"""
+        content = jpeg(800, 400)
+        self.tweet.image.save('broken.jpg', ContentFile(content[:200]))
+        path = self.tweet.image.path
+
+        variants.generate(self.tweet.image.name)
+
+        self.tweet.refresh_from_db()
+        self.assertFalse(self.tweet.image)
+        self.assertFalse(os.path.exists(path))
+
+    def test_small_image_has_no_variants(self):
+        """Test images narrower than every width are left alone"""
+        self.tweet.image.save('small.jpg', ContentFile(jpeg(100, 100)))
+
+        variants.generate(self.tweet.image.name)
+
+        self.assertEqual(
+            variants.srcset(self.tweet.image.name),
+            {'image/jpeg': [(self.tweet.image.name, 100)]}
+        )
@@ -0,0 +1,212 @@
+"""
+Per-request performance instrumentation.
+
+ServerTimingMiddleware times each request and every query run while
+handling it, on any database, through connection.execute_wrapper().
+The API views, serializers and renderers add the time they spend
+authenticating, serializing and rendering with timed().  The totals go
+out in a Server-Timing header, which browsers show next to the request,
+e.g.
+
+    Server-Timing: db;dur=12.412;desc="5 queries", auth;dur=0.318,
+        serialize;dur=2.104, render;dur=0.871, total;dur=18.235
+
+A REQUEST_TIMING_SAMPLE_RATE fraction of requests is also logged to
+core.timing as one JSON line.  Requests taking SLOW_REQUEST_MS or more
+are always logged, as warnings, with the SQL and query plan of their
+SLOW_REQUEST_EXPLAIN slowest queries.  Query parameters are left out of
+the log, they may hold personal data.
+
+Streamed bodies are produced after the response leaves the middleware,
+so the timings of streaming responses only cover building them.
+"""
+import contextlib
+import json
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+METRICS = ('auth', 'serialize', 'render')
+
+logger = logging.getLogger(__name__)
+
+
+class _State(threading.local):
+    timings = None
+
+
+_state = _State()
+_untimed = contextlib.nullcontext()
+
+
+class Timings:
+    """The time spent in each part of handling one request"""
+
+    def __init__(self):
+        self.durations = dict.fromkeys(METRICS, 0.0)
+        self.queries = []
+        self.total = 0.0
+        self._active = set()
+
+    @property
+    def db(self):
+        return sum(query[0] for query in self.queries)
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """Add the time the block takes to the metric name"""
+        # Only the outermost block counts, e.g. for nested serializers
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            self._active.discard(name)
+
+    def execute(self, alias):
+        """Return an execute wrapper recording queries run on alias"""
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append((
+                    time.perf_counter() - start, alias, sql, params, many))
+
+        return wrapper
+
+    def header(self):
+        """Return the Server-Timing header value, durations in ms"""
+        # Microsecond resolution, cheap phases would round to zero in ms
+        metrics = [
+            f'db;dur={self.db * 1000:.3f};desc="{len(self.queries)} queries"'
+        ]
+        metrics.extend(
+            f'{name};dur={self.durations[name] * 1000:.3f}'
+            for name in METRICS
+        )
+        metrics.append(f'total;dur={self.total * 1000:.3f}')
+
+        return ', '.join(metrics)
+
+
+def timed(name):
+    """Return a context manager adding its time to the current request"""
+    timings = _state.timings
+    if timings is None:
+        return _untimed
+
+    return timings.measure(name)
+
+
+def explain(alias, sql, params):
+    """Return the query plan of a SELECT, None if it cannot be explained"""
+    connection = connections[alias]
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+
+    # PostgreSQL returns a line per row, SQLite the detail last
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def slow_queries(timings):
+    """Return the slowest queries of a request with their query plans"""
+    queries = sorted(timings.queries, key=lambda query: query[0],
+                     reverse=True)
+    slowest = []
+    for duration, alias, sql, params, many in \
+            queries[:settings.SLOW_REQUEST_EXPLAIN]:
+        plan = None
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            plan = explain(alias, sql, params)
+        slowest.append({
+            'alias': alias,
+            'sql': sql,
+            'ms': round(duration * 1000, 1),
+            'plan': plan,
+        })
+
+    return slowest
+
+
+def report(request, response, timings):
+    """Log the timings of sampled and slow requests"""
+    slow = timings.total * 1000 >= settings.SLOW_REQUEST_MS
+    if not slow and random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+        return
+
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(timings.total * 1000, 1),
+        'db_ms': round(timings.db * 1000, 1),
+        'queries': len(timings.queries),
+    }
+    for name in METRICS:
+        record[f'{name}_ms'] = round(timings.durations[name] * 1000, 1)
+
+    if slow:
+        record['slow_queries'] = slow_queries(timings)
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+
+
+class ServerTimingMiddleware:
+    """Time requests, their queries and API phases"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SERVER_TIMING:
+            return self.get_response(request)
+
+        timings = Timings()
+        start = time.perf_counter()
+        _state.timings = timings
+        try:
+            with contextlib.ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(
+                        timings.execute(alias)))
+                response = self.get_response(request)
+        finally:
+            _state.timings = None
+        timings.total = time.perf_counter() - start
+
+        response['Server-Timing'] = timings.header()
+        report(request, response, timings)
+
+        return response
+
+
+class TimingMixin:
+    """Time the authentication of API views"""
+
+    def perform_authentication(self, request):
+        with timed('auth'):
+            super().perform_authentication(request)
+
+
+class TimedSerializerMixin:
+    """Time representing instances as serialization"""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,172 @@
+"""
+Responsive width variants of tweet images.
+
+After an image is uploaded it is resized to each of TWEET_IMAGE_WIDTHS
+narrower than the original, in the original format plus WebP and AVIF
+where Pillow can write them.  Resizing runs on the images job queue, in
+a process pool, and the finished variants are recorded on the image's
+ImageBlob, so identical uploads share them.  Until then clients fall back
+to the original.  Images that turn out not to decode are removed from
+their tweets.
+"""
+import json
+import mimetypes
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from PIL import Image, ImageOps, features
+
+from core import jobs
+from core.models import ImageBlob, Tweet
+
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+    'AVIF': {'quality': 60},
+}
+
+_processes = None
+
+
+def extra_formats():
+    """Return the modern formats this Pillow build can encode"""
+    Image.init()
+    formats = []
+    if features.check('webp'):
+        formats.append(('WEBP', '.webp'))
+    if 'AVIF' in Image.SAVE:
+        formats.append(('AVIF', '.avif'))
+
+    return formats
+
+
+def render(path, widths, formats):
+    """
+    Write the width variants of the image at path next to it.
+
+    Returns the original's width and the file names of the variants by
+    MIME type.  Runs in a worker process, without touching the database.
+    """
+    base, ext = os.path.splitext(path)
+    variants = {}
+    with Image.open(path) as original:
+        if getattr(original, 'is_animated', False):
+            return original.width, variants
+        original_format = original.format
+        image = ImageOps.exif_transpose(original)
+        encodings = [(original_format, ext)] + list(formats)
+
+        for width in sorted(widths):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for image_format, suffix in encodings:
+                frame = resized
+                if image_format == 'JPEG' and frame.mode not in ('RGB', 'L'):
+                    frame = frame.convert('RGB')
+                target = f'{base}-{width}w{suffix}'
+                temp = f'{target}.tmp'
+                frame.save(
+                    temp, image_format, **SAVE_OPTIONS.get(image_format, {}))
+                os.replace(temp, target)
+                mime = Image.MIME.get(image_format) \
+                    or mimetypes.guess_type(target)[0]
+                variants.setdefault(mime, []).append(
+                    [width, os.path.basename(target)])
+
+        return original.width, variants
+
+
+def get_variants(blob):
+    """Return the recorded variants of an ImageBlob, or None"""
+    return json.loads(blob.variants) if blob.variants else None
+
+
+def variant_names(blob):
+    """Return the stored names of the variant files of an ImageBlob"""
+    recorded = get_variants(blob)
+    if not recorded:
+        return []
+    directory = os.path.dirname(blob.name)
+
+    return [
+        os.path.join(directory, filename)
+        for candidates in recorded['variants'].values()
+        for _, filename in candidates
+    ]
+
+
+def srcset(name):
+    """
+    Return the srcset candidates of a stored image by MIME type.
+
+    Candidates are (stored name, width) pairs; the width of the original
+    is None until its variants have been generated.
+    """
+    original_type = mimetypes.guess_type(name)[0] or 'image/*'
+    blob = ImageBlob.objects.filter(name=name).only('name', 'variants') \
+        .first()
+    recorded = get_variants(blob) if blob else None
+    if not recorded:
+        return {original_type: [(name, None)]}
+
+    directory = os.path.dirname(name)
+    candidates = {
+        mime: [(os.path.join(directory, filename), width)
+               for width, filename in variants]
+        for mime, variants in recorded['variants'].items()
+    }
+    candidates.setdefault(original_type, []).append(
+        (name, recorded['width']))
+
+    return candidates
+
+
+def _process_pool():
+    global _processes
+    if _processes is None:
+        _processes = ProcessPoolExecutor(settings.TWEET_IMAGE_WORKERS)
+
+    return _processes
+
+
+@jobs.task(queue='images')
+def generate(name):
+    """Generate and record the variants of a stored image"""
+    blob = ImageBlob.objects.filter(name=name).first()
+    if blob is None or blob.variants:
+        return
+
+    path = Tweet._meta.get_field('image').storage.path(name)
+    try:
+        width, variants = _process_pool().submit(
+            render, path, settings.TWEET_IMAGE_WIDTHS, extra_formats()
+        ).result()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        discard(name)
+        return
+    ImageBlob.objects.filter(pk=blob.pk) \
+        .update(variants=json.dumps({'width': width, 'variants': variants}))
+
+    # Cached tweet details still list the original only
+    from tweet.cache import bump, tweet_scope
+    for user_id, tweet_id in Tweet.objects.filter(image=name) \
+            .values_list('user_id', 'id'):
+        bump(user_id, tweet_scope(tweet_id))
+
+
+def discard(name):
+    """Remove an image that does not decode from the tweets using it"""
+    for tweet in Tweet.objects.filter(image=name):
+        tweet.image = None
+        tweet.save(update_fields=['image', 'updated_at'])
+
+
+def schedule(name):
+    """Queue generating the variants of an uploaded image"""
+    return generate.delay(name)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class TweetConfig(AppConfig):
     name = 'tweet'
+
+    def ready(self):
+        from tweet import cache
+
+        cache.connect_signals()
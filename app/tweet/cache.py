@@ -0,0 +1,217 @@
+"""
+Per-user response caching for the tweet API.
+
+Cached responses are keyed by the version tokens of the data they were
+built from.  Each user has a token per scope (their tweets, tags and
+descriptions, plus one per tweet), and model signals replace a token as
+soon as any row in its scope changes, so stale entries are never read
+again and simply age out of the cache.  A token also records when its
+scope last changed, which the conditional GET support builds on.
+
+Responses built from a replica could predate the newest token, and be
+cached or validated under it for good, so views read from the primary
+until their newest token is older than the lag replicas are allowed.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils import timezone
+
+from rest_framework.response import Response
+
+from core import replicas
+from core.models import Tag, Description, Tweet, User
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(user_id, scope):
+    return f'tweet:v:{user_id}:{scope}'
+
+
+def _new_token(changed_at=None):
+    return f'{changed_at or time.time():.6f}-{uuid.uuid4().hex[:8]}'
+
+
+def get_versions(user_id, scopes):
+    """Return the current version token of each scope of a user"""
+    cache = get_cache()
+    keys = [_version_key(user_id, scope) for scope in scopes]
+    found = cache.get_many(keys)
+
+    versions = []
+    for key in keys:
+        if key not in found:
+            token = _new_token()
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key, token)
+            found[key] = token
+        versions.append(found[key])
+
+    return versions
+
+
+def token_time(token):
+    """Return the time a version token was issued, as a Unix timestamp"""
+    return float(token.split('-')[0])
+
+
+def bump(user_id, *scopes, changed_at=None):
+    """
+    Invalidate everything cached from scopes of a user.
+
+    Tokens are replaced immediately and again once the transaction commits,
+    so a response cached by a concurrent request between the change and
+    the commit is not served afterwards.  changed_at is the datetime the
+    change was recorded at and defaults to now.
+    """
+    if changed_at is not None:
+        changed_at = changed_at.timestamp()
+
+    def replace():
+        get_cache().set_many(
+            {_version_key(user_id, scope): _new_token(changed_at)
+             for scope in scopes},
+            timeout=None
+        )
+
+    replace()
+    transaction.on_commit(replace)
+
+
+def tweet_scope(tweet_id):
+    return f'tweet:{tweet_id}'
+
+
+def response_key(user_id, name, versions, url):
+    """Return the cache key of a response built from versioned scopes"""
+    digest = hashlib.md5('|'.join([url] + versions).encode('utf-8'))
+
+    return f'tweet:r:{user_id}:{name}:{digest.hexdigest()}'
+
+
+class VersionedViewMixin:
+    """
+    Look up the version tokens of the scopes a view's responses depend on.
+
+    Views list the scopes a response depends on in get_cache_scopes().
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def get_versions(self):
+        """Return the version tokens of the current request's scopes"""
+        if getattr(self, '_versions', None) is None:
+            self._versions = get_versions(
+                self.request.user.pk, self.get_cache_scopes())
+            replicas.use_primary(
+                since=max(token_time(token) for token in self._versions))
+
+        return self._versions
+
+
+class CachedResponseMixin(VersionedViewMixin):
+    """Serve the responses of cached_actions from the response cache"""
+    cached_actions = ('list',)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        key = response_key(
+            request.user.pk,
+            self.basename,
+            self.get_versions(),
+            request.build_absolute_uri()
+        )
+        cache = get_cache()
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+
+        return response
+
+
+def _changed_at(instance, signal):
+    """Return when a saved row changed; deletions happen now"""
+    return instance.updated_at if signal is post_save else None
+
+
+def _bump_tag(sender, instance, signal, **kwargs):
+    bump(instance.user_id, 'tags',
+         changed_at=_changed_at(instance, signal))
+
+
+def _bump_description(sender, instance, signal, **kwargs):
+    bump(instance.user_id, 'descriptions',
+         changed_at=_changed_at(instance, signal))
+
+
+def _bump_tweet(sender, instance, signal, **kwargs):
+    bump(instance.user_id, 'tweets', tweet_scope(instance.pk),
+         changed_at=_changed_at(instance, signal))
+
+
+def _bump_user(sender, instance, created, **kwargs):
+    # Ids can be reused once rows are rolled back or the database is reset
+    if created:
+        bump(instance.pk, 'tweets', 'tags', 'descriptions')
+
+
+def _bump_tweet_relations(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    # Changing a tweet's tags or descriptions counts as changing the tweet
+    now = timezone.now()
+    if isinstance(instance, Tweet):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Tweet.objects.filter(pk=instance.pk).update(updated_at=now)
+            instance.updated_at = now
+            bump(instance.user_id, 'tweets', tweet_scope(instance.pk),
+                 changed_at=now)
+        return
+
+    if action == 'pre_clear':
+        field = 'tags' if isinstance(instance, Tag) else 'descriptions'
+        tweets = Tweet.objects.filter(**{field: instance})
+    elif action in ('post_add', 'post_remove'):
+        tweets = Tweet.objects.filter(pk__in=pk_set)
+    else:
+        return
+
+    changed = list(tweets.values_list('user_id', 'id'))
+    Tweet.objects.filter(pk__in=[tweet_id for _, tweet_id in changed]) \
+        .update(updated_at=now)
+    for user_id, tweet_id in changed:
+        bump(user_id, 'tweets', tweet_scope(tweet_id), changed_at=now)
+
+
+def connect_signals():
+    """Invalidate cached responses whenever their data changes"""
+    post_save.connect(_bump_tag, sender=Tag)
+    post_delete.connect(_bump_tag, sender=Tag)
+    post_save.connect(_bump_description, sender=Description)
+    post_delete.connect(_bump_description, sender=Description)
+    post_save.connect(_bump_tweet, sender=Tweet)
+    post_delete.connect(_bump_tweet, sender=Tweet)
+    post_save.connect(_bump_user, sender=User)
+    for through in (Tweet.tags.through, Tweet.descriptions.through):
+        m2m_changed.connect(_bump_tweet_relations, sender=through)
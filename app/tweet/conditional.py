@@ -0,0 +1,60 @@
+"""
+Conditional GET support for the tweet API.
+
+Validators are derived from the same per-user version tokens that key the
+response cache: the ETag digests the tokens together with the URL and the
+negotiated format, and Last-Modified is the newest time a token was
+issued.  Both come straight from the cache, so a request for an unchanged
+resource is answered with 304 Not Modified before the database is queried
+or anything is serialized.  Workers and management commands replace
+tokens in the same shared cache, see core.checks, so their changes are
+never answered with 304.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from tweet.cache import VersionedViewMixin, token_time
+
+
+def make_validators(path, format, versions):
+    """Return the ETag and Last-Modified time of a versioned response"""
+    digest = hashlib.md5('|'.join([path, format] + versions).encode('utf-8'))
+    last_modified = max(token_time(version) for version in versions)
+
+    return quote_etag(digest.hexdigest()), int(last_modified)
+
+
+class ConditionalResponseMixin(VersionedViewMixin):
+    """Answer conditional GETs of conditional_actions without a body"""
+    conditional_actions = ('list',)
+
+    def get_validators(self):
+        """Return the ETag and Last-Modified time of the response"""
+        return make_validators(
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            self.get_versions()
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
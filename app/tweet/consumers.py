@@ -0,0 +1,189 @@
+"""
+The tweet API and user reads under ASGI.
+
+GETs and HEADs of the tag, description and tweet lists, of their streams,
+of tweet details and of the authenticated user are served by consumers
+on the event loop.  Django's ORM is synchronous, so the middleware and
+the view still run in the thread pool, but only while they build the
+response; the body is sent from the event loop afterwards.  Streamed
+lists are produced a chunk per thread pool call, see tweet.streaming, and
+each chunk is sent before the next is read, so a long stream neither
+holds a thread between chunks nor runs its queries on the event loop.
+daphne buffers what slow clients have not read yet.
+
+Polling clients mostly revalidate responses they already have.  For the
+tag, description and tweet reads, such requests are answered from the
+version tokens in the cache: the token's user and the versions are
+looked up without a database query or the DRF pipeline.  Revalidations
+still pass through the middleware, like every other request.
+"""
+from types import SimpleNamespace
+
+from channels.db import database_sync_to_async
+from channels.generic.http import AsyncHttpConsumer
+from channels.http import AsgiHandler, AsgiRequest
+
+from django.core import signals
+from django.core.handlers.base import BaseHandler
+from django.urls import set_script_prefix
+from django.utils.cache import get_conditional_response, \
+    patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework import HTTP_HEADER_ENCODING
+from rest_framework.settings import api_settings
+
+from tweet import views
+from tweet.cache import get_versions
+from tweet.conditional import make_validators
+from user import authentication
+
+
+# Accept headers DRF answers with the JSON renderer
+JSON_MEDIA_TYPES = {'application/json', 'application/*', '*/*'}
+
+_handler = None
+
+
+class RevalidatingHandler(BaseHandler):
+    """Handler answering a request's revalidation shortcut, if it has one"""
+
+    def _get_response(self, request):
+        revalidate = getattr(request, 'revalidate', None)
+        response = revalidate() if revalidate is not None else None
+        if response is None:
+            response = super()._get_response(request)
+
+        return response
+
+
+def get_handler():
+    """Return a Django handler with the middleware loaded"""
+    global _handler
+    if _handler is None:
+        handler = RevalidatingHandler()
+        handler.load_middleware()
+        _handler = handler
+
+    return _handler
+
+
+def get_response(request):
+    """Run a request through the middleware and views"""
+    set_script_prefix(request.META.get('SCRIPT_NAME', ''))
+    signals.request_started.send(sender=AsgiHandler)
+
+    return get_handler().get_response(request)
+
+
+def wants_json(request):
+    """Return whether DRF would render request with the JSON renderer"""
+    format_kwarg = api_settings.URL_FORMAT_OVERRIDE
+    if format_kwarg in request.GET:
+        return request.GET[format_kwarg] == 'json'
+
+    accept = request.META.get('HTTP_ACCEPT') or '*/*'
+    media_types = {
+        media_type.split(';')[0].strip() for media_type in accept.split(',')
+    }
+
+    return media_types <= JSON_MEDIA_TYPES
+
+
+def token_key(request):
+    """Return the token of a Token authorization header, if any"""
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    auth = auth.encode(HTTP_HEADER_ENCODING).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    try:
+        return auth[1].decode()
+    except UnicodeError:
+        return None
+
+
+class ReadConsumer(AsyncHttpConsumer):
+    """Serve a read endpoint, revalidating cached responses cheaply"""
+    viewset = None
+    action = None
+
+    async def handle(self, body):
+        request = AsgiRequest(self.scope, body)
+        if self.viewset is not None:
+            request.revalidate = lambda: self.not_modified(request)
+        response = await database_sync_to_async(get_response)(request)
+        try:
+            await self.send_django_response(response)
+        finally:
+            await database_sync_to_async(response.close)()
+
+    async def send_django_response(self, response):
+        """Send a response, reading streamed content in the thread pool"""
+        messages = AsgiHandler.encode_response(response)
+        # The start message comes before any content is read
+        await self.send(next(messages))
+        if not response.streaming:
+            for message in messages:
+                await self.send(message)
+            return
+
+        chunks = iter(response)
+        read = database_sync_to_async(next)
+        while True:
+            chunk = await read(chunks, None)
+            if chunk is None:
+                break
+            for part, _ in AsgiHandler.chunk_bytes(chunk):
+                await self.send_body(part, more_body=True)
+        await self.send_body(b'')
+
+    def not_modified(self, request):
+        """Return 304 Not Modified if the client's copy is current"""
+        if request.method not in ('GET', 'HEAD') \
+                or 'HTTP_IF_NONE_MATCH' not in request.META \
+                or not wants_json(request):
+            return None
+        key = token_key(request)
+        user = key and authentication.cached_user(key)
+        if not user:
+            return None
+
+        view = self.viewset(
+            action=self.action,
+            kwargs=self.scope['url_route']['kwargs'],
+            request=SimpleNamespace(user=user)
+        )
+        versions = get_versions(user.pk, view.get_cache_scopes())
+        etag, last_modified = make_validators(
+            request.get_full_path(), 'json', versions)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None or response.status_code != 304:
+            return None
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # As the negotiated renderer would
+        patch_vary_headers(response, ('Accept',))
+
+        return response
+
+
+class TagListConsumer(ReadConsumer):
+    viewset = views.TagViewSet
+    action = 'list'
+
+
+class DescriptionListConsumer(ReadConsumer):
+    viewset = views.DescriptionViewSet
+    action = 'list'
+
+
+class TweetListConsumer(ReadConsumer):
+    viewset = views.TweetViewSet
+    action = 'list'
+
+
+class TweetDetailConsumer(ReadConsumer):
+    viewset = views.TweetViewSet
+    action = 'retrieve'
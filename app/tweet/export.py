@@ -0,0 +1,109 @@
+"""
+Account archives.
+
+A user's archive is a ZIP of manifest.ndjson, one JSON line for each of
+their tags, descriptions and tweets with a "type" key naming which,
+followed by the images of their tweets under their storage names.  The
+rows are read in chunks and the archive is produced while it is sent,
+see core.archives.
+
+The manifest of a download is rendered once to measure it before it is
+sent.  The measurement is cached under the version of the data it was
+taken from, so resuming a download does not render it again.  Archives
+built without a version, which export_chirps writes once from start to
+end, spool the manifest instead and render it a single time.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+
+from core.archives import Archive, Entry, checked, file_entries, measure, \
+    spooled_entry
+from core.media import UnsatisfiableRange, parse_range
+from core.models import Tag, Description, Tweet
+from tweet import serializers, streaming
+
+
+MANIFEST = 'manifest.ndjson'
+
+
+def manifest_chunks(user, chunk_size):
+    """Yield the lines of user's manifest, a chunk of rows at a time"""
+    sources = (
+        ('tag', serializers.TagSerializer, Tag.objects.filter(user=user)),
+        ('description', serializers.DescriptionSerializer,
+         Description.objects.filter(user=user)),
+        ('tweet', serializers.TweetExportSerializer,
+         Tweet.objects.filter(user=user)),
+    )
+    for kind, serializer_class, queryset in sources:
+        chunks = streaming.iter_chunks(
+            serializer_class, queryset, ('id',), chunk_size)
+        yield from streaming.stream_ndjson(
+            [dict(type=kind, **item) for item in chunk] for chunk in chunks)
+
+
+def image_names(user):
+    """Return the storage names of the images of user's tweets"""
+    return list(
+        Tweet.objects.filter(user=user).exclude(image='')
+        .order_by('image').values_list('image', flat=True).distinct()
+    )
+
+
+def build(user, version=None):
+    """Return the layout of user's archive, version naming their data"""
+    read = partial(manifest_chunks, user, settings.API_STREAM_CHUNK_SIZE)
+    if version is None:
+        manifest = spooled_entry(MANIFEST, read())
+    else:
+        manifest = _measured_manifest(user, version, read)
+
+    return Archive([manifest] + file_entries(image_names(user)))
+
+
+def _measured_manifest(user, version, read):
+    """Return the manifest entry, measured once per version"""
+    cache = caches[settings.ARCHIVE_CACHE_ALIAS]
+    key = f'archive:manifest:{user.pk}:{version}'
+    measured = cache.get(key)
+    if measured is None:
+        measured = measure(read())
+        cache.set(key, measured, settings.ARCHIVE_CACHE_TIMEOUT)
+    size, crc = measured
+
+    def read_manifest(skip):
+        return checked(read(), size, crc, skip)
+
+    return Entry(MANIFEST, size, crc, read_manifest)
+
+
+def send(request, archive, etag):
+    """Return a response streaming archive, a single range of it if asked"""
+    byte_range = None
+    # A range of an archive that changed since the client saw it is useless
+    if 'HTTP_RANGE' in request.META and \
+            request.META.get('HTTP_IF_RANGE', etag) == etag:
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], archive.size)
+        except UnsatisfiableRange:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{archive.size}'
+            return response
+
+    start, end = byte_range or (0, archive.size - 1)
+    response = StreamingHttpResponse(
+        archive.iter_bytes(start, end),
+        status=200 if byte_range is None else 206,
+        content_type='application/zip'
+    )
+    if byte_range is not None:
+        response['Content-Range'] = f'bytes {start}-{end}/{archive.size}'
+    response['Content-Length'] = end - start + 1
+    response['Content-Disposition'] = 'attachment; filename="chirps.zip"'
+    # Let nginx pass chunks on as they are produced
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
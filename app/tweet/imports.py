@@ -0,0 +1,419 @@
+"""
+Bulk imports of tags, descriptions and tweets.
+
+Reads the NDJSON manifest of an account archive (see tweet.export), or
+the archive itself along with its images.  Each line is a record with a
+"type" key of "tag", "description" or "tweet" (the default).  Tweets
+name their tags and descriptions either by the ids of earlier records or
+by name; either way the names are deduplicated against the user's
+existing tags and descriptions.
+
+Tweets are inserted a batch at a time with ids allocated up front, so
+the rows of the many to many tables can be written right after them
+without reading anything back: with COPY on PostgreSQL and with
+bulk_create elsewhere.  No model signals are sent.  The caches are
+bumped and image references counted per batch instead, and imported
+tweets are not fanned out to followers' timelines.
+
+After every batch the position reached is written to a checkpoint file.
+The batch in flight is recorded there before it commits, by the range of
+ids allocated to it, so a restarted import neither repeats nor skips it.
+Images stored for a batch that fails are deleted again unless something
+else uses them.
+
+Only PostgreSQL allocates ids from the tweet sequence.  Elsewhere they
+follow the highest id in the table, so the import must run alone: a
+tweet inserted meanwhile can take one of the ids, which fails the batch.
+"""
+import csv
+import io
+import json
+import os
+import posixpath
+import zipfile
+from collections import Counter
+
+from django.core.files import File
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import images, variants
+from core.models import Tag, Description, Tweet, tweet_image_file_path
+from core.renderers import orjson
+from core.storage import is_content_addressed
+from tweet import cache
+from tweet.export import MANIFEST
+
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+class ImportFailed(Exception):
+    """The records cannot be imported"""
+
+
+class Checkpoint:
+    """Progress of an import, saved to a file after each batch"""
+
+    def __init__(self, path, source, user):
+        self.path = path
+        self.state = {'source': source, 'user': user.email,
+                      'position': 0, 'pending': None}
+        if path is None or not os.path.exists(path):
+            return
+
+        with open(path) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if (state['source'], state['user']) != (source, user.email):
+            raise ImportFailed(
+                f'{path} is the checkpoint of importing {state["source"]} '
+                f'for {state["user"]}')
+        self.state = state
+
+        pending = state['pending']
+        if pending:
+            first_id = pending['first_id']
+            last_id = pending.get('last_id', first_id)
+            # Rows inserted meanwhile may hold some ids of an uncommitted
+            # batch, never all of them
+            imported = Tweet.objects.filter(
+                user=user, id__gte=first_id, id__lte=last_id).count()
+            if imported >= pending.get('count', 1):
+                # The batch committed before its checkpoint could be saved
+                self.state.update(
+                    position=pending['position'], pending=None)
+
+    @property
+    def position(self):
+        return self.state['position']
+
+    def begin(self, position, ids):
+        """Record the batch ending at position before it commits"""
+        self.state['pending'] = {
+            'position': position, 'first_id': min(ids),
+            'last_id': max(ids), 'count': len(ids)
+        }
+        self._save()
+
+    def commit(self, position):
+        """Record that every record before position is imported"""
+        self.state.update(position=position, pending=None)
+        self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump(self.state, checkpoint_file)
+        os.replace(temp_path, self.path)
+
+
+class NameMap:
+    """Map the records of a user's tags or descriptions to their ids"""
+
+    def __init__(self, model, user, scope):
+        self.model = model
+        self.user = user
+        self.scope = scope
+        self.by_name = {}
+        self.by_source_id = {}
+        self.pending = {}
+        self.created = 0
+
+    def add(self, source_id, name):
+        """Take a record, its name is resolved with the next batch"""
+        self.pending[source_id] = name
+
+    def resolve(self, names, batch_size):
+        """Find or create the pending records and names"""
+        names = set(names) | set(self.pending.values())
+        names.difference_update(self.by_name)
+        if names:
+            self._find(names, batch_size)
+            missing = names.difference(self.by_name)
+            self.model.objects.bulk_create(
+                [self.model(user=self.user, name=name)
+                 for name in sorted(missing)],
+                batch_size=batch_size
+            )
+            self.created += len(missing)
+            self._find(missing, batch_size)
+            if missing:
+                cache.bump(self.user.pk, self.scope)
+
+        for source_id, name in self.pending.items():
+            self.by_source_id[source_id] = self.by_name[name]
+        self.pending.clear()
+
+    def _find(self, names, batch_size):
+        names = sorted(names)
+        for start in range(0, len(names), batch_size):
+            rows = self.model.objects.filter(
+                user=self.user, name__in=names[start:start + batch_size]
+            ).order_by('-id').values_list('name', 'id')
+            # Of several rows with a name, the oldest wins
+            self.by_name.update(rows)
+
+    def ids(self, refs, position):
+        """Return the ids of a tweet's references, ids or names"""
+        ids = set()
+        for ref in refs:
+            if isinstance(ref, str):
+                ids.add(self.by_name[ref])
+            elif ref in self.by_source_id:
+                ids.add(self.by_source_id[ref])
+            else:
+                raise ImportFailed(
+                    f'Record {position}: unknown '
+                    f'{self.model._meta.verbose_name} {ref}')
+
+        return sorted(ids)
+
+
+class Importer:
+    """Import records for a user, batch_size tweets at a time"""
+
+    def __init__(self, user, batch_size, archive=None, checkpoint=None,
+                 progress=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.archive = archive
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.db = router.db_for_write(Tweet)
+        self.connection = connections[self.db]
+        self.maps = {
+            'tags': NameMap(Tag, user, 'tags'),
+            'descriptions': NameMap(Description, user, 'descriptions'),
+        }
+        self.tweets = 0
+        self.links = 0
+
+    @property
+    def rows(self):
+        """Return the number of rows inserted so far"""
+        return self.tweets + self.links + sum(
+            names.created for names in self.maps.values())
+
+    def run(self, lines):
+        """Import the records of lines, from the checkpoint on"""
+        start = self.checkpoint.position if self.checkpoint else 0
+        batch = []
+        position = 0
+        for position, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+                kind = record.get('type', 'tweet')
+                if kind in ('tag', 'description'):
+                    self.maps[kind + 's'].add(record['id'], record['name'])
+            except (AttributeError, KeyError, ValueError) as exc:
+                raise ImportFailed(f'Record {position}: invalid, {exc!r}')
+
+            if kind not in ('tag', 'description', 'tweet'):
+                raise ImportFailed(f'Record {position}: unknown type {kind}')
+            if kind == 'tweet' and position > start:
+                batch.append((position, record))
+                if len(batch) >= self.batch_size:
+                    self._import(batch, position)
+                    batch = []
+
+        if batch or position > start:
+            self._import(batch, position)
+
+    def _import(self, batch, position):
+        for record_position, record in batch:
+            self._check(record, record_position)
+        for field, names in self.maps.items():
+            names.resolve(
+                (ref for _, record in batch
+                 for ref in record.get(field, ()) if isinstance(ref, str)),
+                self.batch_size
+            )
+        if not batch:
+            if self.checkpoint:
+                self.checkpoint.commit(position)
+            return
+
+        saved = []
+        try:
+            tweets = self._insert_batch(batch, position, saved)
+        except Exception as exc:
+            images.discard(saved)
+            if isinstance(exc, IntegrityError) and \
+                    self.connection.vendor != 'postgresql':
+                raise ImportFailed(
+                    f'Tweet ids taken by another insert ({exc}), the import '
+                    f'must run alone on {self.connection.vendor}') from exc
+            raise
+
+        self.tweets += len(tweets)
+        if self.checkpoint:
+            self.checkpoint.commit(position)
+        if self.progress:
+            self.progress(position, self)
+
+    def _insert_batch(self, batch, position, saved):
+        """Insert a batch of tweets, return their rows"""
+        with transaction.atomic(using=self.db):
+            ids = self._allocate_ids(len(batch))
+            if self.checkpoint:
+                self.checkpoint.begin(position, ids)
+            stored = self._store_images(
+                (record for _, record in batch), saved)
+
+            now = timezone.now()
+            tweets = []
+            links = {field: [] for field in self.maps}
+            for tweet_id, (record_position, record) in zip(ids, batch):
+                image = stored.get(record.get('image') or '', '')
+                tweets.append((tweet_id, self.user.pk, record['title'],
+                               image, now))
+                for field, names in self.maps.items():
+                    links[field].extend(
+                        (tweet_id, related_id) for related_id in
+                        names.ids(record.get(field, ()), record_position))
+
+            self._insert(Tweet, ('id', 'user', 'title', 'image', 'updated_at'),
+                         tweets)
+            for field, rows in links.items():
+                m2m = Tweet._meta.get_field(field)
+                self._insert(
+                    m2m.remote_field.through,
+                    (m2m.m2m_field_name(), m2m.m2m_reverse_field_name()),
+                    rows
+                )
+                self.links += len(rows)
+
+            references = Counter(tweet[3] for tweet in tweets if tweet[3])
+            images.acquire_many(references)
+            cache.bump(self.user.pk, 'tweets')
+
+        return tweets
+
+    def _check(self, record, position):
+        title = record.get('title')
+        max_length = Tweet._meta.get_field('title').max_length
+        if not isinstance(title, str) or not 0 < len(title) <= max_length:
+            raise ImportFailed(
+                f'Record {position}: expected a title of 1 to '
+                f'{max_length} characters')
+
+    def _allocate_ids(self, count):
+        table = Tweet._meta.db_table
+        if self.connection.vendor == 'postgresql':
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                    'FROM generate_series(1, %s)',
+                    [table, Tweet._meta.pk.column, count]
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+        # Inside the transaction inserting them, after the highest id; a
+        # concurrent insert may take the same ids
+        highest = Tweet.objects.using(self.db).aggregate(Max('id'))
+        first = (highest['id__max'] or 0) + 1
+
+        return list(range(first, first + count))
+
+    def _insert(self, model, fields, rows):
+        """Insert rows of values of fields into model's table"""
+        if not rows:
+            return
+
+        columns = [model._meta.get_field(name).column for name in fields]
+        if self.connection.vendor != 'postgresql':
+            model.objects.using(self.db).bulk_create(
+                [model(**dict(zip(columns, row))) for row in rows],
+                batch_size=self.batch_size
+            )
+            return
+
+        data = io.StringIO()
+        # Quoted so empty strings are not read as NULL
+        csv.writer(data, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        data.seek(0)
+        quote = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (
+                    quote(model._meta.db_table),
+                    ', '.join(quote(column) for column in columns)
+                ),
+                data
+            )
+
+    def _store_images(self, records, saved):
+        """
+        Return the stored name of each image of records by its name.
+
+        The names of the files saved from the archive are added to saved.
+        Their variants are queued in the transaction, so only once it
+        commits.
+        """
+        storage = images.get_storage()
+        stored = {}
+        for record in records:
+            name = record.get('image')
+            if not name or name in stored:
+                continue
+            if is_content_addressed(name) and storage.exists(name):
+                # Content addressed, so already stored with this content
+                stored[name] = name
+            elif self.archive is not None and name in self.archive:
+                with self.archive.open(name) as image:
+                    stored[name] = storage.save(
+                        tweet_image_file_path(None, posixpath.basename(name)),
+                        File(image)
+                    )
+                saved.append(stored[name])
+                variants.schedule(stored[name])
+            elif self.archive is None and storage.exists(name):
+                stored[name] = name
+
+        return stored
+
+
+class Source:
+    """The records to import: NDJSON, or an archive and its images"""
+
+    def __init__(self, path, stdin=None):
+        self.path = path
+        self.archive = None
+        if path == '-':
+            self.file = stdin
+        elif zipfile.is_zipfile(path):
+            self.archive = ZipImages(path)
+            self.file = self.archive.zip_file.open(MANIFEST)
+        else:
+            self.file = open(path, 'rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.file is not None and self.path != '-':
+            self.file.close()
+        if self.archive is not None:
+            self.archive.zip_file.close()
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+class ZipImages:
+    """The images of an account archive by name"""
+
+    def __init__(self, path):
+        self.zip_file = zipfile.ZipFile(path)
+        self.names = set(self.zip_file.namelist())
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def open(self, name):
+        return self.zip_file.open(name)
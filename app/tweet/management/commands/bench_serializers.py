@@ -0,0 +1,99 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Description, Tweet
+from tweet.serializers import TweetSerializer
+from tweet.views import prefetch_tweet_attrs
+
+
+def best_of(repeat, func):
+    """Return the fastest of repeat runs of func, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark serializing tweet lists"""
+    help = 'Compare the per-tweet cost of serializing a list of tweets ' \
+           'through model instances and through values() rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tweets', type=int, default=500,
+            help='Tweets in the list'
+        )
+        parser.add_argument(
+            '--relations', type=int, default=3,
+            help='Tags and descriptions on each tweet'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs of each serializer, the fastest counts'
+        )
+
+    def handle(self, *args, **options):
+        count = options['tweets']
+
+        # Run against a throwaway user that is rolled back afterwards
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'bench-serializers@chirpr.invalid', None)
+            self.populate(user, count, options['relations'])
+            queryset = Tweet.objects.filter(user=user).order_by('-id')
+
+            def instances():
+                return TweetSerializer(
+                    queryset.prefetch_related(*prefetch_tweet_attrs(('id',))),
+                    many=True
+                ).data
+
+            def values():
+                return TweetSerializer.to_values_representation(
+                    TweetSerializer.values_queryset(queryset))
+
+            if instances() != values():
+                raise CommandError('The serializers disagree')
+            slow = best_of(options['repeat'], instances)
+            fast = best_of(options['repeat'], values)
+            transaction.set_rollback(True)
+
+        for name, seconds in (('instances', slow), ('values', fast)):
+            self.stdout.write(
+                f'{name}: {seconds * 1000:.1f} ms for {count} tweets, '
+                f'{seconds / count * 1e6:.1f} us per tweet'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{slow / fast:.1f}x faster'))
+
+    def populate(self, user, count, relations):
+        """Create count tweets linked to relations tags and descriptions"""
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(relations))
+        Description.objects.bulk_create(
+            Description(user=user, name=f'description {i}')
+            for i in range(relations)
+        )
+        Tweet.objects.bulk_create(
+            Tweet(user=user, title=f'tweet {i}') for i in range(count))
+        # Bulk inserts do not return ids on every backend
+        tweet_ids = list(Tweet.objects.filter(user=user)
+                         .values_list('id', flat=True))
+        tag_ids = Tag.objects.filter(user=user).values_list('id', flat=True)
+        description_ids = Description.objects.filter(user=user) \
+            .values_list('id', flat=True)
+        Tweet.tags.through.objects.bulk_create(
+            Tweet.tags.through(tweet_id=tweet_id, tag_id=tag_id)
+            for tweet_id in tweet_ids for tag_id in tag_ids
+        )
+        Tweet.descriptions.through.objects.bulk_create(
+            Tweet.descriptions.through(
+                tweet_id=tweet_id, description_id=description_id)
+            for tweet_id in tweet_ids for description_id in description_ids
+        )
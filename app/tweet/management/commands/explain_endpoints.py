@@ -0,0 +1,130 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Tag, Description
+from tweet import views
+
+
+# Plan lines that mean the database is reading a whole table or sorting
+# rows itself instead of walking an index in the requested order.
+PLAN_PROBLEMS = {
+    'postgresql': (
+        (re.compile(r'\bSeq Scan on (\w+)'), 'sequential scan on {}'),
+        (re.compile(r'(?:^|->\s+)((?:Incremental )?Sort)(?:\s+\(|$)'), '{}'),
+    ),
+    'sqlite': (
+        (re.compile(r'\bSCAN (?:TABLE )?(\w+)'), 'full scan of {}'),
+        (re.compile(r'\bUSE TEMP B-TREE FOR (\w+(?: \w+)?)'),
+         'temporary sort for {}'),
+    ),
+}
+
+
+def find_problems(vendor, plan):
+    """Return the sequential scans and sorts reported in a query plan"""
+    problems = []
+    for line in plan.splitlines():
+        for pattern, message in PLAN_PROBLEMS.get(vendor, ()):
+            match = pattern.search(line.strip())
+            if match:
+                problems.append(message.format(match.group(1)))
+
+    return problems
+
+
+def endpoint_queries(user):
+    """Return the queries each tweet API endpoint runs for user"""
+    request = _Request(user)
+    queries = []
+
+    # match=all adds a GROUP BY over the matched through rows only
+    filtered = {'tags': '1,2', 'descriptions': '1'}
+    for name, viewset, params in (
+            ('tag-list', views.TagViewSet, {}),
+            ('description-list', views.DescriptionViewSet, {}),
+            ('tweet-list', views.TweetViewSet, {}),
+            ('tweet-list-filtered', views.TweetViewSet, filtered)):
+        view = viewset(
+            action='list', request=_Request(user, params), kwargs={})
+        paginator = view.pagination_class
+        queryset = view.filter_queryset(view.get_queryset()) \
+            .order_by(*paginator.ordering)
+        queries.append((name, queryset[:paginator.page_size]))
+
+    view = views.TweetViewSet(action='retrieve', request=request, kwargs={})
+    queries.append(('tweet-detail', view.get_queryset().filter(pk=0)))
+
+    # Both tweet endpoints prefetch related rows by tweet id
+    queries.append(('tweet-tags', Tag.objects.filter(tweet__in=[0])))
+    queries.append(
+        ('tweet-descriptions', Description.objects.filter(tweet__in=[0])))
+
+    return queries
+
+
+class Command(BaseCommand):
+    """Django command to EXPLAIN the queries behind the tweet API"""
+    help = 'Report tweet API queries that scan or sort whole tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int,
+            help='Id of the user to build queries for (default: first user)'
+        )
+        parser.add_argument(
+            '--no-seqscan', action='store_true',
+            help='Discourage sequential scans on PostgreSQL, so small '
+                 'development tables show whether an index path exists'
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full plan of every query'
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Exit with an error if any endpoint has a problem'
+        )
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        user_id = options['user']
+        if user_id is None:
+            user_id = user_model.objects.values_list('pk', flat=True) \
+                .order_by('pk').first() or 0
+        user = user_model(pk=user_id)
+        vendor = connection.vendor
+
+        failed = []
+        with transaction.atomic():
+            if options['no_seqscan'] and vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in endpoint_queries(user):
+                plan = queryset.explain()
+                problems = find_problems(vendor, plan)
+                if problems:
+                    failed.append(name)
+                    self.stdout.write(self.style.WARNING(
+                        f'{name}: {", ".join(problems)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+                if options['verbose_plans'] or problems:
+                    self.stdout.write(plan)
+
+        if failed and options['fail']:
+            raise CommandError(
+                'Endpoints falling back to scans or sorts: '
+                f'{", ".join(failed)}'
+            )
+
+
+class _Request:
+    """Minimal stand-in for the request a viewset filters on"""
+
+    def __init__(self, user, query_params=None):
+        self.user = user
+        self.query_params = query_params or {}
@@ -0,0 +1,42 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tweet import export
+
+
+class Command(BaseCommand):
+    """Django command to export the archive of an account"""
+    help = 'Write the archive of a user\'s tags, descriptions, tweets ' \
+           'and images as a ZIP, as it is read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user to export')
+        parser.add_argument(
+            'output', help='Path to write the ZIP to, - for standard output')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        archive = export.build(user)
+        if options['output'] == '-':
+            self._write(archive, sys.stdout.buffer)
+            report = self.stderr
+        else:
+            with open(options['output'], 'wb') as output:
+                self._write(archive, output)
+            report = self.stdout
+
+        report.write(
+            f'Wrote {archive.size} bytes, '
+            f'{len(archive.entries) - 1} images'
+        )
+
+    def _write(self, archive, output):
+        for chunk in archive.iter_bytes():
+            output.write(chunk)
+        output.flush()
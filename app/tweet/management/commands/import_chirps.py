@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tweet import imports
+
+
+class Command(BaseCommand):
+    """Django command to bulk import tags, descriptions and tweets"""
+    help = 'Import the NDJSON records or the account archive at path ' \
+           'for a user, a batch of tweets at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user to import for')
+        parser.add_argument(
+            'path', help='NDJSON or ZIP archive to import, - for standard '
+                         'input'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Tweets inserted in each transaction'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording progress, an import restarted with it '
+                 'carries on where it stopped'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        path = options['path']
+        source = path if path == '-' else os.path.abspath(path)
+        started = time.perf_counter()
+
+        def progress(position, importer):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'{position} records read, {importer.rows} rows, '
+                    f'{importer.rows / elapsed():.0f} rows/s'
+                )
+
+        def elapsed():
+            return max(time.perf_counter() - started, 1e-9)
+
+        try:
+            checkpoint = imports.Checkpoint(
+                options['checkpoint'], source, user)
+            with imports.Source(path, sys.stdin.buffer) as records:
+                importer = imports.Importer(
+                    user,
+                    options['batch_size'],
+                    archive=records.archive,
+                    checkpoint=checkpoint,
+                    progress=progress
+                )
+                if checkpoint.position:
+                    self.stdout.write(
+                        f'Resuming after record {checkpoint.position}')
+                importer.run(records)
+        except imports.ImportFailed as exc:
+            raise CommandError(str(exc))
+
+        tags = importer.maps['tags'].created
+        descriptions = importer.maps['descriptions'].created
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.tweets} tweets, {tags} tags, '
+            f'{descriptions} descriptions and {importer.links} links in '
+            f'{elapsed():.1f}s, {importer.rows / elapsed():.0f} rows/s'
+        ))
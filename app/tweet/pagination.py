@@ -0,0 +1,174 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the row-value comparison `(a, b) > (x, y)` as
+    `a > x OR (a = x AND b > y)`, honouring each field's direction.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique, composite ordering key.
+
+    Every page is fetched with a `WHERE (key) < (cursor)` predicate and a
+    `LIMIT`, so page N costs the same as page 1 and there is never an
+    `OFFSET` to scan past.  The last ordering field must be unique.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-id',)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor['r']
+        self.has_cursor = cursor is not None
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(_invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(
+                    keyset_filter(ordering, cursor['k']))
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, within limits"""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_key(self, item):
+        """Return the ordering key of a page item"""
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(item, dict):
+            return [item[name] for name in names]
+        return [getattr(item, name) for name in names]
+
+    def encode_cursor(self, item, reverse):
+        """Return the URL pointing at the page after or before `item`"""
+        # Decimal keys, like PostgreSQL search ranks, as exact strings
+        payload = json.dumps(
+            {'k': self.get_key(item), 'r': reverse},
+            separators=(',', ':'), default=str
+        )
+        cursor = b64encode(payload.encode('utf-8')).decode('ascii')
+
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Return the cursor sent by the client, or None for page one"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')))
+            if len(cursor['k']) != len(self.ordering):
+                raise ValueError
+            cursor['r'] = bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return cursor
+
+
+class TweetPagination(KeysetPagination):
+    """Newest tweets first"""
+    ordering = ('-id',)
+
+
+class TweetSearchPagination(KeysetPagination):
+    """Best search matches first, newest first among equal ranks"""
+    ordering = ('-rank', '-id')
+
+
+class TimelinePagination(KeysetPagination):
+    """Timeline entries, newest tweets first"""
+    ordering = ('-tweet_id',)
+
+
+class TweetAttrPagination(KeysetPagination):
+    """Tags and descriptions by name, with the id as a tiebreaker"""
+    ordering = ('-name', '-id')
+
+
+def _invert(field):
+    """Flip the direction of an ordering field"""
+    return field[1:] if field.startswith('-') else f'-{field}'
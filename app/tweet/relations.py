@@ -0,0 +1,83 @@
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class UserOwnedManyRelatedField(serializers.ManyRelatedField):
+    """
+    Resolve a list of primary keys with a single query.
+
+    preload() resolves the keys of many inputs at once, such as every
+    tweet of a batch, which are then validated without further queries.
+    """
+    default_error_messages = {
+        'does_not_exist': _('Invalid pks {pk_values} - objects do not exist.'),
+        'incorrect_type': _('Incorrect type. Expected pk value, '
+                            'received {data_type}.'),
+    }
+    preloaded = None
+
+    def preload(self, inputs):
+        """Resolve every valid primary key of inputs with one query"""
+        pks = set()
+        for data in inputs:
+            if isinstance(data, str) or not hasattr(data, '__iter__'):
+                continue
+            for item in data:
+                try:
+                    if not isinstance(item, bool):
+                        pks.add(int(item))
+                except (TypeError, ValueError):
+                    pass
+        self.preloaded = self.child_relation.get_queryset().in_bulk(pks) \
+            if pks else {}
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = []
+        for item in data:
+            if isinstance(item, bool):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+            try:
+                pk = int(item)
+            except (TypeError, ValueError):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+            if pk not in pks:
+                pks.append(pk)
+        if not pks:
+            return []
+
+        found = self.preloaded
+        if found is None:
+            found = self.child_relation.get_queryset().in_bulk(pks)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            self.fail('does_not_exist',
+                      pk_values=', '.join(str(pk) for pk in missing))
+
+        return [found[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key relation limited to objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        if request is None:
+            return super().get_queryset().none()
+
+        return super().get_queryset().filter(user=request.user)
@@ -1,9 +1,101 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import IntegerField, Value
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from PIL import Image
 
+from core import variants
 from core.models import Tag, Description, Tweet
+from core.timing import TimedSerializerMixin, timed
+from tweet import cache
+from tweet.relations import UserOwnedPrimaryKeyRelatedField
+
+
+class ValuesSerializerMixin:
+    """
+    Read-only serialization of model serializers from values() rows.
+
+    values_queryset() fetches the Meta.fields columns as dicts and
+    to_values_representation() adds the ids of every many to many field
+    from a single query, without building model instances or calling any
+    field's to_representation().  Only plain column fields and primary
+    key many to many fields are supported, which render the same either
+    way.
+    """
+
+    @classmethod
+    def _many_fields(cls):
+        opts = cls.Meta.model._meta
+        return [name for name in cls.Meta.fields
+                if opts.get_field(name).many_to_many]
+
+    @classmethod
+    def values_queryset(cls, queryset, extra=()):
+        """Return queryset as dicts of the column fields and extra keys"""
+        many = cls._many_fields()
+        columns = [name for name in cls.Meta.fields if name not in many]
+        columns.extend(name for name in extra if name not in columns)
+
+        return queryset.prefetch_related(None).values(*columns)
+
+    @classmethod
+    def to_values_representation(cls, rows):
+        """Return the representation of rows from values_queryset()"""
+        rows = list(rows)
+        many = cls._many_fields()
+        related = {}
+        if many and rows:
+            related = cls._related_ids([row['id'] for row in rows], many)
+
+        # The queries above count as database time
+        with timed('serialize'):
+            data = []
+            for row in rows:
+                item = OrderedDict()
+                for name in cls.Meta.fields:
+                    if name in many:
+                        item[name] = related.get((name, row['id']), [])
+                    else:
+                        item[name] = row[name]
+                data.append(item)
 
+        return data
 
-class TagSerializer(serializers.ModelSerializer):
+    @classmethod
+    def _related_ids(cls, ids, many):
+        """Return the sorted related ids by (field, id) from one query"""
+        model = cls.Meta.model
+        queries = []
+        for index, name in enumerate(many):
+            field = model._meta.get_field(name)
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            queries.append(
+                field.remote_field.through.objects
+                .filter(**{f'{source}__in': ids})
+                .annotate(relation=Value(index, IntegerField()))
+                .values_list(source, target, 'relation')
+                .order_by()
+            )
+
+        related = {}
+        for source_id, target_id, index in queries[0].union(
+                *queries[1:], all=True):
+            related.setdefault((many[index], source_id), []).append(target_id)
+        for ids_of_field in related.values():
+            ids_of_field.sort()
+
+        return related
+
+
+class TagSerializer(TimedSerializerMixin, ValuesSerializerMixin,
+                    serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -12,7 +104,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class DescriptionSerializer(serializers.ModelSerializer):
+class DescriptionSerializer(TimedSerializerMixin, ValuesSerializerMixin,
+                            serializers.ModelSerializer):
     """Serializer for description objects"""
 
     class Meta:
@@ -21,13 +114,126 @@ class DescriptionSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class TweetSerializer(serializers.ModelSerializer):
+class TweetListSerializer(serializers.ListSerializer):
+    """Create a batch of tweets with a few bulk inserts"""
+    related_fields = ('tags', 'descriptions')
+
+    def to_internal_value(self, data):
+        """Validate the tweets, resolving their relations together"""
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        if len(data) > settings.TWEET_BATCH_LIMIT:
+            message = _('Send at most {limit} tweets at once.').format(
+                limit=settings.TWEET_BATCH_LIMIT)
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+        fields = [self.child.fields[name] for name in self.related_fields]
+        for field in fields:
+            field.preload(item.get(field.field_name) for item in data
+                          if isinstance(item, dict))
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields:
+                field.preloaded = None
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Insert the tweets, then all of their tags and descriptions"""
+        tweets = []
+        related = []
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            related.append(
+                {field: attrs.pop(field, []) for field in self.related_fields})
+            tweets.append(Tweet(**attrs))
+
+        db = router.db_for_write(Tweet)
+        if connections[db].features.can_return_ids_from_bulk_insert:
+            Tweet.objects.using(db).bulk_create(
+                tweets, batch_size=settings.TWEET_BATCH_SIZE)
+        else:
+            for tweet in tweets:
+                tweet.save(using=db)
+
+        for field in self.related_fields:
+            m2m = Tweet._meta.get_field(field)
+            through = m2m.remote_field.through
+            tweet_column = m2m.m2m_field_name() + '_id'
+            related_column = m2m.m2m_reverse_field_name() + '_id'
+            through.objects.using(db).bulk_create([
+                through(**{tweet_column: tweet.id, related_column: obj.pk})
+                for tweet, objs in zip(tweets, related)
+                for obj in objs[field]
+            ], batch_size=settings.TWEET_BATCH_SIZE)
+
+        # bulk_create sends no signals
+        for user_id in {tweet.user_id for tweet in tweets}:
+            cache.bump(user_id, 'tweets', *(
+                cache.tweet_scope(tweet.id)
+                for tweet in tweets if tweet.user_id == user_id
+            ))
+
+        return tweets
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """Map each type of a tweet image to a srcset of its widths"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image')
+        super().__init__(**kwargs)
+
+    def to_representation(self, image):
+        if not image:
+            return None
+
+        request = self.context.get('request')
+
+        def candidate(name, width):
+            url = image.storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            return f'{url} {width}w' if width else url
+
+        return {
+            mime: ', '.join(candidate(*choice) for choice in candidates)
+            for mime, candidates in variants.srcset(image.name).items()
+        }
+
+
+class ImageUploadField(serializers.FileField):
+    """
+    Image field that only identifies the uploaded image from its header.
+
+    The image is decoded later, off the request, when its variants are
+    generated.
+    """
+    default_error_messages = {
+        'invalid_image': serializers.ImageField.default_error_messages[
+            'invalid_image'],
+    }
+
+    def to_internal_value(self, data):
+        uploaded = super().to_internal_value(data)
+        try:
+            Image.open(uploaded)
+        except Exception:
+            self.fail('invalid_image')
+        uploaded.seek(0)
+
+        return uploaded
+
+
+class TweetSerializer(TimedSerializerMixin, ValuesSerializerMixin,
+                      serializers.ModelSerializer):
     """Serializer a tweet"""
-    descriptions = serializers.PrimaryKeyRelatedField(
+    descriptions = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Description.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -36,18 +242,43 @@ class TweetSerializer(serializers.ModelSerializer):
         model = Tweet
         fields = ('id', 'title', 'descriptions', 'tags')
         read_only_fields = ('id',)
+        list_serializer_class = TweetListSerializer
 
 
 class TweetDetailSerializer(TweetSerializer):
     """Serialize a tweet detail"""
     descriptions = DescriptionSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image = serializers.ImageField(read_only=True)
+    srcset = SrcsetField()
+
+    class Meta(TweetSerializer.Meta):
+        fields = TweetSerializer.Meta.fields + ('image', 'srcset')
+
+
+class TweetExportSerializer(TweetSerializer):
+    """Serialize a tweet in an account archive"""
+
+    class Meta(TweetSerializer.Meta):
+        fields = TweetSerializer.Meta.fields + ('image',)
+        read_only_fields = fields
+
+
+class TimelineTweetSerializer(TweetSerializer):
+    """Serialize a tweet in a home timeline"""
+
+    class Meta(TweetSerializer.Meta):
+        fields = ('id', 'user', 'title', 'descriptions', 'tags')
+        read_only_fields = fields
 
 
-class TweetImageSerializer(serializers.ModelSerializer):
+class TweetImageSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """Serializer for uploading images to tweets"""
+    image = ImageUploadField()
+    srcset = SrcsetField()
 
     class Meta:
         model = Tweet
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'srcset')
         read_only_fields = ('id',)
@@ -0,0 +1,48 @@
+"""
+Streaming list responses.
+
+The whole list is sent while it is read, one chunk of rows at a time.
+Each chunk is read with its own keyset query, continuing after the last
+row of the chunk before, and serialized from values() rows with one query
+for its many to many ids.  Memory stays bounded by the chunk size however
+many rows there are, and no database cursor stays open between chunks, so
+the ASGI consumers can read each chunk on whichever thread is free.
+"""
+from core.renderers import JSONRenderer
+from tweet.pagination import keyset_filter
+
+
+def iter_chunks(serializer_class, queryset, ordering, chunk_size):
+    """
+    Yield the representations of queryset's rows, a chunk at a time.
+
+    The last field of ordering must be unique.
+    """
+    names = [field.lstrip('-') for field in ordering]
+    rows = serializer_class.values_queryset(
+        queryset.order_by(*ordering), names)
+    chunk = list(rows[:chunk_size])
+    while chunk:
+        yield serializer_class.to_values_representation(chunk)
+        if len(chunk) < chunk_size:
+            return
+        key = [chunk[-1][name] for name in names]
+        chunk = list(rows.filter(keyset_filter(ordering, key))[:chunk_size])
+
+
+def stream_json(chunks):
+    """Yield the bytes of a JSON array of the items of chunks"""
+    render = JSONRenderer().render
+    yield b'['
+    separator = b''
+    for chunk in chunks:
+        yield separator + b','.join(render(item) for item in chunk)
+        separator = b','
+    yield b']'
+
+
+def stream_ndjson(chunks):
+    """Yield the bytes of the items of chunks, one JSON document a line"""
+    render = JSONRenderer().render
+    for chunk in chunks:
+        yield b''.join(render(item) + b'\n' for item in chunk)
@@ -0,0 +1,147 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Description, Tweet
+
+from tweet.cache import get_cache
+
+
+TAGS_URL = reverse('tweet:tag-list')
+DESCRIPTIONS_URL = reverse('tweet:description-list')
+
+
+def detail_url(tweet_id):
+    return reverse('tweet:tweet-detail', args=[tweet_id])
+
+
+class ResponseCacheTests(TestCase):
+    """Test caching of tweet API responses"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.tweet = Tweet.objects.create(user=self.user, title='Curry')
+        self.tweet.tags.add(self.tag)
+
+    def assertCached(self, url):
+        """Assert url is served from the cache the second time"""
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(second.data, first.data)
+        return second
+
+    def test_tag_list_cached(self):
+        """Test the tag list is served from the cache"""
+        self.assertCached(TAGS_URL)
+
+    def test_tag_list_invalidated_on_create(self):
+        """Test creating a tag invalidates the cached tag list"""
+        self.assertCached(TAGS_URL)
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_description_list_invalidated_on_delete(self):
+        """Test deleting a description invalidates the cached list"""
+        description = Description.objects.create(user=self.user, name='Hot')
+        self.assertCached(DESCRIPTIONS_URL)
+        description.delete()
+
+        res = self.client.get(DESCRIPTIONS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_pages_cached_separately(self):
+        """Test each page of a list has its own cache entry"""
+        Tag.objects.create(user=self.user, name='Dessert')
+        first = self.client.get(TAGS_URL, {'page_size': 1})
+
+        second = self.client.get(first.data['next'])
+
+        self.assertNotEqual(second.data['results'], first.data['results'])
+
+    def test_cache_is_per_user(self):
+        """Test users never see each other's cached responses"""
+        self.assertCached(TAGS_URL)
+        other = get_user_model().objects.create_user('o@o.com', 'test123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_tweet_detail_cached(self):
+        """Test the tweet detail is served from the cache"""
+        self.assertCached(detail_url(self.tweet.id))
+
+    def test_tweet_detail_invalidated_on_update(self):
+        """Test editing a tweet invalidates its cached detail"""
+        self.assertCached(detail_url(self.tweet.id))
+        self.client.patch(detail_url(self.tweet.id), {'title': 'Dal'})
+
+        res = self.client.get(detail_url(self.tweet.id))
+
+        self.assertEqual(res.data['title'], 'Dal')
+
+    def test_tweet_detail_invalidated_on_tag_changes(self):
+        """Test tagging, untagging and renaming tags invalidate details"""
+        url = detail_url(self.tweet.id)
+        self.assertCached(url)
+
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.tweet.tags.add(dessert)
+        self.assertEqual(len(self.assertCached(url).data['tags']), 2)
+
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+        names = {tag['name'] for tag in self.assertCached(url).data['tags']}
+        self.assertEqual(names, {'Vegetarian', 'Dessert'})
+
+        dessert.tweet_set.clear()
+        self.assertEqual(len(self.assertCached(url).data['tags']), 1)
+
+    def test_other_tweets_stay_cached(self):
+        """Test editing one tweet keeps other tweets' details cached"""
+        other = Tweet.objects.create(user=self.user, title='Soup')
+        self.assertCached(detail_url(self.tweet.id))
+        other.title = 'Stew'
+        other.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(detail_url(self.tweet.id))
+
+    def test_file_based_backend(self):
+        """Test the cache works with the file-based backend"""
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.'
+                               'LocMemCache',
+                },
+                'responses': {
+                    'BACKEND': 'django.core.cache.backends.filebased.'
+                               'FileBasedCache',
+                    'LOCATION': location,
+                },
+            }):
+                self.assertCached(TAGS_URL)
+                Tag.objects.create(user=self.user, name='Dessert')
+
+                res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
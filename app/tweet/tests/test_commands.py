@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from tweet.management.commands.explain_endpoints import find_problems
+
+
+class ExplainEndpointsTests(TestCase):
+    """Test the explain_endpoints management command"""
+
+    def test_endpoint_plans_use_indexes(self):
+        """Test no endpoint query scans or sorts a whole table"""
+        out = StringIO()
+        call_command('explain_endpoints', '--fail', stdout=out)
+
+        for name in ('tag-list', 'description-list', 'tweet-list',
+                     'tweet-detail'):
+            self.assertIn(f'{name}: OK', out.getvalue())
+
+    def test_sqlite_problems_detected(self):
+        """Test full scans and temporary sorts are reported on SQLite"""
+        plan = '2 0 0 SCAN core_tweet\n6 0 0 USE TEMP B-TREE FOR ORDER BY'
+
+        problems = find_problems('sqlite', plan)
+
+        self.assertEqual(problems, [
+            'full scan of core_tweet',
+            'temporary sort for ORDER BY',
+        ])
+
+    def test_postgresql_problems_detected(self):
+        """Test sequential scans and sorts are reported on PostgreSQL"""
+        plan = (
+            'Limit  (cost=1.03..1.04 rows=1 width=4)\n'
+            '  ->  Sort  (cost=1.03..1.04 rows=1 width=4)\n'
+            '        Sort Key: id DESC\n'
+            '        ->  Seq Scan on core_tweet  (cost=0.00..1.02 rows=1)'
+        )
+
+        problems = find_problems('postgresql', plan)
+
+        self.assertEqual(problems, ['Sort', 'sequential scan on core_tweet'])
+
+    def test_through_tables_have_reverse_indexes(self):
+        """Test the M2M tables are indexed for lookups by tag/description"""
+        with connection.cursor() as cursor:
+            for table, column in (('core_tweet_tags', 'tag_id'),
+                                  ('core_tweet_descriptions',
+                                   'description_id')):
+                constraints = connection.introspection.get_constraints(
+                    cursor, table)
+                self.assertIn(
+                    [column, 'tweet_id'],
+                    [c['columns'] for c in constraints.values()
+                     if c['index']]
+                )
@@ -0,0 +1,150 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Description, Tweet
+
+from tweet.cache import get_cache
+
+
+TAGS_URL = reverse('tweet:tag-list')
+DESCRIPTIONS_URL = reverse('tweet:description-list')
+TWEET_URL = reverse('tweet:tweet-list')
+
+
+def detail_url(tweet_id):
+    return reverse('tweet:tweet-detail', args=[tweet_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Test conditional GETs of the tweet API"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.tweet = Tweet.objects.create(user=self.user, title='Curry')
+
+    def assertNotModified(self, url, **params):
+        """Assert url is answered with 304 when revalidated"""
+        etag = self.client.get(url, **params)['ETag']
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **params)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def assertModified(self, url, etag):
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_validators_sent(self):
+        """Test lists and details carry an ETag and Last-Modified"""
+        for url in (TAGS_URL, DESCRIPTIONS_URL, TWEET_URL,
+                    detail_url(self.tweet.id)):
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn('ETag', res)
+            self.assertIn('Last-Modified', res)
+
+    def test_unchanged_resources_not_modified(self):
+        """Test unchanged resources get 304 without touching the database"""
+        for url in (TAGS_URL, DESCRIPTIONS_URL, TWEET_URL,
+                    detail_url(self.tweet.id)):
+            self.assertNotModified(url)
+
+    def test_not_modified_skips_serialization(self):
+        """Test a 304 does not serialize anything"""
+        etag = self.client.get(TWEET_URL)['ETag']
+
+        with patch('tweet.serializers.TweetSerializer.to_representation') \
+                as to_representation:
+            self.client.get(TWEET_URL, HTTP_IF_NONE_MATCH=etag)
+
+        to_representation.assert_not_called()
+
+    def test_if_modified_since(self):
+        """Test Last-Modified is honoured through If-Modified-Since"""
+        last_modified = self.client.get(TAGS_URL)['Last-Modified']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_last_modified_follows_updated_at(self):
+        """Test Last-Modified is the time the tweet was last updated"""
+        self.tweet.save()
+
+        res = self.client.get(detail_url(self.tweet.id))
+
+        self.assertEqual(
+            res['Last-Modified'],
+            http_date(self.tweet.updated_at.timestamp())
+        )
+
+    def test_query_params_have_own_etag(self):
+        """Test different pages of a list have different ETags"""
+        first = self.client.get(TWEET_URL)
+        second = self.client.get(TWEET_URL, {'page_size': 1})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_tag_created(self):
+        """Test creating a tag changes the tag list's ETag"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.client.post(TAGS_URL, {'name': 'Dessert'})
+
+        self.assertModified(TAGS_URL, etag)
+
+    def test_description_deleted(self):
+        """Test deleting a description changes the list's ETag"""
+        description = Description.objects.create(user=self.user, name='Hot')
+        etag = self.client.get(DESCRIPTIONS_URL)['ETag']
+        description.delete()
+
+        self.assertModified(DESCRIPTIONS_URL, etag)
+
+    def test_tweet_updated(self):
+        """Test editing a tweet changes the list and detail ETags"""
+        url = detail_url(self.tweet.id)
+        list_etag = self.client.get(TWEET_URL)['ETag']
+        detail_etag = self.client.get(url)['ETag']
+        self.client.patch(url, {'title': 'Dal'})
+
+        self.assertModified(TWEET_URL, list_etag)
+        self.assertModified(url, detail_etag)
+
+    def test_tweet_tagged(self):
+        """Test tagging a tweet changes its ETag and updated_at"""
+        url = detail_url(self.tweet.id)
+        updated_at = self.tweet.updated_at
+        etag = self.client.get(url)['ETag']
+
+        self.tag.tweet_set.add(self.tweet)
+
+        self.assertModified(url, etag)
+        self.tweet.refresh_from_db()
+        self.assertGreater(self.tweet.updated_at, updated_at)
+
+    def test_etag_is_per_user(self):
+        """Test users never share ETags"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        other = get_user_model().objects.create_user('o@o.com', 'test123')
+        self.client.force_authenticate(other)
+
+        self.assertModified(TAGS_URL, etag)
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.testing import HttpCommunicator
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Tweet
+
+from app.routing import application
+from tweet.cache import get_cache
+from tweet.serializers import TweetSerializer
+from user import authentication
+from user.consumers import ManageUserConsumer
+
+
+TAGS_URL = reverse('tweet:tag-list')
+TWEET_URL = reverse('tweet:tweet-list')
+TWEET_STREAM_URL = reverse('tweet:tweet-stream')
+ME_URL = reverse('user:me')
+
+
+def detail_url(tweet_id):
+    return reverse('tweet:tweet-detail', args=[tweet_id])
+
+
+class AsgiReadTests(TransactionTestCase):
+    """Test the async read endpoints"""
+
+    def setUp(self):
+        get_cache().clear()
+        authentication.local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.tweet = Tweet.objects.create(user=self.user, title='Curry')
+
+    def request(self, path, method='GET', headers=(), body=b''):
+        """Send a request through the ASGI application"""
+        headers = [
+            (b'host', b'testserver'),
+            (b'authorization', f'Token {self.token.key}'.encode()),
+            *headers
+        ]
+        if body:
+            headers.append((b'content-type', b'application/json'))
+            headers.append((b'content-length', str(len(body)).encode()))
+
+        async def send():
+            communicator = HttpCommunicator(
+                application, method, path, body=body, headers=headers)
+            return await communicator.get_response()
+
+        response = async_to_sync(send)()
+
+        return response['status'], dict(response['headers']), \
+            response['body']
+
+    def test_read_endpoints(self):
+        """Test the read endpoints respond through ASGI"""
+        for path in (TAGS_URL, TWEET_URL, detail_url(self.tweet.id),
+                     ME_URL):
+            res_status, headers, body = self.request(path)
+
+            self.assertEqual(res_status, status.HTTP_200_OK)
+            self.assertIn(b'application/json', headers[b'Content-Type'])
+
+    def test_user_served_by_consumer(self):
+        """Test the authenticated user is read through its consumer"""
+        with patch('user.consumers.ManageUserConsumer.handle',
+                   autospec=True,
+                   side_effect=ManageUserConsumer.handle) as handle:
+            res_status, headers, body = self.request(ME_URL)
+
+        handle.assert_called_once()
+        self.assertEqual(json.loads(body)['email'], 'test@test.com')
+
+    @override_settings(API_STREAM_CHUNK_SIZE=1)
+    def test_stream_read_off_event_loop(self):
+        """Test streamed chunks are read in the thread pool"""
+        Tweet.objects.create(user=self.user, title='Rice')
+        to_values_representation = TweetSerializer.to_values_representation
+        on_loop = []
+
+        def represent(rows):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return to_values_representation(rows)
+
+        with patch.object(TweetSerializer, 'to_values_representation',
+                          side_effect=represent):
+            res_status, headers, body = self.request(TWEET_STREAM_URL)
+
+        self.assertEqual(res_status, status.HTTP_200_OK)
+        self.assertEqual([tweet['title'] for tweet in json.loads(body)],
+                         ['Rice', 'Curry'])
+        self.assertEqual(on_loop, [False, False])
+
+    def test_revalidation_skips_views(self):
+        """Test current copies are revalidated without running views"""
+        for path in (TAGS_URL, TWEET_URL, detail_url(self.tweet.id)):
+            res_status, headers, body = self.request(path)
+            etag = headers[b'ETag']
+
+            with self.assertNumQueries(0):
+                res_status, headers, body = self.request(
+                    path, headers=[(b'if-none-match', etag)])
+
+            self.assertEqual(res_status, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(headers[b'ETag'], etag)
+            self.assertEqual(headers[b'Vary'], b'Accept')
+
+    def test_revalidation_through_middleware(self):
+        """Test revalidated responses pass through the middleware"""
+        res_status, headers, body = self.request(TAGS_URL)
+
+        res_status, headers, body = self.request(
+            TAGS_URL, headers=[(b'if-none-match', headers[b'ETag'])])
+
+        self.assertEqual(res_status, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn(b'0 queries', headers[b'Server-Timing'])
+        self.assertEqual(headers[b'X-Frame-Options'], b'SAMEORIGIN')
+
+    def test_changed_resource_revalidated(self):
+        """Test a stale copy is answered with the new response"""
+        res_status, headers, body = self.request(TAGS_URL)
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res_status, headers, body = self.request(
+            TAGS_URL, headers=[(b'if-none-match', headers[b'ETag'])])
+
+        self.assertEqual(res_status, status.HTTP_200_OK)
+        self.assertIn(b'Dessert', body)
+
+    def test_writes_use_django_handler(self):
+        """Test requests other than reads are served by Django"""
+        res_status, headers, body = self.request(
+            TAGS_URL, method='POST', body=b'{"name": "Dessert"}')
+
+        self.assertEqual(res_status, status.HTTP_201_CREATED)
+        self.assertTrue(Tag.objects.filter(name='Dessert').exists())
+
+    def test_unauthenticated_read_rejected(self):
+        """Test reads without a valid token are rejected"""
+        self.token.delete()
+
+        res_status, headers, body = self.request(TAGS_URL)
+
+        self.assertEqual(res_status, status.HTTP_401_UNAUTHORIZED)
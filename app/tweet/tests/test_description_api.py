@@ -47,7 +47,7 @@ class PrivateIngredientsAPITests(TestCase):
         descriptions = Description.objects.all().order_by('-name')
         serializer = DescriptionSerializer(descriptions, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_descriptions_limited_to_user(self):
         """Test that only ingredients for authenticated user are returned"""
@@ -63,8 +63,8 @@ class PrivateIngredientsAPITests(TestCase):
         res = self.client.get(DESCRIPTION_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], description.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], description.name)
 
     def test_create_description_successful(self):
         """Test creating a new description"""
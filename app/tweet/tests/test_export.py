@@ -0,0 +1,253 @@
+import json
+import shutil
+import tempfile
+import zipfile
+import zlib
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.archives import Archive, ArchiveChanged, Entry, checked, \
+    spooled_entry
+from core.models import Tag, Description, Tweet
+from tweet import export
+
+
+ARCHIVE_URL = reverse('tweet:archive')
+
+CONTENT = b'not really a jpeg ' * 100
+
+
+def content(response):
+    return b''.join(response.streaming_content)
+
+
+class ArchiveTests(TestCase):
+    """Test the layout of stored ZIP archives"""
+
+    def entry(self, name, data):
+        size, crc = len(data), zlib.crc32(data)
+        return Entry(name, size, crc,
+                     lambda skip: checked([data], size, crc, skip))
+
+    def test_valid_zip(self):
+        """Test the archive is a ZIP of its entries"""
+        archive = Archive([self.entry('a.txt', b'first'),
+                           self.entry('b/c.txt', b'second'),
+                           self.entry('empty', b'')])
+
+        data = b''.join(archive.iter_bytes())
+
+        self.assertEqual(len(data), archive.size)
+        with zipfile.ZipFile(BytesIO(data)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(zip_file.read('b/c.txt'), b'second')
+            self.assertEqual(zip_file.read('empty'), b'')
+
+    def test_ranges(self):
+        """Test any range is the same bytes as in the whole archive"""
+        archive = Archive([self.entry('a.txt', b'first'),
+                           self.entry('b.txt', b'second')])
+        data = b''.join(archive.iter_bytes())
+
+        for start in range(archive.size):
+            for end in (start, start + 7, archive.size - 1):
+                end = min(end, archive.size - 1)
+                self.assertEqual(
+                    b''.join(archive.iter_bytes(start, end)),
+                    data[start:end + 1]
+                )
+
+    def test_skipped_entries_not_read(self):
+        """Test entries before the start of a range are not read"""
+        def fail(skip):
+            raise AssertionError('read')
+
+        archive = Archive([Entry('skipped', 5, 0, fail),
+                           self.entry('read', b'data')])
+
+        tail = b''.join(archive.iter_bytes(archive.size - 30))
+
+        self.assertEqual(len(tail), 30)
+
+    def test_spooled_entry(self):
+        """Test spooled data is produced once and read from any offset"""
+        produced = []
+
+        def chunks():
+            produced.append(True)
+            yield from (b'first', b'second')
+
+        archive = Archive([spooled_entry('a.txt', chunks())])
+        data = b''.join(archive.iter_bytes())
+
+        self.assertEqual(b''.join(archive.iter_bytes(3)), data[3:])
+        with zipfile.ZipFile(BytesIO(data)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(zip_file.read('a.txt'), b'firstsecond')
+        self.assertEqual(len(produced), 1)
+
+    def test_changed_data(self):
+        """Test data that differs from the planned entry is an error"""
+        with self.assertRaises(ArchiveChanged):
+            list(checked([b'other'], 5, 0))
+        with self.assertRaises(ArchiveChanged):
+            list(checked([b'longer data'], 5, 0))
+
+
+class ArchiveExportTests(TestCase):
+    """Test exporting account archives"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        self.description = Description.objects.create(
+            user=self.user, name='spicy')
+        self.tweet = Tweet.objects.create(user=self.user, title='Chirp')
+        self.tweet.tags.add(self.tag)
+        self.tweet.image.save('picture.jpg', ContentFile(CONTENT))
+        Tweet.objects.create(user=self.user, title='Chirp again')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def read_archive(self, data):
+        with zipfile.ZipFile(BytesIO(data)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            manifest = [
+                json.loads(line) for line in
+                zip_file.read('manifest.ndjson').decode().splitlines()
+            ]
+            files = {name: zip_file.read(name)
+                     for name in zip_file.namelist()
+                     if name != 'manifest.ndjson'}
+
+        return manifest, files
+
+    def test_export_archive(self):
+        """Test the archive holds every row and image of the user"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'test123')
+        Tag.objects.create(user=other, name='other')
+
+        res = self.client.get(ARCHIVE_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/zip')
+        data = content(res)
+        self.assertEqual(int(res['Content-Length']), len(data))
+        manifest, files = self.read_archive(data)
+        self.assertEqual(manifest[:2], [
+            {'type': 'tag', 'id': self.tag.id, 'name': 'vegan'},
+            {'type': 'description', 'id': self.description.id,
+             'name': 'spicy'},
+        ])
+        self.assertEqual(manifest[2], {
+            'type': 'tweet', 'id': self.tweet.id, 'title': 'Chirp',
+            'descriptions': [], 'tags': [self.tag.id],
+            'image': self.tweet.image.name,
+        })
+        self.assertEqual(manifest[3]['image'], '')
+        self.assertEqual(files, {self.tweet.image.name: CONTENT})
+
+    def test_deterministic(self):
+        """Test the same data always gives the same archive"""
+        first = self.client.get(ARCHIVE_URL)
+        cache.clear()
+        second = self.client.get(ARCHIVE_URL)
+
+        self.assertEqual(content(first), content(second))
+
+    def test_resume_with_range(self):
+        """Test an interrupted download resumes with a range request"""
+        res = self.client.get(ARCHIVE_URL)
+        data = content(res)
+
+        resumed = self.client.get(
+            ARCHIVE_URL, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=res['ETag'])
+
+        self.assertEqual(resumed.status_code, 206)
+        self.assertEqual(
+            resumed['Content-Range'], f'bytes 100-{len(data) - 1}/{len(data)}')
+        self.assertEqual(content(resumed), data[100:])
+
+    def test_range_of_changed_archive(self):
+        """Test the whole archive is sent once the data changed"""
+        etag = self.client.get(ARCHIVE_URL)['ETag']
+        Tag.objects.create(user=self.user, name='new')
+
+        res = self.client.get(
+            ARCHIVE_URL, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'"new"', content(res))
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the archive cannot be satisfied"""
+        res = self.client.get(ARCHIVE_URL, HTTP_RANGE='bytes=100000-')
+
+        self.assertEqual(res.status_code, 416)
+
+    def test_not_modified(self):
+        """Test an unchanged archive is not sent again"""
+        etag = self.client.get(ARCHIVE_URL)['ETag']
+
+        res = self.client.get(ARCHIVE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_missing_image_left_out(self):
+        """Test images lost from the storage are left out of the archive"""
+        self.tweet.image.storage.delete(self.tweet.image.name)
+
+        manifest, files = self.read_archive(
+            content(self.client.get(ARCHIVE_URL)))
+
+        self.assertEqual(files, {})
+        self.assertEqual(len(manifest), 4)
+
+    def test_requires_authentication(self):
+        """Test exporting requires authentication"""
+        res = APIClient().get(ARCHIVE_URL, HTTP_ACCEPT='application/zip')
+
+        self.assertEqual(res.status_code, 401)
+
+    def test_export_command(self):
+        """Test the command writes the same archive"""
+        path = f'{self.media}/export.zip'
+        out = StringIO()
+
+        call_command('export_chirps', 'test@test.com', path, stdout=out)
+
+        with open(path, 'rb') as archive:
+            self.assertEqual(
+                archive.read(), content(self.client.get(ARCHIVE_URL)))
+        self.assertIn('1 images', out.getvalue())
+
+    def test_export_command_renders_manifest_once(self):
+        """Test the command does not render the manifest to measure it"""
+        path = f'{self.media}/export.zip'
+
+        with patch('tweet.export.manifest_chunks',
+                   wraps=export.manifest_chunks) as chunks:
+            call_command('export_chirps', 'test@test.com', path,
+                         stdout=StringIO())
+
+        chunks.assert_called_once()
@@ -0,0 +1,249 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from core.models import ImageBlob, Job, Tag, Description, Tweet
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+class ImportChirpsTests(TestCase):
+    """Test the import_chirps management command"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def write(self, text, name='records.ndjson'):
+        path = os.path.join(self.media, name)
+        with open(path, 'w') as records:
+            records.write(text)
+
+        return path
+
+    def call(self, path, *args):
+        out = StringIO()
+        call_command('import_chirps', 'test@test.com', path, *args,
+                     stdout=out)
+
+        return out.getvalue()
+
+    def test_import_records(self):
+        """Test tweets are imported with their tags and descriptions"""
+        path = self.write(ndjson(
+            {'type': 'tag', 'id': 7, 'name': 'vegan'},
+            {'type': 'description', 'id': 3, 'name': 'spicy'},
+            {'type': 'tweet', 'id': 1, 'title': 'First', 'tags': [7],
+             'descriptions': [3]},
+            {'title': 'Second', 'tags': ['vegan', 'new']},
+        ))
+
+        out = self.call(path)
+
+        first = Tweet.objects.get(title='First')
+        second = Tweet.objects.get(title='Second')
+        self.assertEqual(first.user, self.user)
+        self.assertEqual([tag.name for tag in first.tags.all()], ['vegan'])
+        self.assertEqual(
+            [description.name for description in first.descriptions.all()],
+            ['spicy']
+        )
+        self.assertEqual(
+            sorted(tag.name for tag in second.tags.all()), ['new', 'vegan'])
+        self.assertIn('Imported 2 tweets, 2 tags, 1 descriptions', out)
+        self.assertIn('rows/s', out)
+
+    def test_existing_names_reused(self):
+        """Test tags are deduplicated by name against existing ones"""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'test123')
+        Tag.objects.create(user=other, name='spicy')
+        path = self.write(ndjson(
+            {'type': 'tag', 'id': 1, 'name': 'vegan'},
+            {'type': 'tag', 'id': 2, 'name': 'vegan'},
+            {'title': 'Chirp', 'tags': [1, 2, 'spicy']},
+        ))
+
+        self.call(path)
+
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertIn(tag, Tweet.objects.get().tags.all())
+        self.assertEqual(Tweet.objects.get().tags.count(), 2)
+
+    def test_batches(self):
+        """Test tweets are inserted a batch at a time"""
+        path = self.write(ndjson(*(
+            {'title': f'tweet {i}', 'tags': ['vegan']} for i in range(5))))
+
+        self.call(path, '--batch-size', '2')
+
+        self.assertEqual(
+            list(Tweet.objects.order_by('id')
+                 .values_list('title', flat=True)),
+            [f'tweet {i}' for i in range(5)]
+        )
+        self.assertEqual(Tag.objects.get().tweet_set.count(), 5)
+
+    def test_invalid_records(self):
+        """Test invalid records stop the import with their position"""
+        for text, message in (
+                ('{"title": ', 'Record 1: invalid'),
+                (ndjson({'type': 'poll'}), 'Record 1: unknown type poll'),
+                (ndjson({'title': ''}), 'Record 1: expected a title'),
+                (ndjson({'title': 'Chirp', 'tags': [4]}),
+                 'Record 1: unknown tag 4')):
+            with self.assertRaisesMessage(CommandError, message):
+                self.call(self.write(text))
+
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_resume_from_checkpoint(self):
+        """Test a failed import resumes after the last imported batch"""
+        records = [{'type': 'tag', 'id': 1, 'name': 'vegan'}] + [
+            {'title': f'tweet {i}', 'tags': [1]} for i in range(5)]
+        path = self.write(ndjson(*records[:4], {'title': ''}, *records[5:]))
+        checkpoint = os.path.join(self.media, 'import.checkpoint')
+
+        with self.assertRaises(CommandError):
+            self.call(path, '--batch-size', '2', '--checkpoint', checkpoint)
+        self.assertEqual(Tweet.objects.count(), 2)
+
+        self.write(ndjson(*records))
+        out = self.call(
+            path, '--batch-size', '2', '--checkpoint', checkpoint)
+
+        self.assertIn('Resuming after record 3', out)
+        self.assertEqual(
+            list(Tweet.objects.order_by('id')
+                 .values_list('title', flat=True)),
+            [f'tweet {i}' for i in range(5)]
+        )
+        self.assertEqual(Tag.objects.get().tweet_set.count(), 5)
+
+    def test_committed_pending_batch(self):
+        """Test a batch committed before its checkpoint is not repeated"""
+        path = self.write(ndjson({'title': 'first'}, {'title': 'second'}))
+        tweet = Tweet.objects.create(user=self.user, title='first')
+        checkpoint = self.write(json.dumps({
+            'source': path, 'user': 'test@test.com', 'position': 0,
+            'pending': {'position': 1, 'first_id': tweet.id},
+        }), 'import.checkpoint')
+
+        self.call(path, '--checkpoint', checkpoint)
+
+        self.assertEqual(
+            list(Tweet.objects.order_by('id')
+                 .values_list('title', flat=True)),
+            ['first', 'second']
+        )
+
+    def test_pending_batch_with_taken_ids(self):
+        """Test a batch whose ids were taken by other rows is imported"""
+        path = self.write(ndjson({'title': 'first'}, {'title': 'second'}))
+        tweet = Tweet.objects.create(user=self.user, title='concurrent')
+        checkpoint = self.write(json.dumps({
+            'source': path, 'user': 'test@test.com', 'position': 0,
+            'pending': {'position': 2, 'first_id': tweet.id,
+                        'last_id': tweet.id + 1, 'count': 2},
+        }), 'import.checkpoint')
+
+        self.call(path, '--checkpoint', checkpoint)
+
+        self.assertEqual(
+            list(Tweet.objects.order_by('id')
+                 .values_list('title', flat=True)),
+            ['concurrent', 'first', 'second']
+        )
+
+    def test_concurrent_insert_fails_import(self):
+        """Test ids taken by a concurrent insert fail the import cleanly"""
+        path = self.write(ndjson({'title': 'first'}))
+        Tweet.objects.create(user=self.user, title='concurrent')
+
+        with patch('tweet.imports.Importer._allocate_ids',
+                   return_value=[Tweet.objects.get().id]), \
+                self.assertRaisesMessage(CommandError, 'must run alone'):
+            self.call(path)
+
+    def test_failed_batch_discards_images(self):
+        """Test images stored for a batch that fails are deleted"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'test123')
+        tweet = Tweet.objects.create(user=other, title='Chirp')
+        tweet.image.save('picture.jpg', ContentFile(b'image data'))
+        path = os.path.join(self.media, 'export.zip')
+        call_command('export_chirps', 'other@test.com', path,
+                     stdout=StringIO())
+        storage = tweet.image.storage
+        name = tweet.image.name
+        tweet.delete()
+        storage.delete(name)
+
+        with patch('core.images.acquire_many', side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            self.call(path)
+
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(Tweet.objects.filter(user=self.user).exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_checkpoint_of_another_import(self):
+        """Test a checkpoint of another source is refused"""
+        checkpoint = self.write(json.dumps({
+            'source': '/elsewhere.ndjson', 'user': 'test@test.com',
+            'position': 4, 'pending': None,
+        }), 'import.checkpoint')
+
+        with self.assertRaises(CommandError):
+            self.call(self.write(''), '--checkpoint', checkpoint)
+
+    def test_import_archive(self):
+        """Test an exported archive imports with its images"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'test123')
+        tag = Tag.objects.create(user=other, name='vegan')
+        Description.objects.create(user=other, name='spicy')
+        tweet = Tweet.objects.create(user=other, title='Chirp')
+        tweet.tags.add(tag)
+        tweet.image.save('picture.jpg', ContentFile(b'image data'))
+        Tweet.objects.create(user=other, title='No image')
+        path = os.path.join(self.media, 'export.zip')
+        call_command('export_chirps', 'other@test.com', path,
+                     stdout=StringIO())
+        # Stored again from the archive
+        tweet.image.storage.delete(tweet.image.name)
+
+        self.call(path)
+
+        imported = Tweet.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [(tweet.title, tweet.image.name or '') for tweet in imported],
+            [('Chirp', tweet.image.name), ('No image', '')]
+        )
+        self.assertEqual(
+            [tag.name for tag in imported[0].tags.all()], ['vegan'])
+        self.assertTrue(
+            Description.objects.filter(user=self.user, name='spicy').exists())
+        self.assertTrue(tweet.image.storage.exists(tweet.image.name))
+        self.assertEqual(
+            ImageBlob.objects.get(name=tweet.image.name).references, 2)
+        self.assertTrue(Job.objects.filter(queue='images').exists())
@@ -0,0 +1,122 @@
+import json
+from base64 import b64decode
+from decimal import Decimal
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Tweet
+
+from tweet.pagination import TweetPagination, TweetSearchPagination
+
+
+TWEET_URL = reverse('tweet:tweet-list')
+TAGS_URL = reverse('tweet:tag-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the tweet API lists"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        """Follow next links from url and return every page"""
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            url = res.data['next']
+
+        return pages
+
+    def test_pages_cover_all_tweets(self):
+        """Test following next links returns every tweet once"""
+        tweets = [
+            Tweet.objects.create(user=self.user, title=f'tweet {i}')
+            for i in range(7)
+        ]
+
+        pages = self.walk(TWEET_URL + '?page_size=3')
+
+        ids = [t['id'] for page in pages for t in page['results']]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(ids, [t.id for t in reversed(tweets)])
+
+    def test_previous_link_returns_prior_page(self):
+        """Test the previous link of page two returns page one"""
+        for i in range(5):
+            Tweet.objects.create(user=self.user, title=f'tweet {i}')
+
+        first = self.client.get(TWEET_URL, {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+
+        self.assertIsNone(first['previous'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_duplicate_tag_names_are_not_skipped(self):
+        """Test ties on the tag name are broken by id across pages"""
+        for _ in range(4):
+            Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        pages = self.walk(TAGS_URL + '?page_size=2')
+
+        ids = [t['id'] for page in pages for t in page['results']]
+        expected = Tag.objects.order_by('-name', '-id')
+        self.assertEqual(ids, [t.id for t in expected])
+
+    def test_pages_do_not_use_offset(self):
+        """Test later pages are fetched with a keyset, not an OFFSET"""
+        for i in range(5):
+            Tweet.objects.create(user=self.user, title=f'tweet {i}')
+        first = self.client.get(TWEET_URL, {'page_size': 2}).data
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first['next'])
+
+        for query in ctx.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_page_size_is_capped(self):
+        """Test the requested page size cannot exceed the maximum"""
+        for i in range(3):
+            Tweet.objects.create(user=self.user, title=f'tweet {i}')
+
+        with patch.object(TweetPagination, 'max_page_size', 2):
+            res = self.client.get(TWEET_URL, {'page_size': 10})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        res = self.client.get(TWEET_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_decimal_keys_are_exact(self):
+        """Test decimal ordering keys, like search ranks, stay exact"""
+        paginator = TweetSearchPagination()
+        paginator.base_url = 'http://testserver/'
+        rank = Decimal('0.060793')
+
+        url = paginator.encode_cursor({'rank': rank, 'id': 5}, reverse=False)
+
+        cursor = parse_qs(urlparse(url).query)['cursor'][0]
+        key = json.loads(b64decode(cursor))['k']
+        self.assertEqual(Decimal(key[0]), rank)
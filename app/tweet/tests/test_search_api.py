@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Tweet
+
+
+SEARCH_URL = reverse('tweet:tweet-search')
+
+
+class PublicSearchApiTests(TestCase):
+    """Test unauthenticated tweet search access"""
+
+    def test_login_required(self):
+        """Test that authentication is required to search"""
+        res = APIClient().get(SEARCH_URL, {'q': 'dragon'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSearchApiTests(TestCase):
+    """Test searching tweet titles"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        """Return the ids of the tweets found with params"""
+        res = self.client.get(SEARCH_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [tweet['id'] for tweet in res.data['results']]
+
+    def test_search_matches_title_words(self):
+        """Test only tweets containing every word are returned"""
+        dragon = Tweet.objects.create(user=self.user, title='The red dragon')
+        Tweet.objects.create(user=self.user, title='The blue whale')
+        Tweet.objects.create(user=self.user, title='A red balloon')
+
+        self.assertEqual(self.search(q='red dragon'), [dragon.id])
+
+    def test_search_stems_words(self):
+        """Test words are matched on their stem"""
+        tweet = Tweet.objects.create(user=self.user, title='Dragons flying')
+
+        self.assertEqual(self.search(q='dragon fly'), [tweet.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' tweets are never returned"""
+        other = get_user_model().objects.create_user('o@o.com', 'test123')
+        Tweet.objects.create(user=other, title='dragon')
+        tweet = Tweet.objects.create(user=self.user, title='dragon')
+
+        self.assertEqual(self.search(q='dragon'), [tweet.id])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        """Test edited and deleted tweets are reindexed"""
+        tweet = Tweet.objects.create(user=self.user, title='dragon')
+        gone = Tweet.objects.create(user=self.user, title='dragon egg')
+        tweet.title = 'griffin'
+        tweet.save()
+        gone.delete()
+
+        self.assertEqual(self.search(q='dragon'), [])
+        self.assertEqual(self.search(q='griffin'), [tweet.id])
+
+    def test_search_ranks_better_matches_first(self):
+        """Test tweets mentioning a word more often rank higher"""
+        once = Tweet.objects.create(
+            user=self.user, title='dragon and a long list of other words')
+        twice = Tweet.objects.create(user=self.user, title='dragon dragon')
+
+        self.assertEqual(self.search(q='dragon'), [twice.id, once.id])
+
+    def test_search_pages(self):
+        """Test search results are paginated by rank with cursors"""
+        tweets = [
+            Tweet.objects.create(user=self.user, title=f'dragon {i}')
+            for i in range(5)
+        ]
+
+        ids = []
+        url = f'{SEARCH_URL}?q=dragon&page_size=2'
+        while url:
+            res = self.client.get(url)
+            ids += [tweet['id'] for tweet in res.data['results']]
+            url = res.data['next']
+
+        # Every title ranks the same, only the id orders them
+        self.assertEqual(ids, [tweet.id for tweet in reversed(tweets)])
+
+    def test_search_with_tag_filter(self):
+        """Test search results can be filtered by tag"""
+        tag = Tag.objects.create(user=self.user, name='Fantasy')
+        tagged = Tweet.objects.create(user=self.user, title='dragon')
+        tagged.tags.add(tag)
+        Tweet.objects.create(user=self.user, title='dragon')
+
+        self.assertEqual(self.search(q='dragon', tags=tag.id), [tagged.id])
+
+    def test_search_requires_words(self):
+        """Test a query without words is rejected"""
+        for query in ('', '  ', '"*'):
+            res = self.client.get(SEARCH_URL, {'q': query})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
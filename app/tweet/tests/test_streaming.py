@@ -0,0 +1,144 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Description, Tweet
+
+
+TWEET_STREAM_URL = reverse('tweet:tweet-stream')
+TAG_STREAM_URL = reverse('tweet:tag-stream')
+DESCRIPTION_STREAM_URL = reverse('tweet:description-stream')
+
+
+def content(response):
+    return b''.join(response.streaming_content)
+
+
+@override_settings(API_STREAM_CHUNK_SIZE=2)
+class StreamingListTests(TestCase):
+    """Test streaming whole lists"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        self.description = Description.objects.create(
+            user=self.user, name='spicy')
+
+    def create_tweets(self, count):
+        tweets = []
+        for i in range(count):
+            tweet = Tweet.objects.create(user=self.user, title=f'tweet {i}')
+            tweet.tags.add(self.tag)
+            tweets.append(tweet)
+
+        return tweets
+
+    def test_stream_json_array(self):
+        """Test every tweet is streamed as one JSON array, newest first"""
+        tweets = self.create_tweets(5)
+
+        res = self.client.get(TWEET_STREAM_URL)
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        data = json.loads(content(res))
+        self.assertEqual(
+            [tweet['id'] for tweet in data],
+            [tweet.id for tweet in reversed(tweets)]
+        )
+        self.assertEqual(data[0]['tags'], [self.tag.id])
+        self.assertEqual(data[0]['descriptions'], [])
+
+    def test_stream_ndjson(self):
+        """Test NDJSON is streamed to clients accepting it"""
+        self.create_tweets(3)
+
+        res = self.client.get(
+            TWEET_STREAM_URL, HTTP_ACCEPT='application/x-ndjson')
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = content(res).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['title'], 'tweet 2')
+
+    def test_stream_format_parameter(self):
+        """Test the format can be picked with the format parameter"""
+        self.create_tweets(1)
+
+        res = self.client.get(TWEET_STREAM_URL, {'format': 'ndjson'})
+
+        self.assertEqual(content(res).count(b'\n'), 1)
+
+    def test_stream_empty(self):
+        """Test an empty list streams as an empty array"""
+        res = self.client.get(TWEET_STREAM_URL)
+
+        self.assertEqual(json.loads(content(res)), [])
+
+    def test_one_relation_query_per_chunk(self):
+        """Test many to many ids are fetched once per chunk of rows"""
+        self.create_tweets(5)
+
+        res = self.client.get(TWEET_STREAM_URL)
+        # A keyset query for each of the three chunks, and its relations
+        with self.assertNumQueries(3 + 3):
+            content(res)
+
+    def test_stream_filters(self):
+        """Test the list filters apply to the stream"""
+        tagged = self.create_tweets(1)[0]
+        Tweet.objects.create(user=self.user, title='untagged')
+
+        res = self.client.get(TWEET_STREAM_URL, {'tags': str(self.tag.id)})
+
+        self.assertEqual(
+            [tweet['id'] for tweet in json.loads(content(res))], [tagged.id])
+
+    def test_stream_only_own_objects(self):
+        """Test only the authenticated user's objects are streamed"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'test123')
+        Tag.objects.create(user=other, name='other')
+        Tag.objects.create(user=self.user, name='zesty')
+
+        res = self.client.get(TAG_STREAM_URL)
+
+        self.assertEqual(
+            json.loads(content(res)),
+            [{'id': self.user.tag_set.get(name='zesty').id, 'name': 'zesty'},
+             {'id': self.tag.id, 'name': 'vegan'}]
+        )
+
+    def test_chunks_continue_after_equal_names(self):
+        """Test chunks split inside rows of one name skip and repeat none"""
+        tags = [Tag.objects.create(user=self.user, name='same')
+                for _ in range(3)]
+
+        res = self.client.get(TAG_STREAM_URL)
+
+        self.assertEqual(
+            [tag['id'] for tag in json.loads(content(res))],
+            [self.tag.id] + [tag.id for tag in reversed(tags)]
+        )
+
+    def test_stream_descriptions(self):
+        """Test descriptions can be streamed"""
+        res = self.client.get(DESCRIPTION_STREAM_URL)
+
+        self.assertEqual(
+            json.loads(content(res)),
+            [{'id': self.description.id, 'name': 'spicy'}]
+        )
+
+    def test_stream_requires_authentication(self):
+        """Test streaming requires authentication"""
+        res = APIClient().get(TWEET_STREAM_URL)
+
+        self.assertEqual(res.status_code, 401)
@@ -0,0 +1,188 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Follow, Job, TimelineEntry, Tweet
+
+from tweet import timeline
+
+
+TIMELINE_URL = reverse('tweet:timeline-list')
+TWEET_URL = reverse('tweet:tweet-list')
+
+
+def create_user(email):
+    return get_user_model().objects.create_user(email, 'test123')
+
+
+class TimelineApiTests(TestCase):
+    """Test the home timeline"""
+
+    def setUp(self):
+        self.user = create_user('test@test.com')
+        self.author = create_user('author@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, user, title):
+        """Create a tweet and fan it out as the API would"""
+        tweet = Tweet.objects.create(user=user, title=title)
+        timeline.fan_out([tweet.id])
+
+        return tweet
+
+    def get_ids(self):
+        res = self.client.get(TIMELINE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [tweet['id'] for tweet in res.data['results']]
+
+    def test_login_required(self):
+        """Test that authentication is required for the timeline"""
+        res = APIClient().get(TIMELINE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_timeline_has_followed_and_own_tweets(self):
+        """Test the timeline merges own and followed tweets, newest first"""
+        stranger = create_user('stranger@test.com')
+        timeline.follow(self.user, self.author)
+        first = self.post(self.author, 'first')
+        own = self.post(self.user, 'own')
+        self.post(stranger, 'unrelated')
+        last = self.post(self.author, 'last')
+
+        res = self.client.get(TIMELINE_URL)
+
+        self.assertEqual(
+            [tweet['id'] for tweet in res.data['results']],
+            [last.id, own.id, first.id]
+        )
+        self.assertEqual(res.data['results'][0]['user'], self.author.id)
+
+    def test_fan_out_is_idempotent(self):
+        """Test fanning a tweet out twice does not duplicate entries"""
+        timeline.follow(self.user, self.author)
+        tweet = self.post(self.author, 'hello')
+
+        timeline.fan_out([tweet.id])
+
+        self.assertEqual(TimelineEntry.objects.filter(tweet=tweet).count(), 2)
+
+    def test_overlapping_writes_skip_existing_entries(self):
+        """Test entries written concurrently are not inserted twice"""
+        timeline.follow(self.user, self.author)
+        tweet = self.post(self.author, 'hello')
+
+        timeline.add_entries([
+            TimelineEntry(owner=self.user, tweet=tweet),
+            TimelineEntry(owner=self.author, tweet=tweet),
+        ])
+
+        self.assertEqual(TimelineEntry.objects.filter(tweet=tweet).count(), 2)
+
+    @override_settings(TIMELINE_FAN_OUT_LIMIT=1)
+    def test_concurrent_pulls(self):
+        """Test two reads pulling from the same cursors both succeed"""
+        timeline.follow(self.user, self.author)
+        timeline.follow(create_user('fan@test.com'), self.author)
+        tweet = Tweet.objects.create(user=self.author, title='popular')
+        stale = list(Follow.objects.filter(follower=self.user))
+
+        timeline.pull(self.user)
+        timeline._pull(stale)
+
+        self.assertEqual(self.get_ids(), [tweet.id])
+
+    def test_fan_out_is_a_job(self):
+        """Test fanning out is queued for the job workers"""
+        timeline.follow(self.user, self.author)
+        tweet = Tweet.objects.create(user=self.author, title='hello')
+
+        timeline.schedule_fan_out(iter([tweet.id]))
+
+        job = Job.objects.get()
+        self.assertEqual(job.queue, 'timelines')
+        self.assertTrue(jobs.run(job))
+        self.assertEqual(self.get_ids(), [tweet.id])
+
+    @override_settings(TIMELINE_FAN_OUT_LIMIT=1)
+    def test_switch_to_fan_out_on_read_with_queued_fan_out(self):
+        """Test tweets queued for fan-out when an author switches arrive"""
+        timeline.follow(self.user, self.author)
+        tweet = Tweet.objects.create(user=self.author, title='queued')
+        job = timeline.schedule_fan_out([tweet.id])
+
+        timeline.follow(create_user('fan@test.com'), self.author)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.fan_out_on_read)
+        jobs.run(job)
+
+        self.assertEqual(self.get_ids(), [tweet.id])
+
+    def test_timeline_query_count(self):
+        """Test a timeline page is read with a constant number of queries"""
+        timeline.follow(self.user, self.author)
+        for i in range(10):
+            self.post(self.author, f'tweet {i}')
+
+        # pull check, entries joined with tweets, tags, descriptions
+        with self.assertNumQueries(4):
+            self.get_ids()
+
+    @override_settings(TIMELINE_FAN_OUT_LIMIT=1)
+    def test_high_follower_accounts_fan_out_on_read(self):
+        """Test popular authors' tweets are pulled into timelines on read"""
+        timeline.follow(self.user, self.author)
+        timeline.follow(create_user('fan@test.com'), self.author)
+        self.author.refresh_from_db()
+        tweet = self.post(self.author, 'popular')
+
+        self.assertTrue(self.author.fan_out_on_read)
+        self.assertFalse(TimelineEntry.objects.filter(
+            owner=self.user, tweet=tweet).exists())
+        self.assertEqual(self.get_ids(), [tweet.id])
+        self.assertEqual(self.get_ids(), [tweet.id])
+
+    @override_settings(TIMELINE_FAN_OUT_LIMIT=1)
+    def test_pull_reports_writes(self):
+        """Test pull() tells whether it brought new tweets in"""
+        timeline.follow(self.user, self.author)
+        timeline.follow(create_user('fan@test.com'), self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(timeline.pull(self.user))
+
+        self.post(self.author, 'popular')
+
+        self.assertTrue(timeline.pull(self.user))
+        self.assertFalse(timeline.pull(self.user))
+
+    @override_settings(TIMELINE_FAN_OUT_LIMIT=1)
+    def test_switch_back_to_fan_out_on_write(self):
+        """Test followers are caught up when an author loses followers"""
+        fan = create_user('fan@test.com')
+        timeline.follow(self.user, self.author)
+        timeline.follow(fan, self.author)
+        self.author.refresh_from_db()
+        pulled = self.post(self.author, 'pulled')
+
+        timeline.unfollow(fan, self.author)
+        self.author.refresh_from_db()
+        pushed = self.post(self.author, 'pushed')
+
+        self.assertFalse(self.author.fan_out_on_read)
+        self.assertEqual(TimelineEntry.objects.filter(
+            owner=self.user, tweet__in=[pulled, pushed]).count(), 2)
+
+    @patch('tweet.timeline.schedule_fan_out')
+    def test_create_tweet_schedules_fan_out(self, schedule):
+        """Test creating a tweet schedules its fan-out"""
+        self.client.post(TWEET_URL, {'title': 'Hello'})
+
+        schedule.assert_called_once_with([Tweet.objects.get().id])
@@ -1,21 +1,23 @@
 import tempfile
 import os
+from types import SimpleNamespace
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tweet, Tag, Description
+from core.models import Job, Tweet, Tag, Description
 
 from tweet.serializers import TweetSerializer, TweetDetailSerializer
 
 
 TWEET_URL = reverse('tweet:tweet-list')
+BATCH_URL = reverse('tweet:tweet-batch')
 
 
 def image_upload_url(tweet_id):
@@ -81,7 +83,7 @@ class PrivateTweetApiTest(TestCase):
         serializer = TweetSerializer(tweets, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tweets_limited_to_user(self):
         """test retrieving tweets for user"""
@@ -98,8 +100,8 @@ class PrivateTweetApiTest(TestCase):
         serializer = TweetSerializer(tweets, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_tweet_detail(self):
         """Test viewing a tweet detail"""
@@ -157,6 +159,271 @@ class PrivateTweetApiTest(TestCase):
         self.assertIn(description1, descriptions)
         self.assertIn(description1, descriptions)
 
+    def test_create_tweet_with_other_users_tag(self):
+        """Test tags of other users cannot be added to a tweet"""
+        other = get_user_model().objects.create_user('o@o.com', 'test123')
+        tag = sample_tag(user=other)
+        payload = {'title': 'Stolen', 'tags': [tag.id]}
+
+        res = self.client.post(TWEET_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_missing_tags_reported_together(self):
+        """Test every unknown tag id is reported in one error"""
+        tag = sample_tag(user=self.user)
+        payload = {'title': 'Typo', 'tags': [tag.id, 998, 999]}
+
+        res = self.client.post(TWEET_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertIn('998, 999', res.data['tags'][0])
+
+    def test_tag_lookup_query_count(self):
+        """Test tags are looked up with one query however many are sent"""
+        tweet = sample_tweet(user=self.user)
+        tags = [sample_tag(self.user, f'tag {i}').id for i in range(20)]
+        context = {'request': SimpleNamespace(user=self.user)}
+
+        for count in (1, 20):
+            serializer = TweetSerializer(
+                data={'tags': tags[:count]}, partial=True, context=context)
+            with self.assertNumQueries(1):
+                self.assertTrue(serializer.is_valid())
+
+        res = self.client.patch(detail_url(tweet.id), {'tags': tags})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(tweet.tags.count(), 20)
+
+
+class TweetFilterTests(TestCase):
+    """Test filtering the tweet list by tags and descriptions"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(self.user, 'Vegan')
+        self.dessert = sample_tag(self.user, 'Dessert')
+        self.spicy = sample_description(self.user, 'Spicy')
+        self.tweet1 = sample_tweet(self.user, title='Curry')
+        self.tweet1.tags.add(self.vegan)
+        self.tweet1.descriptions.add(self.spicy)
+        self.tweet2 = sample_tweet(self.user, title='Sorbet')
+        self.tweet2.tags.add(self.vegan, self.dessert)
+        self.tweet3 = sample_tweet(self.user, title='Steak')
+
+    def get_ids(self, params):
+        """Return the ids of tweets listed with params"""
+        res = self.client.get(TWEET_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return {tweet['id'] for tweet in res.data['results']}
+
+    def test_filter_by_any_tag(self):
+        """Test returning tweets with any of the given tags"""
+        ids = self.get_ids({'tags': f'{self.vegan.id},{self.dessert.id}'})
+
+        self.assertEqual(ids, {self.tweet1.id, self.tweet2.id})
+
+    def test_filter_by_all_tags(self):
+        """Test returning tweets with all of the given tags"""
+        ids = self.get_ids({
+            'tags': f'{self.vegan.id},{self.dessert.id},{self.vegan.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(ids, {self.tweet2.id})
+
+    def test_filter_by_tags_and_descriptions(self):
+        """Test combining tag and description filters"""
+        ids = self.get_ids({
+            'tags': f'{self.vegan.id}',
+            'descriptions': f'{self.spicy.id}',
+        })
+
+        self.assertEqual(ids, {self.tweet1.id})
+
+    def test_filter_uses_one_query(self):
+        """Test filters are applied as subqueries of the list query"""
+        with self.assertNumQueries(2):
+            self.get_ids({'tags': f'{self.dessert.id}', 'match': 'all'})
+
+    def test_invalid_ids_rejected(self):
+        """Test malformed ids are rejected before querying"""
+        for value in ('1,abc', '', '0', '-2'):
+            with self.assertNumQueries(0):
+                res = self.client.get(TWEET_URL, {'tags': value})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_match_rejected(self):
+        """Test only any and all matching is accepted"""
+        res = self.client.get(
+            TWEET_URL, {'tags': f'{self.vegan.id}', 'match': 'most'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TweetQueryCountTests(TestCase):
+    """Test the number of queries used to serialize tweets"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_tweets(self, count):
+        """Create tweets that each have tags and descriptions"""
+        tags = [sample_tag(self.user, f'tag {i}') for i in range(3)]
+        descriptions = [
+            sample_description(self.user, f'description {i}')
+            for i in range(3)
+        ]
+        tweets = []
+        for i in range(count):
+            tweet = sample_tweet(self.user, title=f'tweet {i}')
+            tweet.tags.set(tags)
+            tweet.descriptions.set(descriptions)
+            tweets.append(tweet)
+
+        return tweets
+
+    def test_list_query_count_is_constant(self):
+        """Test listing tweets uses the same queries for any page size"""
+        self.create_tweets(2)
+        with self.assertNumQueries(2):
+            self.client.get(TWEET_URL)
+
+        self.create_tweets(20)
+        with self.assertNumQueries(2):
+            res = self.client.get(TWEET_URL)
+
+        self.assertEqual(len(res.data['results']), 22)
+        self.assertEqual(len(res.data['results'][0]['tags']), 3)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a tweet prefetches nested tags and descriptions"""
+        tweet = self.create_tweets(1)[0]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(tweet.id))
+
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(len(res.data['descriptions']), 3)
+
+
+class TweetBatchTests(TestCase):
+    """Test creating tweets in batches"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(self.user)
+        self.description = sample_description(self.user)
+
+    def test_create_batch(self):
+        """Test creating several tweets with tags and descriptions"""
+        payload = [
+            {'title': 'first', 'tags': [self.tag.id], 'descriptions': []},
+            {'title': 'second', 'tags': [self.tag.id],
+             'descriptions': [self.description.id]},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tweets = Tweet.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([t.title for t in tweets], ['first', 'second'])
+        self.assertEqual([t['id'] for t in res.data], [t.id for t in tweets])
+        self.assertEqual(list(tweets[1].descriptions.all()),
+                         [self.description])
+        self.assertEqual(self.tag.tweet_set.count(), 2)
+
+    def test_batch_relations_resolved_together(self):
+        """Test a batch's tags and descriptions take one query per field"""
+        payload = [
+            {'title': f'tweet {i}', 'tags': [self.tag.id],
+             'descriptions': [self.description.id]}
+            for i in range(20)
+        ]
+        serializer = TweetSerializer(
+            data=payload, many=True,
+            context={'request': SimpleNamespace(user=self.user)}
+        )
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+    def test_batch_unknown_relations(self):
+        """Test ids missing from a preloaded batch are reported per item"""
+        other = sample_tag(
+            get_user_model().objects.create_user('o@o.com', 'test123'))
+        payload = [
+            {'title': 'mine', 'tags': [self.tag.id], 'descriptions': []},
+            {'title': 'theirs', 'tags': [other.id], 'descriptions': []},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+
+    def test_batch_errors_per_item(self):
+        """Test invalid tweets are reported by position and none saved"""
+        payload = [
+            {'title': 'valid', 'tags': [], 'descriptions': []},
+            {'title': '', 'tags': [], 'descriptions': []},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_batch_must_be_list(self):
+        """Test a single tweet is rejected by the batch endpoint"""
+        payload = {'title': 'single', 'tags': [], 'descriptions': []}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TWEET_BATCH_LIMIT=1)
+    def test_batch_limit(self):
+        """Test batches over the limit are rejected"""
+        payload = [{'title': 'tweet', 'tags': [], 'descriptions': []}] * 2
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_batch_shows_in_cached_list(self):
+        """Test batch created tweets invalidate cached responses"""
+        etag = self.client.get(TWEET_URL)['ETag']
+        payload = [{'title': 'tweet', 'tags': [], 'descriptions': []}]
+        self.client.post(BATCH_URL, payload, format='json')
+
+        res = self.client.get(TWEET_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(len(res.data['results']), 1)
+
 
 class TweetImageUploadTests(TestCase):
 
@@ -183,6 +450,31 @@ class TweetImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.tweet.image.path))
 
+    def test_upload_image_queues_variants(self):
+        """Test image processing is queued instead of run in the request"""
+        url = image_upload_url(self.tweet.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='PNG')
+            ntf.seek(0)
+            self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.tweet.refresh_from_db()
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'core.variants.generate')
+        self.assertEqual(job.queue, 'images')
+        self.assertIn(self.tweet.image.name, job.args)
+
+    def test_upload_file_not_image(self):
+        """Test uploading a file that is not an image"""
+        url = image_upload_url(self.tweet.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            ntf.write(b'not an image')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.tweet.id)
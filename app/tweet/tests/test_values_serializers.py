@@ -0,0 +1,106 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Tag, Description, Tweet
+
+from tweet.serializers import TagSerializer, DescriptionSerializer, \
+    TweetSerializer
+
+
+ALPHABET = 'abcXYZ 019"\\\'/<>&éß中文\U0001f426\n\t'
+TRIALS = 5
+
+
+def random_text(rng):
+    """Return a short string mixing characters JSON has to escape"""
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class ValuesSerializerPropertyTests(TestCase):
+    """Test values() serialization renders exactly like the serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'test123')
+
+    def populate(self, rng):
+        """Create random tags, descriptions and tweets linking them"""
+        tags = [Tag.objects.create(user=self.user, name=random_text(rng))
+                for _ in range(rng.randint(0, 8))]
+        descriptions = [
+            Description.objects.create(user=self.user, name=random_text(rng))
+            for _ in range(rng.randint(0, 8))
+        ]
+        for _ in range(rng.randint(0, 15)):
+            tweet = Tweet.objects.create(
+                user=self.user, title=random_text(rng))
+            tweet.tags.set(rng.sample(tags, rng.randint(0, len(tags))))
+            tweet.descriptions.set(
+                rng.sample(descriptions, rng.randint(0, len(descriptions))))
+
+    def assertSameJson(self, serializer_class, queryset):
+        expected = render(serializer_class(queryset, many=True).data)
+        fast = render(serializer_class.to_values_representation(
+            serializer_class.values_queryset(queryset)))
+
+        self.assertEqual(fast, expected)
+
+    def test_random_data(self):
+        """Test random rows serialize to the same JSON both ways"""
+        for seed in range(TRIALS):
+            with self.subTest(seed=seed):
+                self.populate(random.Random(seed))
+
+                self.assertSameJson(TweetSerializer, Tweet.objects.all())
+                self.assertSameJson(TagSerializer, Tag.objects.all())
+                self.assertSameJson(
+                    DescriptionSerializer, Description.objects.all())
+
+    def test_extra_keys_not_rendered(self):
+        """Test ordering keys fetched for pagination are left out"""
+        Tag.objects.create(user=self.user, name='vegan')
+        rows = TagSerializer.values_queryset(
+            Tag.objects.all(), ['name', 'user_id'])
+
+        data = TagSerializer.to_values_representation(rows)
+
+        self.assertEqual(list(data[0]), ['id', 'name'])
+
+    def test_empty(self):
+        """Test nothing is queried for the relations of no rows"""
+        with self.assertNumQueries(1):
+            data = TweetSerializer.to_values_representation(
+                TweetSerializer.values_queryset(Tweet.objects.all()))
+
+        self.assertEqual(data, [])
+
+    def test_api_lists_match(self):
+        """Test the list endpoints return what the serializers produce"""
+        self.populate(random.Random(TRIALS))
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        for url, serializer_class, queryset in (
+                (reverse('tweet:tweet-list'), TweetSerializer,
+                 Tweet.objects.order_by('-id')),
+                (reverse('tweet:tag-list'), TagSerializer,
+                 Tag.objects.order_by('-name', '-id')),
+                (reverse('tweet:description-list'), DescriptionSerializer,
+                 Description.objects.order_by('-name', '-id'))):
+            with self.subTest(url=url):
+                res = client.get(url, {'page_size': 500})
+
+                self.assertEqual(
+                    render(res.data['results']),
+                    render(serializer_class(queryset, many=True).data)
+                )
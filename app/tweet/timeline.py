@@ -0,0 +1,201 @@
+"""
+Home timelines materialized per user.
+
+Tweets are pushed into the timelines of their author's followers when they
+are written (fan-out-on-write).  Authors with more followers than
+TIMELINE_FAN_OUT_LIMIT are switched to fan-out-on-read: their tweets are
+pulled into a follower's timeline when that follower reads it.  Either way
+a timeline read is a single range scan of the follower's entries.
+
+Fanning out runs on the timelines job queue.  Entries are inserted
+skipping the ones already there, so concurrent fan-outs, pulls and
+backfills may overlap.
+"""
+from django.conf import settings
+from django.db import IntegrityError, connection, router, transaction
+from django.db.models import Max, Q
+
+from core import jobs, replicas
+from core.models import Follow, TimelineEntry, Tweet, User
+
+
+BATCH_SIZE = 500
+
+
+def add_entries(entries):
+    """Insert timeline entries, skipping those that already exist"""
+    entries = list(entries)
+    if connection.vendor == 'postgresql':
+        table = TimelineEntry._meta.db_table
+        with connection.cursor() as cursor:
+            for start in range(0, len(entries), BATCH_SIZE):
+                batch = entries[start:start + BATCH_SIZE]
+                cursor.execute(
+                    f'INSERT INTO {table} (owner_id, tweet_id) VALUES '
+                    + ', '.join(['(%s, %s)'] * len(batch))
+                    + ' ON CONFLICT (owner_id, tweet_id) DO NOTHING',
+                    [value for entry in batch
+                     for value in (entry.owner_id, entry.tweet_id)]
+                )
+        return
+
+    for start in range(0, len(entries), BATCH_SIZE):
+        batch = entries[start:start + BATCH_SIZE]
+        try:
+            with transaction.atomic():
+                TimelineEntry.objects.bulk_create(batch)
+        except IntegrityError:
+            # Another writer got to some of them first
+            for entry in batch:
+                try:
+                    with transaction.atomic():
+                        entry.save(force_insert=True)
+                except IntegrityError:
+                    pass
+
+
+@jobs.task(queue='timelines')
+def fan_out(tweet_ids):
+    """Push tweets into their authors' and followers' timelines"""
+    tweets = Tweet.objects.filter(id__in=tweet_ids) \
+        .values_list('id', 'user_id', 'user__fan_out_on_read')
+
+    for tweet_id, user_id, on_read in tweets:
+        existing = set(TimelineEntry.objects.filter(tweet_id=tweet_id)
+                       .values_list('owner_id', flat=True))
+        followers = Follow.objects.filter(followee_id=user_id)
+        if on_read:
+            # Followers only pull tweets after their cursor, which moved
+            # past this one if the author switched to fan-out-on-read
+            # while the job was queued
+            followers = followers.filter(pulled_through__gte=tweet_id)
+        owners = [user_id]
+        owners.extend(
+            followers.values_list('follower_id', flat=True).iterator())
+        add_entries(
+            TimelineEntry(owner_id=owner_id, tweet_id=tweet_id)
+            for owner_id in owners if owner_id not in existing
+        )
+
+
+def schedule_fan_out(tweet_ids):
+    """Queue fanning tweets out, run once the transaction commits"""
+    return fan_out.delay(list(tweet_ids))
+
+
+def pull(user):
+    """
+    Copy new tweets by followed fan-out-on-read authors into a timeline.
+
+    Return whether any tweets were pulled.
+    """
+    # The cursors are moved on below, so read them from the primary
+    follows = Follow.objects.using(router.db_for_write(Follow)).filter(
+        follower=user,
+        followee__fan_out_on_read=True
+    )
+    if not follows.exists():
+        return False
+
+    with transaction.atomic():
+        # A concurrent read of the same timeline waits for these cursors
+        return _pull(list(follows.select_for_update()))
+
+
+def _pull(follows):
+    """Bring every follow's timeline up to date, return if it moved"""
+    by_followee = {}
+    for follow in follows:
+        by_followee.setdefault(follow.followee_id, []).append(follow)
+    if not by_followee:
+        return False
+
+    condition = Q()
+    for followee_id, followee_follows in by_followee.items():
+        pulled = min(follow.pulled_through for follow in followee_follows)
+        condition |= Q(user_id=followee_id, id__gt=pulled)
+    tweets = Tweet.objects.filter(condition).values_list('id', 'user_id')
+
+    latest = {}
+    entries = []
+    for tweet_id, user_id in tweets.iterator():
+        latest[user_id] = max(latest.get(user_id, 0), tweet_id)
+        entries.extend(
+            TimelineEntry(owner_id=follow.follower_id, tweet_id=tweet_id)
+            for follow in by_followee[user_id]
+            if follow.pulled_through < tweet_id
+        )
+    add_entries(entries)
+
+    for followee_id, tweet_id in latest.items():
+        ids = [follow.id for follow in by_followee[followee_id]]
+        for start in range(0, len(ids), BATCH_SIZE):
+            Follow.objects.filter(id__in=ids[start:start + BATCH_SIZE]) \
+                .update(pulled_through=tweet_id)
+
+    return bool(latest)
+
+
+@transaction.atomic
+def follow(follower, followee):
+    """Start following followee and backfill their recent tweets"""
+    recent = list(
+        Tweet.objects.filter(user=followee).order_by('-id')
+        .values_list('id', flat=True)[:settings.TIMELINE_BACKFILL]
+    )
+    relation = Follow.objects.create(
+        follower=follower,
+        followee=followee,
+        pulled_through=recent[0] if recent else 0
+    )
+    existing = set(TimelineEntry.objects.filter(
+        owner=follower,
+        tweet_id__in=recent
+    ).values_list('tweet_id', flat=True))
+    add_entries(
+        TimelineEntry(owner=follower, tweet_id=tweet_id)
+        for tweet_id in recent if tweet_id not in existing
+    )
+    update_fan_out_mode(followee)
+
+    return relation
+
+
+@transaction.atomic
+def unfollow(follower, followee):
+    """Stop following followee and drop their tweets from the timeline"""
+    Follow.objects.filter(follower=follower, followee=followee).delete()
+    TimelineEntry.objects.filter(
+        owner=follower,
+        tweet__user=followee
+    ).delete()
+    update_fan_out_mode(followee)
+
+
+def update_fan_out_mode(user):
+    """Switch user between fan-out-on-write and fan-out-on-read"""
+    on_read = Follow.objects.filter(followee=user).count() \
+        > settings.TIMELINE_FAN_OUT_LIMIT
+    if on_read == user.fan_out_on_read:
+        return
+
+    if on_read:
+        # Tweets up to now are pushed, by fan_out() if still queued
+        latest = Tweet.objects.filter(user=user).aggregate(Max('id'))
+        Follow.objects.filter(followee=user) \
+            .update(pulled_through=latest['id__max'] or 0)
+    else:
+        # Catch every follower up before tweets are pushed again
+        _pull(list(Follow.objects.filter(followee=user)))
+
+    User.objects.filter(pk=user.pk).update(fan_out_on_read=on_read)
+    user.fan_out_on_read = on_read
+
+
+def timeline_entries(user):
+    """Return the user's timeline entries, pulling pending tweets first"""
+    if pull(user):
+        # Replicas do not have the entries just pulled yet
+        replicas.use_primary()
+
+    return TimelineEntry.objects.filter(owner=user)
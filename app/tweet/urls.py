@@ -8,9 +8,11 @@ router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('descriptions', views.DescriptionViewSet)
 router.register('tweets', views.TweetViewSet)
+router.register('timeline', views.TimelineViewSet, basename='timeline')
 
 app_name = 'tweet'
 
 urlpatterns = [
+    path('archive/', views.ArchiveView.as_view(), name='archive'),
     path('', include(router.urls)),
 ]
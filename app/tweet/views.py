@@ -1,19 +1,112 @@
+from django.conf import settings
+from django.db.models import Count, Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, \
+    patch_vary_headers
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
+from core import replicas, variants
+from core.renderers import JSONRenderer, NDJSONRenderer
 from core.models import Tag, Description, Tweet
-from tweet import serializers
+from core.search import search_tweets, words
+from core.timing import TimingMixin
+from tweet import export, serializers, streaming, timeline
+from tweet.cache import CachedResponseMixin, get_versions, tweet_scope
+from tweet.conditional import ConditionalResponseMixin, make_validators
+from tweet.pagination import TweetPagination, TweetAttrPagination, \
+    TweetSearchPagination, TimelinePagination
+from user.authentication import CachedTokenAuthentication
+
+
+def prefetch_tweet_attrs(fields, prefix=''):
+    """Return prefetches loading only fields of tweet tags/descriptions"""
+    tags = Tag.objects.only(*fields).order_by('id')
+    descriptions = Description.objects.only(*fields).order_by('id')
+
+    return (
+        Prefetch(f'{prefix}tags', queryset=tags),
+        Prefetch(f'{prefix}descriptions', queryset=descriptions),
+    )
+
+
+class ValuesListMixin:
+    """List from the serializer's values() rows instead of instances"""
+
+    def list(self, request, *args, **kwargs):
+        return self.list_values(self.filter_queryset(self.get_queryset()))
 
+    def list_values(self, queryset):
+        """Return the response listing queryset, a page of it if paged"""
+        serializer_class = self.get_serializer_class()
+        # Keyset pagination reads the ordering key from the rows
+        ordering = getattr(self.paginator, 'ordering', ())
+        rows = serializer_class.values_queryset(
+            queryset, [field.lstrip('-') for field in ordering])
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(serializer_class.to_values_representation(rows))
+
+        return self.get_paginated_response(
+            serializer_class.to_values_representation(page))
+
+
+class StreamingListMixin:
+    """Stream the whole list as a JSON array or as NDJSON"""
+    stream_ordering = ('-id',)
+
+    @action(methods=['GET'], detail=False, pagination_class=None,
+            renderer_classes=(JSONRenderer, NDJSONRenderer))
+    def stream(self, request):
+        """Send every object in one response, encoded as it is read"""
+        serializer_class = self.get_serializer_class()
+        chunks = streaming.iter_chunks(
+            serializer_class,
+            self.filter_queryset(self.get_queryset()),
+            self.stream_ordering,
+            settings.API_STREAM_CHUNK_SIZE
+        )
 
-class BaseTweetAttrViewSet(viewsets.GenericViewSet,
+        renderer = request.accepted_renderer
+        if renderer.format == 'ndjson':
+            content = streaming.stream_ndjson(chunks)
+        else:
+            content = streaming.stream_json(chunks)
+        response = StreamingHttpResponse(
+            content, content_type=renderer.media_type)
+        patch_vary_headers(response, ('Accept',))
+        # Let nginx pass chunks on as they are produced
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+
+class BaseTweetAttrViewSet(TimingMixin,
+                           ConditionalResponseMixin,
+                           CachedResponseMixin,
+                           StreamingListMixin,
+                           ValuesListMixin,
+                           viewsets.GenericViewSet,
                            mixins.ListModelMixin,
                            mixins.CreateModelMixin):
     """Base tweet attribute view set"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = TweetAttrPagination
+    stream_ordering = ('-name', '-id')
+    cache_scope = None
+
+    def get_cache_scopes(self):
+        """Cache lists until an attribute of the user changes"""
+        return (self.cache_scope,)
 
     def get_queryset(self):
         """Return objects for the authenticated user"""
@@ -28,24 +121,95 @@ class TagViewSet(BaseTweetAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    cache_scope = 'tags'
 
 
 class DescriptionViewSet(BaseTweetAttrViewSet):
     """Manage descriptions in the database"""
     queryset = Description.objects.all()
     serializer_class = serializers.DescriptionSerializer
+    cache_scope = 'descriptions'
 
 
-class TweetViewSet(viewsets.ModelViewSet):
+class TweetViewSet(TimingMixin,
+                   ConditionalResponseMixin,
+                   CachedResponseMixin,
+                   StreamingListMixin,
+                   ValuesListMixin,
+                   viewsets.ModelViewSet):
     """Manage tweets in the database"""
     serializer_class = serializers.TweetSerializer
     queryset = Tweet.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = TweetPagination
+    cached_actions = ('retrieve',)
+    conditional_actions = ('list', 'retrieve')
+
+    def get_cache_scopes(self):
+        """Version tweets until they or any tag/description changes"""
+        if self.action == 'retrieve':
+            return (tweet_scope(self.kwargs['pk']), 'tags', 'descriptions')
+
+        # Deleting a tag or description drops it from tweets without
+        # sending any tweet signal
+        return ('tweets', 'tags', 'descriptions')
+
+    def _params_to_ints(self, name):
+        """Convert a comma separated query parameter to a set of ids"""
+        str_ids = self.request.query_params[name].split(',')
+        try:
+            ids = {int(str_id) for str_id in str_ids}
+        except ValueError:
+            ids = set()
+        if not ids or min(ids) < 1:
+            raise ValidationError(
+                {name: _('Expected a comma separated list of ids.')})
+
+        return ids
+
+    def _filter_related(self, queryset, field, ids, match_all):
+        """Keep tweets linked to any or all of ids through an M2M field"""
+        m2m = Tweet._meta.get_field(field)
+        tweet, related = m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+        matches = m2m.remote_field.through.objects.filter(
+            **{f'{related}__in': ids})
+        if match_all:
+            matches = matches.values(tweet) \
+                .annotate(matched=Count(related)) \
+                .filter(matched=len(ids))
+
+        return queryset.filter(id__in=matches.values(tweet))
+
+    def filter_queryset(self, queryset):
+        """Filter tweets by the tags and descriptions query parameters"""
+        queryset = super().filter_queryset(queryset)
+        if self.action not in ('list', 'search', 'stream'):
+            return queryset
+
+        params = self.request.query_params
+        match = params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': _('Expected "any" or "all".')})
+
+        filters = [
+            (field, self._params_to_ints(field))
+            for field in ('tags', 'descriptions') if field in params
+        ]
+        for field, ids in filters:
+            queryset = self._filter_related(
+                queryset, field, ids, match == 'all')
+
+        return queryset
 
     def get_queryset(self):
         """Retrieve the tweets for the authenticated user"""
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action != 'retrieve':
+            return queryset
+
+        return queryset.prefetch_related(
+            *prefetch_tweet_attrs(('id', 'name')))
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -58,7 +222,30 @@ class TweetViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Create a new tweet"""
-        serializer.save(user=self.request.user)
+        tweet = serializer.save(user=self.request.user)
+        timeline.schedule_fan_out([tweet.id])
+
+    @action(methods=['POST'], detail=False)
+    def batch(self, request):
+        """Create a list of tweets for the authenticated user at once"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        tweets = serializer.save(user=request.user)
+        prefetch_related_objects(tweets, *prefetch_tweet_attrs(('id',)))
+        timeline.schedule_fan_out(tweet.id for tweet in tweets)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'], detail=False,
+            pagination_class=TweetSearchPagination)
+    def search(self, request):
+        """Search the titles of the authenticated user's tweets"""
+        query = request.query_params.get('q', '')
+        if not words(query):
+            raise ValidationError({'q': _('Enter words to search for.')})
+
+        return self.list_values(search_tweets(
+            self.filter_queryset(self.get_queryset()), query))
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -70,7 +257,8 @@ class TweetViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            tweet = serializer.save()
+            variants.schedule(tweet.image.name)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -80,3 +268,57 @@ class TweetViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class TimelineViewSet(TimingMixin, viewsets.GenericViewSet,
+                      mixins.ListModelMixin):
+    """List the home timeline of the authenticated user"""
+    serializer_class = serializers.TimelineTweetSerializer
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = TimelinePagination
+
+    def get_queryset(self):
+        """Return the timeline entries of the authenticated user"""
+        return timeline.timeline_entries(self.request.user) \
+            .select_related('tweet') \
+            .prefetch_related(*prefetch_tweet_attrs(('id',), 'tweet__'))
+
+    def list(self, request, *args, **kwargs):
+        """List the tweets in the timeline, newest first"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(
+            [entry.tweet for entry in page],
+            many=True
+        )
+
+        return self.get_paginated_response(serializer.data)
+
+
+class ArchiveView(TimingMixin, APIView):
+    """Download the authenticated user's account as a ZIP archive"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # The archive is a ZIP whatever is accepted, only errors are rendered
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        """Stream the archive, or the range of it resuming a download"""
+        versions = get_versions(
+            request.user.pk, ('tweets', 'tags', 'descriptions'))
+        etag, last_modified = make_validators(request.path, 'zip', versions)
+        replicas.use_primary(since=last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = export.send(
+                request, export.build(request.user, etag), etag)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        response['Accept-Ranges'] = 'bytes'
+
+        return response
@@ -0,0 +1,150 @@
+"""
+Token authentication with cached token lookups.
+
+The id and active flag of each token's user are cached in a small
+per-process LRU in front of the shared AUTH_TOKEN_CACHE_ALIAS cache, so
+most requests authenticate without touching the database.  Requests get
+a user with only those fields loaded; the others, never the password
+hash, are read from the database when used.  Deleting a token or saving
+its user clears it from the shared cache, which every process must use
+(see core.checks), and from this process's LRU.  The LRUs of other
+processes drop it within AUTH_TOKEN_CACHE_LOCAL_TIMEOUT, so a revoked
+token stops working everywhere within that many seconds.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from django.core.cache import caches
+from django.db import router
+from django.db.models.signals import post_save, post_delete
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.models import User
+
+
+class LocalCache:
+    """Thread-safe LRU mapping with a time to live per entry"""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalCache(
+    settings.AUTH_TOKEN_CACHE_SIZE,
+    settings.AUTH_TOKEN_CACHE_LOCAL_TIMEOUT
+)
+
+
+def get_cache():
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def _cache_key(key):
+    # Never use the raw token as a cache key
+    return 'auth:token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def invalidate(*keys):
+    """Forget the users cached for token keys"""
+    cache_keys = [_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_cache.delete(cache_key)
+    get_cache().delete_many(cache_keys)
+
+
+def _user(entry):
+    """Return a user with only the cached fields loaded"""
+    names = [field.attname for field in User._meta.concrete_fields
+             if field.attname in entry]
+
+    return User.from_db(
+        router.db_for_write(User), names, [entry[name] for name in names])
+
+
+def cached_user(key):
+    """Return the cached user of a token, or None if it is not cached"""
+    cache_key = _cache_key(key)
+    entry = local_cache.get(cache_key)
+    if entry is None:
+        entry = get_cache().get(cache_key)
+        if entry is None:
+            return None
+        local_cache.set(cache_key, entry)
+
+    # Requests may modify their user, so each gets its own
+    return _user(entry)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the user of each token"""
+
+    def authenticate_credentials(self, key):
+        user = cached_user(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            entry = {'id': user.pk, 'is_active': user.is_active}
+            cache_key = _cache_key(key)
+            get_cache().set(
+                cache_key, entry, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            local_cache.set(cache_key, entry)
+            user = _user(entry)
+        elif not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        return user, Token(key=key, user=user)
+
+
+def _invalidate_token(sender, instance, **kwargs):
+    invalidate(instance.key)
+
+
+def _invalidate_user(sender, instance, created, **kwargs):
+    if not created:
+        invalidate(*Token.objects.filter(user_id=instance.pk)
+                   .values_list('key', flat=True))
+
+
+def connect_signals():
+    """Drop cached users as soon as their token or account changes"""
+    post_save.connect(_invalidate_token, sender=Token)
+    post_delete.connect(_invalidate_token, sender=Token)
+    post_save.connect(_invalidate_user, sender=User)
@@ -0,0 +1,5 @@
+from tweet.consumers import ReadConsumer
+
+
+class ManageUserConsumer(ReadConsumer):
+    """Serve the authenticated user, which has no cached validators"""
@@ -0,0 +1,160 @@
+"""
+Password verification in a bounded worker pool.
+
+Hashing a password is deliberately slow, so a burst of logins can keep
+every request worker busy hashing.  Logins verify passwords on a fixed
+pool of LOGIN_HASH_WORKERS threads instead (the hashers release the GIL),
+and once LOGIN_HASH_QUEUE logins are waiting further ones are turned away
+with 503 straight away rather than queueing behind the burst.  Database
+work stays on the request thread.
+
+HashingBackend is the authentication backend doing so, used through
+django.contrib.auth.authenticate() like any other.  The pool's queue
+depth and counters are reported by /readyz, and rejected logins are
+logged to user.hashing.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, \
+    identify_hasher, make_password
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again shortly.')
+    default_code = 'hashing_unavailable'
+    wait = 1
+
+
+class HashingPool:
+    """Thread pool that rejects work once max_pending tasks are waiting"""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='password-hash'
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def run(self, func, *args, timeout=None):
+        """Run func in the pool and return its result"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                logger.warning('Login rejected, hashing pool full: %s',
+                               self._stats())
+                raise HashingUnavailable()
+            self._pending += 1
+
+        future = self._executor.submit(self._call, func, *args)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise HashingUnavailable()
+
+    def _call(self, func, *args):
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._running -= 1
+                self._completed += 1
+
+    def stats(self):
+        """Return the pool's queue depth and counters"""
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'queued': self._pending - self._running,
+            'completed': self._completed,
+            'rejected': self._rejected,
+        }
+
+
+pool = HashingPool(settings.LOGIN_HASH_WORKERS, settings.LOGIN_HASH_QUEUE)
+
+_dummy_password = None
+
+
+def verify(password, encoded):
+    """
+    Check password against encoded in the calling thread.
+
+    Returns whether it matched and, when the stored hash does not use the
+    preferred hasher or its current work factor, the password hashed anew.
+    """
+    if not check_password(password, encoded):
+        return False, None
+
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    if hasher.algorithm != preferred.algorithm \
+            or preferred.must_update(encoded):
+        return True, make_password(password, hasher=preferred)
+
+    return True, None
+
+
+class HashingBackend(ModelBackend):
+    """Model backend verifying passwords in the hashing pool"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        global _dummy_password
+
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            user = None
+
+        if user is not None and user.has_usable_password():
+            encoded = user.password
+        else:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            if _dummy_password is None:
+                _dummy_password = make_password(user_model.__name__)
+            encoded = _dummy_password
+            user = None
+
+        valid, rehashed = pool.run(
+            verify, password, encoded, timeout=settings.LOGIN_HASH_TIMEOUT)
+        if user is None or not valid or not self.user_can_authenticate(user):
+            return None
+
+        if rehashed:
+            # Skip the update if the password was changed in the meantime
+            user_model._default_manager \
+                .filter(pk=user.pk, password=encoded) \
+                .update(password=rehashed)
+            user.password = rehashed
+
+        return user
@@ -0,0 +1,75 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from user import authentication
+
+
+def time_requests(backend, request, iterations):
+    """Return the mean seconds backend takes to authenticate request"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        backend.authenticate(request)
+
+    return (time.perf_counter() - start) / iterations
+
+
+class Command(BaseCommand):
+    """Django command to benchmark token authentication"""
+    help = 'Measure the per-request cost of token authentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=2000,
+            help='Requests to authenticate with each backend'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # Run against a throwaway user that is rolled back afterwards
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'bench-auth@chirpr.invalid', None)
+            token = Token.objects.create(user=user)
+            request = APIRequestFactory().get(
+                '/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+            uncached = time_requests(
+                TokenAuthentication(), request, iterations)
+
+            authentication.invalidate(token.key)
+            cached = authentication.CachedTokenAuthentication()
+            cached.authenticate(request)
+            local = time_requests(cached, request, iterations)
+
+            authentication.local_cache.clear()
+            shared = time_requests(
+                _SharedCacheOnly(), request, iterations)
+
+            authentication.invalidate(token.key)
+            transaction.set_rollback(True)
+
+        for name, seconds in (
+                ('database', uncached),
+                ('shared cache', shared),
+                ('local cache', local)):
+            self.stdout.write(
+                f'{name}: {seconds * 1e6:.1f} us/request '
+                f'({(uncached - seconds) * 1e6:.1f} us saved)'
+            )
+
+
+class _SharedCacheOnly(authentication.CachedTokenAuthentication):
+    """Cached authentication that always misses the local cache"""
+
+    def authenticate_credentials(self, key):
+        authentication.local_cache.clear()
+
+        return super().authenticate_credentials(key)
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from user import hashing
+
+
+def run_clients(clients, logins, login, retry_after):
+    """Log in logins times from clients threads, retrying rejected logins"""
+    latencies = []
+    rejected = []
+    lock = threading.Lock()
+    remaining = iter(range(logins))
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            while True:
+                try:
+                    login()
+                    break
+                except hashing.HashingUnavailable:
+                    with lock:
+                        rejected.append(start)
+                    time.sleep(retry_after)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies, len(rejected)
+
+
+class Command(BaseCommand):
+    """Django command to load test password verification for logins"""
+    help = 'Measure login throughput per core under a burst of logins'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, default=32,
+            help='Logins attempted at the same time'
+        )
+        parser.add_argument(
+            '--logins', type=int, default=200,
+            help='Logins to attempt in total'
+        )
+        parser.add_argument(
+            '--retry-after', type=float, default=0.05,
+            help='Seconds a rejected client waits before trying again'
+        )
+
+    def handle(self, *args, **options):
+        clients, logins = options['clients'], options['logins']
+        encoded = make_password('bench-password')
+        cores = os.cpu_count() or 1
+
+        def inline():
+            check_password('bench-password', encoded)
+
+        def pooled():
+            hashing.pool.run(hashing.verify, 'bench-password', encoded)
+
+        self.stdout.write(
+            f'{logins} logins from {clients} clients on {cores} cores, '
+            f'{hashing.pool.workers} hashing workers'
+        )
+        for name, login in (('request threads', inline),
+                            ('hashing pool', pooled)):
+            start = time.perf_counter()
+            latencies, rejected = run_clients(
+                clients, logins, login, options['retry_after'])
+            elapsed = time.perf_counter() - start
+
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+            throughput = len(latencies) / elapsed
+            self.stdout.write(
+                f'{name}: {throughput:.1f} logins/s, '
+                f'{throughput / cores:.1f} logins/s/core, '
+                f'p95 {p95 * 1000:.0f} ms, {rejected} rejections'
+            )
+
+        self.stdout.write(f'pool: {hashing.pool.stats()}')
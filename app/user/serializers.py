@@ -3,8 +3,12 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.models import Follow
+from core.timing import TimedSerializerMixin
+from tweet import timeline
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the users object"""
 
     class Meta:
@@ -53,3 +57,29 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class FollowSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for users followed by the authenticated user"""
+
+    class Meta:
+        model = Follow
+        fields = ('followee',)
+
+    def validate_followee(self, followee):
+        """Reject following yourself or following a user twice"""
+        user = self.context['request'].user
+        if followee == user:
+            raise serializers.ValidationError(_('you cannot follow yourself'))
+        if Follow.objects.filter(follower=user, followee=followee).exists():
+            raise serializers.ValidationError(
+                _('you already follow this user'))
+
+        return followee
+
+    def create(self, validated_data):
+        """Follow a user and backfill their tweets into the timeline"""
+        return timeline.follow(
+            validated_data['follower'],
+            validated_data['followee']
+        )
@@ -0,0 +1,142 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user import authentication
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        authentication.local_cache.clear()
+        authentication.get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def authenticate(self):
+        """Authenticate with the token, return the user"""
+        backend = authentication.CachedTokenAuthentication()
+
+        return backend.authenticate_credentials(self.token.key)[0]
+
+    def test_token_lookup_cached(self):
+        """Test the token is only looked up in the database once"""
+        self.client.get(ME_URL)
+
+        # Only the profile itself is read
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_shared_cache_used_by_other_processes(self):
+        """Test a cold local cache is filled from the shared cache"""
+        self.authenticate()
+        authentication.local_cache.clear()
+
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_only_id_cached(self):
+        """Test the cache holds no user fields beyond the id and status"""
+        self.authenticate()
+
+        entry = authentication.get_cache().get(
+            authentication._cache_key(self.token.key))
+
+        self.assertEqual(entry, {'id': self.user.pk, 'is_active': True})
+
+    def test_cached_user_loads_fields_on_use(self):
+        """Test other fields of a cached user are read when used"""
+        self.authenticate()
+
+        user = self.authenticate()
+
+        self.assertEqual(user.get_deferred_fields(), {
+            field.attname for field in user._meta.concrete_fields
+        } - {'id', 'is_active'})
+        self.assertEqual(user.email, self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working immediately"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user is rejected immediately"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_refreshed(self):
+        """Test requests see the user as it was last saved"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    def test_invalid_token_rejected(self):
+        """Test unknown tokens are rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_local_cache_bounded(self):
+        """Test the local cache evicts the least recently used entries"""
+        cache = authentication.LocalCache(max_entries=2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_local_cache_expires(self):
+        """Test local cache entries expire after their timeout"""
+        cache = authentication.LocalCache(max_entries=2, timeout=0)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_bench_auth(self):
+        """Test the benchmark reports each lookup path"""
+        out = StringIO()
+
+        call_command('bench_auth', '--iterations', '5', stdout=out)
+
+        for name in ('database', 'shared cache', 'local cache'):
+            self.assertIn(f'{name}:', out.getvalue())
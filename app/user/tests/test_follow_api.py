@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Follow, TimelineEntry, Tweet
+
+
+FOLLOWING_URL = reverse('user:following')
+
+
+def unfollow_url(user_id):
+    """Return the URL to stop following a user"""
+    return reverse('user:unfollow', args=[user_id])
+
+
+def create_user(email, **params):
+    return get_user_model().objects.create_user(email, 'test123', **params)
+
+
+class PublicFollowApiTests(TestCase):
+    """Test the follow API without authentication"""
+
+    def test_login_required(self):
+        """Test that authentication is required to follow users"""
+        res = APIClient().get(FOLLOWING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateFollowApiTests(TestCase):
+    """Test following and unfollowing users"""
+
+    def setUp(self):
+        self.user = create_user('test@test.com')
+        self.author = create_user('author@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_follow_user(self):
+        """Test following a user backfills their tweets"""
+        tweet = Tweet.objects.create(user=self.author, title='Hello')
+
+        res = self.client.post(FOLLOWING_URL, {'followee': self.author.id})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Follow.objects.filter(
+            follower=self.user, followee=self.author).exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.user, tweet=tweet).exists())
+
+    def test_list_following(self):
+        """Test listing the users followed by the authenticated user"""
+        Follow.objects.create(follower=self.user, followee=self.author)
+        Follow.objects.create(
+            follower=self.author, followee=create_user('other@test.com'))
+
+        res = self.client.get(FOLLOWING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{'followee': self.author.id}])
+
+    def test_follow_self_rejected(self):
+        """Test users cannot follow themselves"""
+        res = self.client.post(FOLLOWING_URL, {'followee': self.user.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follow_twice_rejected(self):
+        """Test a user cannot be followed twice"""
+        Follow.objects.create(follower=self.user, followee=self.author)
+
+        res = self.client.post(FOLLOWING_URL, {'followee': self.author.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unfollow_user(self):
+        """Test unfollowing removes the user's tweets from the timeline"""
+        tweet = Tweet.objects.create(user=self.author, title='Hello')
+        self.client.post(FOLLOWING_URL, {'followee': self.author.id})
+
+        res = self.client.delete(unfollow_url(self.author.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            owner=self.user, tweet=tweet).exists())
+
+    def test_unfollow_not_followed(self):
+        """Test unfollowing a user who is not followed returns not found"""
+        res = self.client.delete(unfollow_url(self.author.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashing
+
+
+TOKEN_URL = reverse('user:token')
+
+FAST_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+    'django.contrib.auth.hashers.SHA1PasswordHasher',
+]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoginHashingTests(TestCase):
+    """Test password verification for the token endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test123'
+        )
+        self.payload = {'email': 'test@test.com', 'password': 'test123'}
+
+    def test_login_rehashes_to_preferred_hasher(self):
+        """Test logging in rehashes passwords with the preferred hasher"""
+        self.user.password = make_password('test123', hasher='sha1')
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('md5$'))
+        self.assertTrue(self.user.check_password('test123'))
+
+    def test_current_hash_kept(self):
+        """Test passwords already using the preferred hasher are kept"""
+        password = self.user.password
+
+        self.client.post(TOKEN_URL, self.payload)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
+
+    def test_inactive_user_rejected(self):
+        """Test inactive users cannot log in"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unusable_password_rejected(self):
+        """Test users without a usable password cannot log in"""
+        self.user.set_unusable_password()
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_full_pool_rejects_logins(self):
+        """Test logins are turned away while the hashing pool is full"""
+        full = hashing.HashingPool(workers=1, max_pending=0)
+
+        with patch('user.hashing.pool', full):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(full.stats()['rejected'], 1)
+
+    def test_full_pool_logged(self):
+        """Test rejected logins are logged with the pool's queue depth"""
+        full = hashing.HashingPool(workers=1, max_pending=0)
+
+        with patch('user.hashing.pool', full), \
+                self.assertLogs('user.hashing', 'WARNING') as logs:
+            self.client.post(TOKEN_URL, self.payload)
+
+        self.assertIn("'queued': 0", logs.output[0])
+
+    def test_backend_used_by_authenticate(self):
+        """Test django.contrib.auth.authenticate verifies in the pool"""
+        with patch('user.hashing.pool.run',
+                   wraps=hashing.pool.run) as run:
+            user = authenticate(username='test@test.com', password='test123')
+
+        self.assertEqual(user, self.user)
+        run.assert_called_once()
+
+    def test_failed_login_signalled(self):
+        """Test failed logins send user_login_failed, for lockout hooks"""
+        failed = []
+
+        def receiver(sender, credentials, **kwargs):
+            failed.append(credentials['username'])
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.client.post(
+            TOKEN_URL, {'email': 'test@test.com', 'password': 'wrong'})
+
+        self.assertEqual(failed, ['test@test.com'])
+
+    def test_readyz_reports_pool(self):
+        """Test the readiness check reports the pool's queue depth"""
+        res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(
+            set(res.json()['login_hashing']),
+            {'workers', 'running', 'queued', 'completed', 'rejected'}
+        )
+
+    def test_pool_stats(self):
+        """Test the pool counts the work it completes"""
+        pool = hashing.HashingPool(workers=2, max_pending=4)
+
+        result = pool.run(hashing.verify, 'test123', self.user.password)
+
+        self.assertEqual(result, (True, None))
+        self.assertEqual(pool.stats(), {
+            'workers': 2,
+            'running': 0,
+            'queued': 0,
+            'completed': 1,
+            'rejected': 0,
+        })
+
+    def test_bench_login(self):
+        """Test the load test reports throughput for both paths"""
+        out = StringIO()
+
+        call_command(
+            'bench_login', '--clients', '2', '--logins', '4', stdout=out)
+
+        self.assertIn('request threads:', out.getvalue())
+        self.assertIn('hashing pool:', out.getvalue())
+        self.assertIn('logins/s/core', out.getvalue())
@@ -8,5 +8,11 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
-    path('me/', views.ManageUserView.as_view(), name='me')
+    path('me/', views.ManageUserView.as_view(), name='me'),
+    path('following/', views.FollowingView.as_view(), name='following'),
+    path(
+        'following/<int:followee>/',
+        views.UnfollowView.as_view(),
+        name='unfollow'
+    ),
 ]
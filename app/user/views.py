@@ -1,28 +1,66 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from core.models import Follow
+from core.timing import TimingMixin
+from tweet import timeline
+from user.authentication import CachedTokenAuthentication
+from user.serializers import UserSerializer, AuthTokenSerializer, \
+    FollowSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(TimingMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(TimingMixin, ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(TimingMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     # Over-write the get_object method in order to return the updated user
     def get_object(self):
         """Retrieve and return authenticated user"""
-        return self.request.user
+        # Token authentication only loads the user's id
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+
+class FollowingView(TimingMixin, generics.ListCreateAPIView):
+    """List and follow the users the authenticated user follows"""
+    serializer_class = FollowSerializer
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        """Return the follows of the authenticated user"""
+        return Follow.objects.filter(follower=self.request.user)
+
+    def perform_create(self, serializer):
+        """Follow a user as the authenticated user"""
+        serializer.save(follower=self.request.user)
+
+
+class UnfollowView(TimingMixin, generics.DestroyAPIView):
+    """Stop following a user"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    lookup_field = 'followee'
+
+    def get_queryset(self):
+        """Return the follows of the authenticated user"""
+        return Follow.objects.filter(follower=self.request.user)
+
+    def perform_destroy(self, instance):
+        """Unfollow and drop the user's tweets from the timeline"""
+        timeline.unfollow(instance.follower, instance.followee)